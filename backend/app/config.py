@@ -43,11 +43,128 @@ class Settings(BaseSettings):
     r2_bucket_name: str = os.getenv("R2_BUCKET_NAME", "exoplanets-retrieval-augmented-generation")
     r2_endpoint_url: str = os.getenv("R2_ENDPOINT_URL", "")
     r2_public_domain: str = os.getenv("R2_PUBLIC_DOMAIN", "")
+    r2_part_size_mb: int = int(os.getenv("R2_PART_SIZE_MB", "8"))
+    r2_upload_concurrency: int = int(os.getenv("R2_UPLOAD_CONCURRENCY", "2"))
+    r2_max_connections: int = int(os.getenv("R2_MAX_CONNECTIONS", "32"))
+    r2_connect_timeout: float = float(os.getenv("R2_CONNECT_TIMEOUT", "5"))
+    r2_read_timeout: float = float(os.getenv("R2_READ_TIMEOUT", "60"))
+    r2_max_attempts: int = int(os.getenv("R2_MAX_ATTEMPTS", "3"))
+    r2_retry_mode: str = os.getenv("R2_RETRY_MODE", "standard")
+    r2_presign_expires_seconds: int = int(os.getenv("R2_PRESIGN_EXPIRES_SECONDS", "900"))
     
     # Cloudflare AI Search
     cloudflare_account_id: str = os.getenv("CLOUDFLARE_ACCOUNT_ID", "")
     cloudflare_api_token: str = os.getenv("CLOUDFLARE_API_TOKEN", "")
     ai_search_name: str = os.getenv("AI_SEARCH_NAME", "rag-exoplanets")
+    ai_search_timeout: float = float(os.getenv("AI_SEARCH_TIMEOUT", "30"))
+    ai_search_sync_timeout: float = float(os.getenv("AI_SEARCH_SYNC_TIMEOUT", "10"))
+    ai_search_sync_debounce_seconds: float = float(os.getenv("AI_SEARCH_SYNC_DEBOUNCE_SECONDS", "10"))
+    ai_search_sync_max_delay_seconds: float = float(os.getenv("AI_SEARCH_SYNC_MAX_DELAY_SECONDS", "120"))
+    ai_search_sync_retry_seconds: float = float(os.getenv("AI_SEARCH_SYNC_RETRY_SECONDS", "30"))
+    ai_search_sync_poll_seconds: float = float(os.getenv("AI_SEARCH_SYNC_POLL_SECONDS", "10"))
+    ai_search_sync_job_timeout: float = float(os.getenv("AI_SEARCH_SYNC_JOB_TIMEOUT", "1800"))
+    cloudflare_api_base_url: str = os.getenv("CLOUDFLARE_API_BASE_URL", "https://api.cloudflare.com/client/v4")
+    
+    # Upstream resilience (retries with backoff, retry budget, circuit breaker, hedging)
+    upstream_max_retries: int = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+    retry_backoff_base_ms: int = int(os.getenv("RETRY_BACKOFF_BASE_MS", "200"))
+    retry_backoff_max_ms: int = int(os.getenv("RETRY_BACKOFF_MAX_MS", "5000"))
+    retry_budget_ratio: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+    retry_budget_min_per_second: float = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1"))
+    breaker_failure_rate: float = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    breaker_window_size: int = int(os.getenv("BREAKER_WINDOW_SIZE", "20"))
+    breaker_min_calls: int = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+    breaker_open_seconds: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    breaker_half_open_calls: int = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "1"))
+    hedge_enabled: bool = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+    hedge_min_delay_ms: int = int(os.getenv("HEDGE_MIN_DELAY_MS", "500"))
+    
+    # Per-user fair scheduling of upstream AI calls
+    scheduler_max_in_flight: int = int(os.getenv("SCHEDULER_MAX_IN_FLIGHT", "16"))
+    scheduler_max_queue_per_user: int = int(os.getenv("SCHEDULER_MAX_QUEUE_PER_USER", "20"))
+    scheduler_user_rate: float = float(os.getenv("SCHEDULER_USER_RATE", "1"))
+    scheduler_user_burst: float = float(os.getenv("SCHEDULER_USER_BURST", "10"))
+    scheduler_user_weights: str = os.getenv("SCHEDULER_USER_WEIGHTS", "")
+    
+    # Outbound HTTP connection pools (shared clients created in the lifespan)
+    http2_enabled: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    cloudflare_api_max_connections: int = int(os.getenv("CLOUDFLARE_API_MAX_CONNECTIONS", "100"))
+    cloudflare_api_max_keepalive_connections: int = int(os.getenv("CLOUDFLARE_API_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    cloudflare_api_keepalive_expiry: float = float(os.getenv("CLOUDFLARE_API_KEEPALIVE_EXPIRY", "30"))
+    cloudflare_api_connect_timeout: float = float(os.getenv("CLOUDFLARE_API_CONNECT_TIMEOUT", "5"))
+    turnstile_max_connections: int = int(os.getenv("TURNSTILE_MAX_CONNECTIONS", "20"))
+    turnstile_max_keepalive_connections: int = int(os.getenv("TURNSTILE_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    turnstile_keepalive_expiry: float = float(os.getenv("TURNSTILE_KEEPALIVE_EXPIRY", "30"))
+    turnstile_timeout: float = float(os.getenv("TURNSTILE_TIMEOUT", "10"))
+    
+    # AI answer cache (exact match on normalized question + retrieval parameters)
+    answer_cache_enabled: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    answer_cache_persistent: bool = os.getenv("ANSWER_CACHE_PERSISTENT", "true").lower() == "true"
+    answer_cache_max_entries: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+    answer_cache_ttl_seconds: int = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+    # Seconds between reads of the cache generation (invalidations by other workers reach the LRU within this delay)
+    answer_cache_generation_check_seconds: float = float(os.getenv("ANSWER_CACHE_GENERATION_CHECK_SECONDS", "2"))
+    
+    # Cached row counts for /api/files/count and /api/results/count (false: COUNT(*) per call)
+    row_counts_cached: bool = os.getenv("ROW_COUNTS_CACHED", "true").lower() == "true"
+    row_counts_reconcile_seconds: int = int(os.getenv("ROW_COUNTS_RECONCILE_SECONDS", "60"))
+    # ETags of /api/files and /api/results: newest row re-read at most this often
+    list_watermark_ttl_seconds: float = float(os.getenv("LIST_WATERMARK_TTL_SECONDS", "2"))
+    # since= and /api/events re-read rows up to this much older than the client's position
+    # (rows can commit after newer ones: concurrent requests, write-behind)
+    late_row_window_seconds: float = float(os.getenv("LATE_ROW_WINDOW_SECONDS", "10"))
+    
+    # Read-through cache of /api/files and /api/results pages (keyed by ETag)
+    list_cache_enabled: bool = os.getenv("LIST_CACHE_ENABLED", "true").lower() == "true"
+    list_cache_max_entries: int = int(os.getenv("LIST_CACHE_MAX_ENTRIES", "512"))
+    list_cache_ttl_seconds: int = int(os.getenv("LIST_CACHE_TTL_SECONDS", "300"))
+    # Shared tier for multi-worker deployments: none or memory (in-process fake)
+    list_cache_shared: str = os.getenv("LIST_CACHE_SHARED", "none")
+    
+    # /api/results?view=summary: characters of the answer returned as snippet
+    results_snippet_chars: int = int(os.getenv("RESULTS_SNIPPET_CHARS", "200"))
+    
+    # Change feed (/api/events): new files and results pushed as Server-Sent Events
+    events_subscriber_buffer: int = int(os.getenv("EVENTS_SUBSCRIBER_BUFFER", "100"))
+    events_poll_seconds: float = float(os.getenv("EVENTS_POLL_SECONDS", "2"))
+    events_heartbeat_seconds: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    events_replay_limit: int = int(os.getenv("EVENTS_REPLAY_LIMIT", "500"))
+    
+    # Content-addressed deduplication: identical uploads reuse the stored R2 object
+    upload_dedup_enabled: bool = os.getenv("UPLOAD_DEDUP_ENABLED", "true").lower() == "true"
+    
+    # Batch uploads (/api/upload/batch)
+    upload_batch_max_files: int = int(os.getenv("UPLOAD_BATCH_MAX_FILES", "200"))
+    upload_batch_concurrency: int = int(os.getenv("UPLOAD_BATCH_CONCURRENCY", "16"))
+    
+    # Batch AI requests (/api/request/batch)
+    ai_batch_max_items: int = int(os.getenv("AI_BATCH_MAX_ITEMS", "500"))
+    ai_batch_concurrency: int = int(os.getenv("AI_BATCH_CONCURRENCY", "8"))
+    
+    # Write-behind persistence of AI responses (batched background inserts)
+    response_write_behind: bool = os.getenv("RESPONSE_WRITE_BEHIND", "false").lower() == "true"
+    response_write_batch_size: int = int(os.getenv("RESPONSE_WRITE_BATCH_SIZE", "100"))
+    response_write_flush_interval_ms: int = int(os.getenv("RESPONSE_WRITE_FLUSH_INTERVAL_MS", "100"))
+    response_write_queue_size: int = int(os.getenv("RESPONSE_WRITE_QUEUE_SIZE", "10000"))
+    response_write_max_retries: int = int(os.getenv("RESPONSE_WRITE_MAX_RETRIES", "3"))
+    
+    # Answer backend: "ai_search" (Cloudflare AI Search), "local" (in-process vector index)
+    # or "hybrid" (BM25 over uploaded documents fused with the local vector index)
+    retrieval_backend: str = os.getenv("RETRIEVAL_BACKEND", "ai_search")
+    local_index_path: str = os.getenv("LOCAL_INDEX_PATH", "")
+    local_index_mmap: bool = os.getenv("LOCAL_INDEX_MMAP", "true").lower() == "true"
+    local_index_top_k: int = int(os.getenv("LOCAL_INDEX_TOP_K", "10"))
+    workers_ai_embedding_model: str = os.getenv("WORKERS_AI_EMBEDDING_MODEL", "@cf/baai/bge-m3")
+    workers_ai_text_model: str = os.getenv("WORKERS_AI_TEXT_MODEL", "@cf/meta/llama-3.1-8b-instruct")
+    
+    # BM25 lexical index of uploaded documents (updated on every upload)
+    lexical_index_enabled: bool = os.getenv("LEXICAL_INDEX_ENABLED", "false").lower() == "true"
+    lexical_index_path: str = os.getenv("LEXICAL_INDEX_PATH", "data/lexical-index.pkl")
+    # Uploads within this delay share one write of the index file
+    lexical_index_save_delay_seconds: float = float(os.getenv("LEXICAL_INDEX_SAVE_DELAY_SECONDS", "5"))
+    # Text read from one document for the index (the rest of a longer document is not indexed)
+    lexical_index_max_text_mb: int = int(os.getenv("LEXICAL_INDEX_MAX_TEXT_MB", "8"))
+    hybrid_rrf_k: int = int(os.getenv("HYBRID_RRF_K", "60"))
     
     # File Upload
     max_file_size_mb: int = int(os.getenv("MAX_FILE_SIZE_MB", "4"))
@@ -64,6 +181,7 @@ class Settings(BaseSettings):
     
     # Turnstile
     turnstile_secret_key: str = os.getenv("TURNSTILE_SECRET_KEY", "")
+    turnstile_verify_url: str = os.getenv("TURNSTILE_VERIFY_URL", "https://challenges.cloudflare.com/turnstile/v0/siteverify")
     
     @property
     def database_url(self) -> str:
@@ -76,6 +194,11 @@ class Settings(BaseSettings):
         """Get max file size in bytes"""
         return self.max_file_size_mb * 1024 * 1024
     
+    @property
+    def lexical_index_max_text_bytes(self) -> int:
+        """Get the text read from one document for the lexical index, in bytes"""
+        return self.lexical_index_max_text_mb * 1024 * 1024
+    
     @property
     def allowed_file_extensions_list(self) -> List[str]:
         """Get allowed file extensions as list"""
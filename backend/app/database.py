@@ -14,6 +14,8 @@ engine = create_async_engine(
     pool_pre_ping=True,
     pool_size=10,
     max_overflow=20,
+    # TIMESTAMP values in UTC, both CURRENT_TIMESTAMP defaults and the datetime.utcnow() values set by the app
+    connect_args={"init_command": "SET time_zone = '+00:00'"},
 )
 
 # Create async session factory
@@ -2,13 +2,19 @@
 Authentication dependencies.
 """
 from typing import Optional
-from fastapi import Depends, HTTPException, status, Header
+from fastapi import Depends, HTTPException, status, Header, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.database import get_db
 from app.models import User
+from app.utils.http_client import HTTPClientRegistry
 from app.utils.jwt import decode_access_token
+from app.utils.lexical_index import LexicalIndex
+from app.utils.r2 import R2Storage
+from app.utils.response_store import ResponseWriter
+from app.utils.retriever import Retriever
+from app.utils.sync_scheduler import SyncScheduler
 from app.schemas import TokenData
 
 
@@ -22,10 +28,10 @@ async def get_current_user(
     Args:
         authorization: Authorization header with Bearer token
         db: Database session
-        
+    
     Returns:
         User object
-        
+    
     Raises:
         HTTPException: If token is invalid or user not found
     """
@@ -83,3 +89,81 @@ async def get_current_user(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Database error while validating credentials: {str(e)}"
         )
+
+
+def get_http_clients(request: Request) -> HTTPClientRegistry:
+    """
+    Get the application-scoped HTTP client registry created in the lifespan.
+    
+    Args:
+        request: FastAPI request object
+    
+    Returns:
+        Shared HTTPClientRegistry
+    """
+    return request.app.state.http_clients
+
+
+def get_response_writer(request: Request) -> ResponseWriter:
+    """
+    Get the application-scoped write-behind response writer created in the lifespan.
+    
+    Args:
+        request: FastAPI request object
+    
+    Returns:
+        Shared ResponseWriter
+    """
+    return request.app.state.response_writer
+
+
+def get_retriever(request: Request) -> Retriever:
+    """
+    Get the application-scoped answer backend created in the lifespan.
+    
+    Args:
+        request: FastAPI request object
+    
+    Returns:
+        Shared Retriever
+    """
+    return request.app.state.retriever
+
+
+def get_lexical_index(request: Request) -> Optional[LexicalIndex]:
+    """
+    Get the application-scoped BM25 index of uploaded documents (None when disabled).
+    
+    Args:
+        request: FastAPI request object
+    
+    Returns:
+        Shared LexicalIndex or None
+    """
+    return request.app.state.lexical_index
+
+
+def get_r2_storage(request: Request) -> R2Storage:
+    """
+    Get the application-scoped pooled R2 client.
+    
+    Args:
+        request: FastAPI request object
+    
+    Returns:
+        Shared R2Storage
+    """
+    return request.app.state.r2
+
+
+def get_sync_scheduler(request: Request) -> SyncScheduler:
+    """
+    Get the application-scoped AI Search sync scheduler.
+    
+    Args:
+        request: FastAPI request object
+    
+    Returns:
+        Shared SyncScheduler
+    """
+    return request.app.state.sync_scheduler
@@ -4,8 +4,8 @@ SQLAlchemy database models.
 from datetime import datetime
 
 from app.database import Base
-from sqlalchemy import (TIMESTAMP, Column, ForeignKey, Index, Integer, String,
-                        Text)
+from sqlalchemy import (CHAR, TIMESTAMP, Column, ForeignKey, Index, Integer,
+                        String, Text)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -36,6 +36,7 @@ class File(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
     absolute_path = Column(String(500), nullable=False)
     url = Column(String(500), nullable=True)
+    sha256 = Column(CHAR(64), nullable=True, comment="SHA-256 of the file content (hex)")
     created_at = Column(TIMESTAMP, nullable=False, server_default=func.current_timestamp())
     
     # Relationships
@@ -44,6 +45,8 @@ class File(Base):
     # Indexes
     __table_args__ = (
         Index("idx_user_id", "user_id"),
+        Index("idx_sha256", "sha256"),
+        Index("idx_created_at_id", "created_at", "id"),
     )
 
 
@@ -65,5 +68,32 @@ class Response(Base):
     # Indexes
     __table_args__ = (
         Index("idx_user_id", "user_id"),
-        Index("idx_created_at", "created_at"),
+        Index("idx_created_at_id", "created_at", "id"),
+        Index("ft_question_response", "question", "response", mysql_prefix="FULLTEXT"),
     )
+
+
+class AnswerCacheEntry(Base):
+    """Persistent tier of the AI answer cache"""
+    __tablename__ = "answer_cache"
+    
+    cache_key = Column(CHAR(64), primary_key=True, comment="SHA-256 of normalized question + retrieval parameters")
+    question = Column(Text, nullable=False)
+    response = Column(Text, nullable=False)
+    probability_percentage = Column(Integer, nullable=True)
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.current_timestamp())
+    expires_at = Column(TIMESTAMP, nullable=False)
+    
+    # Indexes
+    __table_args__ = (
+        Index("idx_expires_at", "expires_at"),
+    )
+
+
+class AnswerCacheGeneration(Base):
+    """Generation of the AI answer cache, bumped by every invalidation (single row)"""
+    __tablename__ = "answer_cache_generation"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    generation = Column(Integer, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.current_timestamp())
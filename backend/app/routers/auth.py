@@ -7,9 +7,11 @@ from sqlalchemy import select, update
 from datetime import datetime
 
 from app.database import get_db
+from app.dependencies import get_http_clients
 from app.models import User
 from app.schemas import LoginRequest, TokenResponse
 from app.utils.security import verify_password
+from app.utils.http_client import HTTPClientRegistry
 from app.utils.jwt import create_access_token
 from app.utils.turnstile import verify_turnstile
 
@@ -21,7 +23,8 @@ async def login(
     request: Request,
     login_data: LoginRequest,
     turnstile_token: str = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    http_clients: HTTPClientRegistry = Depends(get_http_clients)
 ):
     """
     Login endpoint with Turnstile verification.
@@ -31,6 +34,7 @@ async def login(
         login_data: Login credentials
         turnstile_token: Turnstile token from header (cf-turnstile-response)
         db: Database session
+        http_clients: Shared HTTP client registry
         
     Returns:
         JWT access token
@@ -45,7 +49,7 @@ async def login(
     if not turnstile_token:
         turnstile_token = request.headers.get("cf-turnstile-response", "")
     
-    if not await verify_turnstile(turnstile_token, client_ip):
+    if not await verify_turnstile(http_clients.turnstile, turnstile_token, client_ip):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid CAPTCHA verification"
@@ -0,0 +1,36 @@
+"""
+Public change feed endpoint.
+"""
+from typing import Optional
+
+from app.utils.change_feed import change_feed
+from app.utils.sse import SSE_HEADERS
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+router = APIRouter(prefix="/api", tags=["Public"])
+
+
+@router.get("/events")
+async def get_events(
+    last_event_id: Optional[str] = Query(None, description="Id of the last event received (when the header cannot be sent)"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Stream new files and results as Server-Sent Events (public endpoint).
+    Events: file and result (one new row each, as in /api/files and /api/results),
+    ready (sent once connected), reset (events were lost, reload the lists).
+    Browsers reconnect with Last-Event-ID and get the rows they missed.
+    
+    Args:
+        last_event_id: Id of the last event received
+        last_event_id_header: Last-Event-ID header (takes precedence)
+    
+    Returns:
+        text/event-stream response
+    """
+    return StreamingResponse(
+        change_feed.subscribe(last_event_id_header or last_event_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
@@ -1,70 +1,125 @@
 """
 Public files endpoint.
 """
-from typing import List
-from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
+from pydantic import TypeAdapter
 
+from app.config import settings
 from app.database import get_db
 from app.models import File
 from app.schemas import FilePublicResponse
+from app.utils.list_cache import CachedPage, list_cache
+from app.utils.pagination import NEXT_CURSOR_HEADER, TRUNCATED_HEADER, WATERMARK_HEADER
+from app.utils.pagination import encode_cursor, etag_matches, fetch_page, fetch_since
+from app.utils.row_counts import FILES, row_counts
 
 router = APIRouter(prefix="/api", tags=["Public"])
 
+# Serializer of cached pages
+_page_adapter = TypeAdapter(List[FilePublicResponse])
+
 
 @router.get("/files", response_model=List[FilePublicResponse])
 async def get_files(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page (overrides page)"),
+    since: Optional[str] = Query(None, description="X-Watermark of a previous response: only newer rows (overrides page and cursor)"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get list of files (public endpoint).
-    Returns paginated list of uploaded files.
+    Returns paginated list of uploaded files, newest first.
+    The X-Next-Cursor response header holds the cursor of the next page (absent on the last page);
+    cursor pages cost the same at any depth, page numbers use OFFSET.
+    Pollers pass since (rows newer than their last X-Watermark, newest first, plus
+    the rows of the LATE_ROW_WINDOW_SECONDS before it again, which may have been
+    committed late; X-Delta-Truncated means more than page_size were found) or
+    revalidate with If-None-Match, answered with 304 from the cached watermark without a query.
+    Serialized pages are cached (LIST_CACHE_ENABLED) under their ETag.
     
     Args:
         page: Page number (1-indexed)
         page_size: Number of items per page
+        cursor: Cursor of the next page from a previous response
+        since: Watermark from a previous response
+        if_none_match: ETag of the client's copy
         db: Database session
         
     Returns:
         List of file information
+        
+    Raises:
+        HTTPException: If the cursor is invalid
     """
-    offset = (page - 1) * page_size
-    
-    result = await db.execute(
-        select(File)
-        .order_by(File.created_at.desc())
-        .offset(offset)
-        .limit(page_size)
-    )
+    etag, watermark = await row_counts.etag(FILES, page, page_size, cursor, since)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if watermark:
+        headers[WATERMARK_HEADER] = encode_cursor(*watermark)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    files = result.scalars().all()
+    cached = await list_cache.get(FILES, etag)
+    if cached is not None:
+        headers.update(cached.headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
     
-    return [
-        FilePublicResponse(
-            uid=file.uid,
-            absolute_path=file.absolute_path,
-            url=file.url,
-            created_at=file.created_at
+    page_headers = {}
+    try:
+        if since:
+            files, truncated = await fetch_since(db, select(File), File, since, page_size, settings.late_row_window_seconds)
+            if truncated:
+                page_headers[TRUNCATED_HEADER] = "true"
+        else:
+            files, next_cursor = await fetch_page(db, select(File), File, page_size, cursor, page)
+            if next_cursor:
+                page_headers[NEXT_CURSOR_HEADER] = next_cursor
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
         )
-        for file in files
-    ]
+    # Rows committed after the watermark was read move it forward
+    if files and (watermark is None or (files[0].created_at, files[0].id) > watermark):
+        page_headers[WATERMARK_HEADER] = encode_cursor(files[0].created_at, files[0].id)
+    
+    cached = CachedPage(
+        body=_page_adapter.dump_json([
+            FilePublicResponse(
+                uid=file.uid,
+                absolute_path=file.absolute_path,
+                url=file.url,
+                created_at=file.created_at
+            )
+            for file in files
+        ]),
+        headers=page_headers
+    )
+    await list_cache.set(FILES, etag, cached)
+    headers.update(cached.headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 
 @router.get("/files/count")
-async def get_files_count(db: AsyncSession = Depends(get_db)):
+async def get_files_count(
+    exact: bool = Query(False, description="Run COUNT(*) instead of using the cached count"),
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get total count of files.
+    Served from an in-process counter (ROW_COUNTS_CACHED) unless exact is set.
     
     Args:
+        exact: Count the rows in the database
         db: Database session
         
     Returns:
         Total count of files
     """
-    result = await db.execute(select(func.count(File.id)))
-    count = result.scalar()
+    count = await row_counts.get(db, FILES, exact)
     
     return {"count": count}
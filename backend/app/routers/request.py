@@ -1,218 +1,169 @@
 """
 AI request endpoints.
 """
+import asyncio
+import re
+from typing import AsyncIterator, List, Optional, Tuple
+
 import httpx
 from app.config import settings
-from app.database import get_db
-from app.dependencies import get_current_user
-from app.models import Response as ResponseModel
+from app.database import AsyncSessionLocal, get_db
+from app.dependencies import (get_current_user, get_http_clients,
+                              get_response_writer, get_retriever)
 from app.models import User
-from app.schemas import AIRequestSchema, AIResponseSchema
+from app.schemas import (AIBatchItemResult, AIBatchRequestSchema,
+                         AIBatchResponseSchema, AIRequestSchema,
+                         AIResponseSchema)
+from app.utils.ai_search import NO_RESPONSE_TEXT, ai_search_http_exception
+from app.utils.answer_cache import answer_cache
+from app.utils.change_feed import change_feed
+from app.utils.fair_scheduler import upstream_scheduler
+from app.utils.http_client import HTTPClientRegistry
+from app.utils.list_cache import list_cache
+from app.utils.probability import extract_probability, find_probability
+from app.utils.resilience import resilience_stats
+from app.utils.response_store import (ResponseWriter, bulk_insert_responses,
+                                      new_response_row)
+from app.utils.retriever import Retriever
+from app.utils.row_counts import RESPONSES, row_counts
+from app.utils.single_flight import ai_search_flight
+from app.utils.sse import SSE_HEADERS, format_sse
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/api", tags=["AI Request"])
 
+# Streamed fragments that may complete a probability mention (digit, '%' or decimal point)
+_PROBABILITY_HINT = re.compile(r'[\d%.]')
+
+
+async def _generate_answer(
+    retriever: Retriever,
+    client: httpx.AsyncClient,
+    query: str,
+    cache_key: str,
+    user: str
+) -> Tuple[str, Optional[int], bool]:
+    """
+    Ask the answer backend (coalescing identical concurrent questions) and extract the probability.
+    
+    Args:
+        retriever: Answer backend (AI Search or local index)
+        client: Shared HTTP client for the Cloudflare API
+        query: User question
+        cache_key: Answer cache key of the question (also the coalescing key)
+        user: Username the upstream call is scheduled for
+    
+    Returns:
+        Tuple of (response text, probability percentage, cacheable)
+    """
+    async def run() -> Tuple[str, Optional[int], bool]:
+        # Wait for an upstream slot in the user's fair queue
+        async with upstream_scheduler.slot(user):
+            ai_response_text = await retriever.answer(client, query)
+        if not ai_response_text:
+            # Empty upstream answers are not cached
+            return NO_RESPONSE_TEXT, None, False
+        ai_response_text, probability_percentage = extract_probability(ai_response_text)
+        return ai_response_text, probability_percentage, True
+    
+    # Identical concurrent questions share one upstream call
+    return await ai_search_flight.do(cache_key, run)
+
+
+async def _save_responses(db: AsyncSession, writer: ResponseWriter, rows: List[dict]) -> None:
+    """
+    Persist response rows, through the write-behind queue when it is enabled.
+    
+    Args:
+        db: Database session (used when the rows are written immediately)
+        writer: Shared write-behind response writer
+        rows: Rows built with new_response_row()
+    """
+    if not writer.enqueue(rows):
+        await bulk_insert_responses(db, rows)
+        await db.commit()
+        row_counts.add(RESPONSES, len(rows))
+        list_cache.invalidate(RESPONSES)
+        change_feed.notify()
+
 
 @router.post("/request", response_model=AIResponseSchema)
 async def ai_request(
     request_data: AIRequestSchema,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    http_clients: HTTPClientRegistry = Depends(get_http_clients),
+    response_writer: ResponseWriter = Depends(get_response_writer),
+    retriever: Retriever = Depends(get_retriever)
 ):
     """
     AI request endpoint (authenticated).
     Sends query to Cloudflare AI Search and returns response.
+    Identical questions are answered from the answer cache when possible.
+    Upstream calls are rate limited and fairly scheduled per user (429 with Retry-After).
+    With RESPONSE_WRITE_BEHIND the response row is saved in the background.
     
     Args:
         request_data: AI request with prompt
         current_user: Current authenticated user
         db: Database session
-        
+        http_clients: Shared HTTP client registry
+        response_writer: Shared write-behind response writer
+        retriever: Answer backend
+    
     Returns:
         AI response with question and answer
-        
+    
     Raises:
         HTTPException: If AI request fails
     """
     try:
-        # Prepare Cloudflare AI Search request
-        url = f"https://api.cloudflare.com/client/v4/accounts/{settings.cloudflare_account_id}/autorag/rags/{settings.ai_search_name}/ai-search"
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {settings.cloudflare_api_token}"
-        }
-        
         # Get the query text (from either 'question' or 'prompt' field)
         query = request_data.query_text
         
-        # System message to guide the AI to return structured probability analysis
-        system_message = """You are an expert exoplanet analyst. When analyzing celestial bodies:
-
-1. Review the available data about the celestial body
-2. Provide a brief analysis of its characteristics
-3. Conclude with your probability assessment
-
-CRITICAL FORMAT REQUIREMENT:
-You MUST include the probability percentage in your response using ONE of these formats:
-- "the probability is approximately XX%"
-- "probability of XX%"
-- If you find a koi_score value (0.0 to 1.0), convert it to percentage (multiply by 100)
-
-The probability MUST be a number between 0 and 100.
-
-Example response:
-"Based on the koi_score of 0.98, this celestial body shows strong indicators of being an exoplanet. The high score suggests excellent confidence in the detection. The probability is approximately 98%."
-
-If insufficient data is provided, respond with your best analysis but DO NOT include a percentage."""
-        
-        # Prepare payload for Cloudflare AI Search API
-        payload = {
-            "query": query,
-            "max_num_results": 10,
-            "rewrite_query": False,
-            "stream": False,
-            "system_message": system_message
-        }
+        cache_key = retriever.cache_key(query)
+        cached = await answer_cache.get(db, cache_key)
+        cacheable = False
         
-        # Call Cloudflare AI Search API
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url, 
-                json=payload, 
-                headers=headers, 
-                timeout=30.0
+        if cached is not None:
+            ai_response_text = cached.response
+            probability_percentage = cached.probability_percentage
+        else:
+            # Per-user rate limit and queue limit (429 with Retry-After); joining an
+            # identical in-flight question costs no upstream call
+            if not ai_search_flight.in_flight(cache_key):
+                upstream_scheduler.admit(current_user.user)
+            ai_response_text, probability_percentage, cacheable = await _generate_answer(
+                retriever, http_clients.cloudflare, query, cache_key, current_user.user
             )
-            response.raise_for_status()
-            ai_result = response.json()
-            
-            # Extract response from the API result
-            if not ai_result.get("success", False):
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Cloudflare AI Search returned unsuccessful response: {ai_result.get('errors', 'Unknown error')}"
-                )
-            
-            # Get the generated response text
-            ai_response_text = ai_result.get("result", {}).get("response", "")
-            
-            if not ai_response_text:
-                ai_response_text = "No response was generated by the AI model. Please try rephrasing your question."
-        
-        # Extract probability percentage from response
-        probability_percentage = None
-        try:
-            import re
-
-            # Multiple patterns to extract percentage:
-            # 1. "PROBABILITY: XX%" or "Probability: XX%"
-            # 2. "probability of... is approximately XX%"
-            # 3. "probability... is XX%"
-            # 4. "koi_score of 0.XX" (convert to percentage)
-            # 5. Just "XX%" at the end of a sentence about probability
-
-            # Try pattern 1: Explicit PROBABILITY: XX%
-            probability_match = re.search(r'PROBABILITY:\s*(\d+)%', ai_response_text, re.IGNORECASE | re.MULTILINE)
-            
-            # Try pattern 2: "is approximately XX%"
-            if not probability_match:
-                probability_match = re.search(r'is\s+approximately\s+\*\*(\d+)%\*\*', ai_response_text, re.IGNORECASE)
-            
-            # Try pattern 3: "probability... is XX%"
-            if not probability_match:
-                probability_match = re.search(r'probability.*?is.*?(\d+)%', ai_response_text, re.IGNORECASE | re.DOTALL)
-            
-            # Try pattern 4: koi_score of 0.XX (convert to percentage)
-            if not probability_match:
-                koi_match = re.search(r'koi[_\s]*score.*?(?:of|is)\s+\*\*?(0\.\d+)\*\*?', ai_response_text, re.IGNORECASE | re.DOTALL)
-                if koi_match:
-                    koi_score = float(koi_match.group(1))
-                    percentage_value = int(koi_score * 100)
-                    if 0 <= percentage_value <= 100:
-                        probability_percentage = percentage_value
-            
-            # Try pattern 5: Look for XX% near end of text
-            if not probability_match and not probability_percentage:
-                probability_match = re.search(r'(\d+)%\s*$', ai_response_text, re.MULTILINE)
-            
-            # Extract percentage from match
-            if probability_match and not probability_percentage:
-                percentage_str = probability_match.group(1)
-                percentage_value = int(percentage_str)
-                # Validate range
-                if 0 <= percentage_value <= 100:
-                    probability_percentage = percentage_value
-            
-            # Clean up the response text by removing explicit probability lines
-            if probability_percentage is not None:
-                ai_response_text = re.sub(r'\n*PROBABILITY:\s*\d+%\s*$', '', ai_response_text, flags=re.IGNORECASE | re.MULTILINE).strip()
-                
-        except Exception as e:
-            # If extraction fails, continue without probability
-            print(f"Warning: Could not extract probability percentage: {e}")
         
-        # Save response to database
-        new_response = ResponseModel(
-            user_id=current_user.id,
-            question=query,
-            response=ai_response_text,
-            probability_percentage=probability_percentage
-        )
+        # Save response to database (uid and created_at are generated client-side)
+        new_response = new_response_row(current_user.id, query, ai_response_text, probability_percentage)
+        await _save_responses(db, response_writer, [new_response])
         
-        db.add(new_response)
-        await db.commit()
-        await db.refresh(new_response)
+        # Cache fresh answers (empty upstream answers are not cached)
+        if cacheable:
+            await answer_cache.set(db, cache_key, query, ai_response_text, probability_percentage)
         
         return AIResponseSchema(
-            question=new_response.question,
-            response=new_response.response,
-            probability_percentage=new_response.probability_percentage,
-            created_at=new_response.created_at
+            question=new_response["question"],
+            response=new_response["response"],
+            probability_percentage=new_response["probability_percentage"],
+            created_at=new_response["created_at"],
+            cached=cached is not None
         )
-        
+    
     except ValueError as e:
         # Validation error from schema
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
-    except httpx.HTTPStatusError as e:
-        # HTTP error from Cloudflare API
-        error_detail = f"Cloudflare AI Search API error (HTTP {e.response.status_code})"
-        
-        if e.response.status_code == 401:
-            error_detail = "Cloudflare AI Authentication Error: Invalid API token. Please verify CLOUDFLARE_API_TOKEN in .env file."
-        elif e.response.status_code == 403:
-            error_detail = "Cloudflare AI Permission Error: API token does not have access to AI Search. Please verify token permissions."
-        elif e.response.status_code == 404:
-            error_detail = f"Cloudflare AI Search Error: The AI Search '{settings.ai_search_name}' does not exist. Please verify AI_SEARCH_NAME in .env file."
-        else:
-            try:
-                error_data = e.response.json()
-                error_detail = f"Cloudflare AI API Error: {error_data.get('errors', [{}])[0].get('message', str(e))}"
-            except:
-                error_detail = f"Cloudflare AI API Error: {str(e)}"
-        
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=error_detail
-        )
-    except httpx.TimeoutException:
-        raise HTTPException(
-            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
-            detail="Cloudflare AI Search request timed out. The service may be overloaded or slow to respond."
-        )
-    except httpx.ConnectError:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Cloudflare AI Connection Error: Unable to connect to Cloudflare AI Search API. Please check your internet connection."
-        )
     except httpx.HTTPError as e:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Cloudflare AI Network Error: {str(e)}"
-        )
+        # HTTP, timeout and connection errors from Cloudflare API
+        raise ai_search_http_exception(e)
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -222,3 +173,295 @@ If insufficient data is provided, respond with your best analysis but DO NOT inc
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Unexpected error processing AI request: {str(e)}"
         )
+
+
+@router.post("/request/batch", response_model=AIBatchResponseSchema)
+async def ai_request_batch(
+    batch_data: AIBatchRequestSchema,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    http_clients: HTTPClientRegistry = Depends(get_http_clients),
+    response_writer: ResponseWriter = Depends(get_response_writer),
+    retriever: Retriever = Depends(get_retriever)
+):
+    """
+    Batch AI request endpoint (authenticated).
+    Answers many questions with bounded concurrency (AI_BATCH_CONCURRENCY),
+    saves all responses with one bulk insert and returns results in input order.
+    A failing question is reported in its own result instead of failing the batch.
+    Every uncached question is admitted like a single request (per-user rate and
+    queue limits): rejected questions report 429 in their result, and when no
+    question can be answered at all the whole batch gets 429 with Retry-After.
+    
+    Args:
+        batch_data: List of questions
+        current_user: Current authenticated user
+        db: Database session
+        http_clients: Shared HTTP client registry
+        response_writer: Shared write-behind response writer
+        retriever: Answer backend
+    
+    Returns:
+        Per-question results in input order
+    
+    Raises:
+        HTTPException: If the batch is too large, rate limited or cannot be saved
+    """
+    questions = batch_data.questions
+    if len(questions) > settings.ai_batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many questions in batch. Maximum allowed is {settings.ai_batch_max_items}"
+        )
+    
+    cache_keys = [retriever.cache_key(question) for question in questions]
+    cached_answers = await answer_cache.get_many(db, cache_keys)
+    
+    semaphore = asyncio.Semaphore(settings.ai_batch_concurrency)
+    client = http_clients.cloudflare
+    
+    async def generate(key: str, question: str) -> AIBatchItemResult:
+        try:
+            async with semaphore:
+                ai_response_text, probability_percentage, _ = await _generate_answer(retriever, client, question, key, current_user.user)
+            return AIBatchItemResult(index=-1, question=question, response=ai_response_text, probability_percentage=probability_percentage)
+        except httpx.HTTPError as e:
+            error = ai_search_http_exception(e)
+            return AIBatchItemResult(index=-1, question=question, status_code=error.status_code, error=error.detail)
+        except HTTPException as e:
+            return AIBatchItemResult(index=-1, question=question, status_code=e.status_code, error=e.detail)
+        except Exception as e:
+            return AIBatchItemResult(
+                index=-1,
+                question=question,
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                error=f"Unexpected error processing AI request: {str(e)}"
+            )
+    
+    # Fan out one upstream call per distinct uncached question, each charged to the
+    # user's token bucket before any work is queued
+    pending = {}
+    outcomes = {}
+    rejected = None
+    for key, question in zip(cache_keys, questions):
+        if key in cached_answers or key in pending or key in outcomes:
+            continue
+        if not ai_search_flight.in_flight(key):
+            try:
+                upstream_scheduler.admit(current_user.user)
+            except HTTPException as e:
+                rejected = rejected or e
+                outcomes[key] = AIBatchItemResult(index=-1, question=question, status_code=e.status_code, error=e.detail)
+                continue
+        pending[key] = question
+    if rejected is not None and not pending and not cached_answers:
+        raise rejected
+    outcomes.update(zip(pending, await asyncio.gather(*(generate(key, question) for key, question in pending.items()))))
+    
+    # Assemble results in input order
+    results: List[AIBatchItemResult] = []
+    for index, (key, question) in enumerate(zip(cache_keys, questions)):
+        cached = cached_answers.get(key)
+        if cached is not None:
+            results.append(AIBatchItemResult(
+                index=index,
+                question=question,
+                response=cached.response,
+                probability_percentage=cached.probability_percentage,
+                cached=True
+            ))
+        else:
+            results.append(outcomes[key].model_copy(update={"index": index, "question": question}))
+    
+    # Save every successful answer with a single bulk insert (or queue them for write-behind)
+    rows = []
+    fresh = {}
+    for result in results:
+        if result.error is not None:
+            continue
+        row = new_response_row(current_user.id, result.question, result.response, result.probability_percentage)
+        result.created_at = row["created_at"]
+        rows.append(row)
+        key = cache_keys[result.index]
+        if not result.cached and result.response != NO_RESPONSE_TEXT and key not in fresh:
+            fresh[key] = (key, result.question, result.response, result.probability_percentage)
+    
+    try:
+        await _save_responses(db, response_writer, rows)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database Error: Failed to save batch responses: {str(e)}"
+        )
+    
+    await answer_cache.set_many(db, list(fresh.values()))
+    
+    return AIBatchResponseSchema(
+        results=results,
+        succeeded=len(rows),
+        failed=len(results) - len(rows)
+    )
+
+
+@router.get("/request/stats")
+async def ai_request_stats(
+    current_user: User = Depends(get_current_user),
+    response_writer: ResponseWriter = Depends(get_response_writer),
+    retriever: Retriever = Depends(get_retriever)
+):
+    """
+    Get AI request counters (authenticated).
+    Reports answer cache hits, how many upstream calls were coalesced,
+    the write-behind queue state, the upstream circuit breakers and
+    per-user scheduler queues.
+    
+    Args:
+        current_user: Current authenticated user
+        response_writer: Shared write-behind response writer
+        retriever: Answer backend
+    
+    Returns:
+        Answer backend, answer cache, single-flight, response writer, resilience, scheduler,
+        row counters, list cache and change feed
+    """
+    return {
+        "retriever": retriever.stats(),
+        "answer_cache": answer_cache.stats(),
+        "single_flight": ai_search_flight.stats(),
+        "response_writer": response_writer.stats(),
+        "resilience": resilience_stats(),
+        "scheduler": upstream_scheduler.stats(),
+        "row_counts": row_counts.stats(),
+        "list_cache": list_cache.stats(),
+        "change_feed": change_feed.stats()
+    }
+
+
+async def _stream_answer_events(
+    query: str,
+    user_id: int,
+    user: str,
+    client: httpx.AsyncClient,
+    writer: ResponseWriter,
+    retriever: Retriever
+) -> AsyncIterator[str]:
+    """
+    Relay an AI Search answer as Server-Sent Events and persist it once complete.
+    
+    Events:
+        token: {"response": "<fragment>"} for every upstream fragment
+        probability: {"probability_percentage": N} whenever the extracted value changes
+        done: final AIResponseSchema payload (after the Response row is saved)
+        error: {"status_code": N, "detail": "..."} if the request fails
+    
+    Args:
+        query: User question
+        user_id: ID of the requesting user
+        user: Username the upstream call is scheduled for
+        client: Shared HTTP client for the Cloudflare API
+        writer: Shared write-behind response writer
+        retriever: Answer backend
+    
+    Yields:
+        Encoded SSE blocks
+    """
+    try:
+        # Dependency sessions are closed before a streamed body is sent, so use our own
+        cache_key = retriever.cache_key(query)
+        async with AsyncSessionLocal() as db:
+            cached = await answer_cache.get(db, cache_key)
+        
+        if cached is not None:
+            ai_response_text = cached.response
+            probability_percentage = cached.probability_percentage
+            yield format_sse("token", {"response": ai_response_text})
+            if probability_percentage is not None:
+                yield format_sse("probability", {"probability_percentage": probability_percentage})
+        else:
+            ai_response_text = ""
+            probability_percentage = None
+            
+            # The upstream connection holds a scheduler slot for the whole stream
+            async with upstream_scheduler.slot(user):
+                async for fragment in retriever.stream(client, query):
+                    ai_response_text += fragment
+                    yield format_sse("token", {"response": fragment})
+                    
+                    # Re-run extraction only when the new fragment can change the result
+                    if _PROBABILITY_HINT.search(fragment):
+                        current = find_probability(ai_response_text)
+                        if current is not None and current != probability_percentage:
+                            probability_percentage = current
+                            yield format_sse("probability", {"probability_percentage": probability_percentage})
+            
+            if ai_response_text:
+                ai_response_text, probability_percentage = extract_probability(ai_response_text)
+            else:
+                ai_response_text = NO_RESPONSE_TEXT
+                probability_percentage = None
+        
+        # Save response to database once the stream is complete
+        new_response = new_response_row(user_id, query, ai_response_text, probability_percentage)
+        async with AsyncSessionLocal() as db:
+            await _save_responses(db, writer, [new_response])
+            
+            if cached is None and ai_response_text != NO_RESPONSE_TEXT:
+                await answer_cache.set(db, cache_key, query, ai_response_text, probability_percentage)
+        
+        final = AIResponseSchema(
+            question=new_response["question"],
+            response=new_response["response"],
+            probability_percentage=new_response["probability_percentage"],
+            created_at=new_response["created_at"],
+            cached=cached is not None
+        )
+        yield format_sse("done", final.model_dump(mode="json"))
+    
+    except httpx.HTTPError as e:
+        error = ai_search_http_exception(e)
+        yield format_sse("error", {"status_code": error.status_code, "detail": error.detail})
+    except HTTPException as e:
+        yield format_sse("error", {"status_code": e.status_code, "detail": e.detail})
+    except Exception as e:
+        yield format_sse("error", {
+            "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+            "detail": f"Unexpected error processing AI request: {str(e)}"
+        })
+
+
+@router.post("/request/stream")
+async def ai_request_stream(
+    request_data: AIRequestSchema,
+    current_user: User = Depends(get_current_user),
+    http_clients: HTTPClientRegistry = Depends(get_http_clients),
+    response_writer: ResponseWriter = Depends(get_response_writer),
+    retriever: Retriever = Depends(get_retriever)
+):
+    """
+    Streaming AI request endpoint (authenticated).
+    Relays the AI Search answer token by token as Server-Sent Events
+    (token / probability / done / error) and saves the Response row when complete.
+    Streamed requests always count against the per-user rate limit.
+    
+    Args:
+        request_data: AI request with prompt
+        current_user: Current authenticated user
+        http_clients: Shared HTTP client registry
+        response_writer: Shared write-behind response writer
+        retriever: Answer backend
+    
+    Returns:
+        text/event-stream response
+    
+    Raises:
+        HTTPException: 429 if the user's rate limit or queue limit is exceeded
+    """
+    # Rejected before the stream starts, so clients get a real 429 status
+    upstream_scheduler.admit(current_user.user)
+    
+    return StreamingResponse(
+        _stream_answer_events(request_data.query_text, current_user.id, current_user.user, http_clients.cloudflare, response_writer, retriever),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
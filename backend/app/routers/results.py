@@ -1,71 +1,266 @@
 """
 Public results endpoint.
 """
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Union
 
+from app.config import settings
 from app.database import get_db
 from app.models import Response
-from app.schemas import ResponsePublicResponse
-from fastapi import APIRouter, Depends, Query
+from app.schemas import ResponsePublicResponse, ResponseSearchResult, ResponseSummaryResponse
+from app.utils.list_cache import CachedPage, list_cache
+from app.utils.pagination import NEXT_CURSOR_HEADER, TRUNCATED_HEADER, WATERMARK_HEADER
+from app.utils.pagination import encode_cursor, etag_matches, fetch_page, fetch_since
+from app.utils.result_search import search_responses
+from app.utils.row_counts import RESPONSES, row_counts
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi import Response as HTTPResponse
+from fastapi import status
+from pydantic import TypeAdapter
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/api", tags=["Public"])
 
+# Serializers of cached pages
+_page_adapter = TypeAdapter(List[ResponsePublicResponse])
+_summary_adapter = TypeAdapter(List[ResponseSummaryResponse])
 
-@router.get("/results", response_model=List[ResponsePublicResponse])
+# Views of /api/results
+FULL_VIEW = "full"
+SUMMARY_VIEW = "summary"
+
+
+def _summary_query():
+    """Columns of the summary view; the snippet is cut in SQL, one character longer to detect truncation"""
+    return select(
+        Response.id,
+        Response.uid,
+        Response.question,
+        func.substr(Response.response, 1, settings.results_snippet_chars + 1).label("snippet"),
+        Response.probability_percentage,
+        Response.created_at
+    )
+
+
+def _summary_fields(response) -> dict:
+    """ResponseSummaryResponse fields of a _summary_query() row"""
+    limit = settings.results_snippet_chars
+    return {
+        "uid": response.uid,
+        "question": response.question,
+        "snippet": response.snippet[:limit],
+        "truncated": len(response.snippet) > limit,
+        "probability_percentage": response.probability_percentage,
+        "created_at": response.created_at,
+    }
+
+
+@router.get("/results", response_model=List[Union[ResponsePublicResponse, ResponseSummaryResponse]])
 async def get_results(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page (overrides page)"),
+    since: Optional[str] = Query(None, description="X-Watermark of a previous response: only newer rows (overrides page and cursor)"),
+    view: str = Query(FULL_VIEW, pattern=f"^({FULL_VIEW}|{SUMMARY_VIEW})$", description="summary: answer snippet instead of the full text"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get list of AI responses (public endpoint).
-    Returns paginated list of AI request history.
+    Returns paginated list of AI request history, newest first.
+    The X-Next-Cursor response header holds the cursor of the next page (absent on the last page);
+    cursor pages cost the same at any depth, page numbers use OFFSET.
+    Pollers pass since (rows newer than their last X-Watermark, newest first, plus
+    the rows of the LATE_ROW_WINDOW_SECONDS before it again, which may have been
+    committed late; X-Delta-Truncated means more than page_size were found) or
+    revalidate with If-None-Match, answered with 304 from the cached watermark without a query.
+    Serialized pages are cached (LIST_CACHE_ENABLED) under their ETag.
+    view=summary reads only the listed columns (no ORM entities) and returns the first
+    RESULTS_SNIPPET_CHARS characters of each answer; the full text is at /api/results/{uid}.
+    full and summary are the only views: there is no fields= projection of arbitrary columns.
     
     Args:
         page: Page number (1-indexed)
         page_size: Number of items per page
+        cursor: Cursor of the next page from a previous response
+        since: Watermark from a previous response
+        view: full or summary
+        if_none_match: ETag of the client's copy
         db: Database session
         
     Returns:
         List of AI responses
+        
+    Raises:
+        HTTPException: If the cursor is invalid
     """
-    offset = (page - 1) * page_size
-    
-    result = await db.execute(
-        select(Response)
-        .order_by(Response.created_at.desc())
-        .offset(offset)
-        .limit(page_size)
-    )
+    etag, watermark = await row_counts.etag(RESPONSES, page, page_size, cursor, since, view)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if watermark:
+        headers[WATERMARK_HEADER] = encode_cursor(*watermark)
+    if etag_matches(if_none_match, etag):
+        return HTTPResponse(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    responses = result.scalars().all()
+    cached = await list_cache.get(RESPONSES, etag)
+    if cached is not None:
+        headers.update(cached.headers)
+        return HTTPResponse(content=cached.body, media_type="application/json", headers=headers)
     
-    return [
-        ResponsePublicResponse(
-            uid=response.uid,
-            question=response.question,
-            response=response.response,
-            probability_percentage=response.probability_percentage,
-            created_at=response.created_at
+    summary = view == SUMMARY_VIEW
+    query = _summary_query() if summary else select(Response)
+    page_headers = {}
+    try:
+        if since:
+            responses, truncated = await fetch_since(db, query, Response, since, page_size, settings.late_row_window_seconds)
+            if truncated:
+                page_headers[TRUNCATED_HEADER] = "true"
+        else:
+            responses, next_cursor = await fetch_page(db, query, Response, page_size, cursor, page)
+            if next_cursor:
+                page_headers[NEXT_CURSOR_HEADER] = next_cursor
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
         )
-        for response in responses
-    ]
+    # Rows committed after the watermark was read move it forward
+    if responses and (watermark is None or (responses[0].created_at, responses[0].id) > watermark):
+        page_headers[WATERMARK_HEADER] = encode_cursor(responses[0].created_at, responses[0].id)
+    
+    if summary:
+        body = _summary_adapter.dump_json([ResponseSummaryResponse(**_summary_fields(response)) for response in responses])
+    else:
+        body = _page_adapter.dump_json([
+            ResponsePublicResponse(
+                uid=response.uid,
+                question=response.question,
+                response=response.response,
+                probability_percentage=response.probability_percentage,
+                created_at=response.created_at
+            )
+            for response in responses
+        ])
+    cached = CachedPage(body=body, headers=page_headers)
+    await list_cache.set(RESPONSES, etag, cached)
+    headers.update(cached.headers)
+    return HTTPResponse(content=cached.body, media_type="application/json", headers=headers)
 
 
 @router.get("/results/count")
-async def get_results_count(db: AsyncSession = Depends(get_db)):
+async def get_results_count(
+    exact: bool = Query(False, description="Run COUNT(*) instead of using the cached count"),
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get total count of AI responses.
+    Served from an in-process counter (ROW_COUNTS_CACHED) unless exact is set.
     
     Args:
+        exact: Count the rows in the database
         db: Database session
         
     Returns:
         Total count of responses
     """
-    result = await db.execute(select(func.count(Response.id)))
-    count = result.scalar()
+    count = await row_counts.get(db, RESPONSES, exact)
     
     return {"count": count}
+
+
+@router.get("/results/search", response_model=List[ResponseSearchResult])
+async def search_results(
+    response: HTTPResponse,
+    q: str = Query(..., min_length=1, max_length=500, description="Words to find in questions and answers"),
+    page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    min_probability: Optional[int] = Query(None, ge=0, le=100, description="Lowest probability percentage"),
+    max_probability: Optional[int] = Query(None, ge=0, le=100, description="Highest probability percentage"),
+    created_from: Optional[datetime] = Query(None, description="Only responses created at or after this time"),
+    created_to: Optional[datetime] = Query(None, description="Only responses created before this time"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Search AI responses by question and answer text (public endpoint).
+    Results are ranked by relevance (MySQL FULLTEXT, natural language mode) and
+    returned as summaries with their score; the X-Next-Cursor response header
+    holds the cursor of the next page (absent on the last page).
+    
+    Args:
+        response: Response (for the X-Next-Cursor header)
+        q: Search text
+        page_size: Number of items per page
+        cursor: Cursor of the next page from a previous response
+        min_probability: Lowest probability percentage (responses without one are excluded)
+        max_probability: Highest probability percentage
+        created_from: Start of the creation time range (inclusive)
+        created_to: End of the creation time range (exclusive)
+        db: Database session
+        
+    Returns:
+        Matching AI responses, most relevant first
+        
+    Raises:
+        HTTPException: If the cursor is invalid
+    """
+    query = _summary_query()
+    if min_probability is not None:
+        query = query.where(Response.probability_percentage >= min_probability)
+    if max_probability is not None:
+        query = query.where(Response.probability_percentage <= max_probability)
+    if created_from is not None:
+        query = query.where(Response.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(Response.created_at < created_to)
+    
+    try:
+        hits, next_cursor = await search_responses(db, query, q, page_size, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    return [ResponseSearchResult(**_summary_fields(row), score=score) for row, score in hits]
+
+
+# Declared after /results/count and /results/search so that they are not taken for a uid
+@router.get("/results/{uid}", response_model=ResponsePublicResponse)
+async def get_result(
+    uid: str,
+    response: HTTPResponse,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get one AI response with its full text (public endpoint).
+    
+    Args:
+        uid: Response UID
+        response: Response (for the Cache-Control header)
+        db: Database session
+        
+    Returns:
+        AI response
+        
+    Raises:
+        HTTPException: If the response does not exist
+    """
+    result = await db.execute(select(Response).where(Response.uid == uid))
+    row = result.scalar_one_or_none()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Result not found"
+        )
+    # Responses are never edited
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    
+    return ResponsePublicResponse(
+        uid=row.uid,
+        question=row.question,
+        response=row.response,
+        probability_percentage=row.probability_percentage,
+        created_at=row.created_at
+    )
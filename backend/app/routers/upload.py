@@ -1,20 +1,40 @@
 """
 File upload endpoints.
 """
+import asyncio
+import mimetypes
 import os
 import re
+import tempfile
+import uuid
+from datetime import timedelta
 from pathlib import Path
+from typing import Dict, List, Optional
 from urllib.parse import quote
 
-import aioboto3
-import httpx
 from app.config import settings
 from app.database import get_db
-from app.dependencies import get_current_user
+from app.dependencies import (get_current_user, get_lexical_index,
+                              get_r2_storage, get_sync_scheduler)
 from app.models import File as FileModel
 from app.models import User
-from app.schemas import UploadResponse
+from app.schemas import (CompleteUploadRequest, PresignUploadRequest,
+                         PresignUploadResponse, UploadBatchItemResult,
+                         UploadBatchResponse, UploadResponse)
+from app.utils.answer_cache import answer_cache
+from app.utils.change_feed import change_feed
+from app.utils.jwt import create_access_token, decode_upload_token
+from app.utils.lexical_index import LexicalIndex, index_document
+from app.utils.list_cache import list_cache
+from app.utils.r2 import (FileTooLargeError, R2Storage, hash_content,
+                          hash_object, part_size, presign_upload,
+                          stream_upload)
+from app.utils.row_counts import FILES, row_counts
+from app.utils.sync_scheduler import RUNNING, SyncScheduler
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from botocore.exceptions import ClientError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/api", tags=["Upload"])
@@ -26,7 +46,7 @@ def validate_file_extension(filename: str) -> bool:
     
     Args:
         filename: Name of the file
-        
+    
     Returns:
         True if valid, False otherwise
     """
@@ -40,10 +60,10 @@ def clean_filename(filename: str) -> str:
     
     Args:
         filename: Original filename
-        
+    
     Returns:
         Cleaned filename without numeric prefix
-        
+    
     Examples:
         '0_Additional Resources_.pdf' -> 'Additional Resources_.pdf'
         '123_document.pdf' -> 'document.pdf'
@@ -54,37 +74,152 @@ def clean_filename(filename: str) -> str:
     return cleaned
 
 
+def r2_object_key(cleaned_filename: str) -> str:
+    """
+    Generate the R2 object key of an upload (stored in the bucket root).
+    
+    Args:
+        cleaned_filename: Filename without numeric prefix
+    
+    Returns:
+        Unique key prefixed with a millisecond timestamp
+    """
+    timestamp = int(os.times().elapsed * 1000)
+    return f"{timestamp}_{cleaned_filename}"
+
+
+def public_url(r2_path: str) -> str:
+    """
+    Generate the public URL of an R2 object.
+    
+    Args:
+        r2_path: Object key
+    
+    Returns:
+        URL on the R2 public domain
+    """
+    # URL format: https://public-domain/absolute_path
+    # Use quote() to properly encode spaces and special characters
+    # safe='/' preserves forward slashes in the path
+    encoded_path = quote(r2_path, safe='/')
+    return f"{settings.r2_public_domain}/{encoded_path}"
+
+
+def r2_error_detail(r2_error: Exception) -> str:
+    """
+    Build a helpful message for an R2 upload error.
+    
+    Args:
+        r2_error: Exception raised by the S3 client
+    
+    Returns:
+        Error detail naming the likely cause
+    """
+    error_message = str(r2_error)
+    
+    # Provide specific error messages based on error type
+    if "InvalidAccessKeyId" in error_message or "SignatureDoesNotMatch" in error_message:
+        return f"R2 Authentication Error: Invalid R2 credentials (Access Key ID or Secret Access Key). Please verify your Cloudflare R2 credentials in .env file."
+    elif "NoSuchBucket" in error_message:
+        return f"R2 Bucket Error: The bucket '{settings.r2_bucket_name}' does not exist. Please create it in Cloudflare R2 dashboard or check the bucket name in .env file."
+    elif "AccessDenied" in error_message:
+        return f"R2 Permission Error: Access denied to bucket '{settings.r2_bucket_name}'. Please verify the R2 API token has proper permissions."
+    elif "could not connect" in error_message.lower() or "connection" in error_message.lower():
+        return f"R2 Connection Error: Unable to connect to Cloudflare R2. Please verify the endpoint URL '{settings.r2_endpoint_url}' and your internet connection."
+    elif "endpoint" in error_message.lower():
+        return f"R2 Endpoint Error: Invalid R2 endpoint URL '{settings.r2_endpoint_url}'. Please verify the endpoint format in .env file."
+    return f"R2 Upload Error: {error_message}"
+
+
+def describe_sync(sync: dict) -> str:
+    """
+    Describe the AI Search sync state for upload responses.
+    
+    Args:
+        sync: SyncScheduler.status()
+    
+    Returns:
+        Sentence about when the uploaded file will be indexed
+    """
+    if sync["state"] == RUNNING:
+        message = "AI Search sync in progress; new files will be indexed by the next sync"
+    else:
+        message = (
+            f"AI Search sync scheduled in {sync['next_sync_in_seconds']:.0f}s "
+            f"({sync['pending_uploads']} file(s) pending)"
+        )
+    if sync["last_error"]:
+        message += f". Last sync attempt failed: {sync['last_error']}"
+    return message
+
+
+async def find_stored_objects(db: AsyncSession, hashes: List[str]) -> Dict[str, FileModel]:
+    """
+    Find R2 objects already holding the given content.
+    
+    Args:
+        db: Database session
+        hashes: Hex SHA-256 digests
+    
+    Returns:
+        Oldest file row per digest that is already stored
+    """
+    if not hashes:
+        return {}
+    result = await db.execute(
+        select(FileModel).where(FileModel.sha256.in_(set(hashes))).order_by(FileModel.id)
+    )
+    stored: Dict[str, FileModel] = {}
+    for existing in result.scalars():
+        stored.setdefault(existing.sha256, existing)
+    return stored
+
+
+async def delete_rejected_object(r2: R2Storage, r2_path: str) -> None:
+    """
+    Delete a direct upload that does not match what was presigned.
+    
+    Args:
+        r2: Shared pooled R2 client
+        r2_path: Object key
+    """
+    try:
+        await r2.client.delete_object(Bucket=settings.r2_bucket_name, Key=r2_path)
+    except Exception as r2_error:
+        print(f"Warning: Could not delete mismatched upload {r2_path}: {r2_error}")
+
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_file(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    lexical_index: Optional[LexicalIndex] = Depends(get_lexical_index),
+    r2: R2Storage = Depends(get_r2_storage),
+    sync_scheduler: SyncScheduler = Depends(get_sync_scheduler)
 ):
     """
     Upload file endpoint (authenticated).
     Uploads file to Cloudflare R2 and saves metadata to database.
+    The AI Search sync is scheduled (debounced and coalesced with other uploads), not run inline.
+    When LEXICAL_INDEX_ENABLED, the document is also added to the BM25 index.
+    When a file with the same SHA-256 is already stored (UPLOAD_DEDUP_ENABLED), nothing is
+    written to R2 and no sync is scheduled: the new file row points at the existing object.
     
     Args:
         file: File to upload
         current_user: Current authenticated user
         db: Database session
-        
+        lexical_index: Shared BM25 index of uploaded documents (None when disabled)
+        r2: Shared pooled R2 client
+        sync_scheduler: Shared AI Search sync scheduler
+    
     Returns:
         Upload response with file information
-        
+    
     Raises:
         HTTPException: If file is invalid or upload fails
     """
-    # Validate file size
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    if file_size > settings.max_file_size_bytes:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File size exceeds maximum allowed size of {settings.max_file_size_mb}MB"
-        )
-    
     # Validate file extension
     if not validate_file_extension(file.filename):
         raise HTTPException(
@@ -92,74 +227,76 @@ async def upload_file(
             detail=f"File type not supported. Allowed extensions: {', '.join(settings.allowed_file_extensions_list)}"
         )
     
-    # Reset file pointer
-    await file.seek(0)
+    # Reject declared oversized files before sending anything to R2
+    if file.size is not None and file.size > settings.max_file_size_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size exceeds maximum allowed size of {settings.max_file_size_mb}MB"
+        )
     
     try:
         # Clean filename by removing numeric prefixes like '0_', '1_', etc.
         cleaned_filename = clean_filename(file.filename)
         
-        # Generate unique filename with timestamp
-        timestamp = int(os.times().elapsed * 1000)
-        safe_filename = f"{timestamp}_{cleaned_filename}"
-        
-        # Store file directly in root (no subdirectories)
-        r2_path = safe_filename
+        # Hash the spooled upload locally first, so a duplicate never reaches R2
+        existing = None
+        if settings.upload_dedup_enabled:
+            try:
+                size, sha256 = await hash_content(file.read, settings.max_file_size_bytes)
+            except FileTooLargeError:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File size exceeds maximum allowed size of {settings.max_file_size_mb}MB"
+                )
+            existing = (await find_stored_objects(db, [sha256])).get(sha256)
         
-        # Upload to Cloudflare R2
-        try:
-            session = aioboto3.Session()
-            async with session.client(
-                's3',
-                endpoint_url=settings.r2_endpoint_url,
-                aws_access_key_id=settings.r2_access_key_id,
-                aws_secret_access_key=settings.r2_secret_access_key
-            ) as s3_client:
-                await s3_client.upload_fileobj(
-                    file.file,
+        if existing is not None:
+            # Same content already in R2 (and indexed by AI Search): reuse the object
+            r2_path = existing.absolute_path
+            file_url = existing.url
+        else:
+            # Store file directly in root (no subdirectories) with a unique timestamp prefix
+            r2_path = r2_object_key(cleaned_filename)
+            
+            # Stream to Cloudflare R2 part by part
+            try:
+                await file.seek(0)
+                stored = await stream_upload(
+                    r2.client,
+                    file.read,
                     settings.r2_bucket_name,
-                    r2_path
+                    r2_path,
+                    settings.max_file_size_bytes
+                )
+                size, sha256 = stored.size, stored.sha256
+            except FileTooLargeError:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File size exceeds maximum allowed size of {settings.max_file_size_mb}MB"
+                )
+            except Exception as r2_error:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=r2_error_detail(r2_error)
                 )
-        except Exception as r2_error:
-            error_message = str(r2_error)
-            
-            # Provide specific error messages based on error type
-            if "InvalidAccessKeyId" in error_message or "SignatureDoesNotMatch" in error_message:
-                detail = f"R2 Authentication Error: Invalid R2 credentials (Access Key ID or Secret Access Key). Please verify your Cloudflare R2 credentials in .env file."
-            elif "NoSuchBucket" in error_message:
-                detail = f"R2 Bucket Error: The bucket '{settings.r2_bucket_name}' does not exist. Please create it in Cloudflare R2 dashboard or check the bucket name in .env file."
-            elif "AccessDenied" in error_message:
-                detail = f"R2 Permission Error: Access denied to bucket '{settings.r2_bucket_name}'. Please verify the R2 API token has proper permissions."
-            elif "could not connect" in error_message.lower() or "connection" in error_message.lower():
-                detail = f"R2 Connection Error: Unable to connect to Cloudflare R2. Please verify the endpoint URL '{settings.r2_endpoint_url}' and your internet connection."
-            elif "endpoint" in error_message.lower():
-                detail = f"R2 Endpoint Error: Invalid R2 endpoint URL '{settings.r2_endpoint_url}'. Please verify the endpoint format in .env file."
-            else:
-                detail = f"R2 Upload Error: {error_message}"
             
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=detail
-            )
-        
-        # Generate public URL using R2 public domain
-        # URL format: https://public-domain/absolute_path
-        # Use quote() to properly encode spaces and special characters
-        # safe='/' preserves forward slashes in the path
-        encoded_path = quote(r2_path, safe='/')
-        file_url = f"{settings.r2_public_domain}/{encoded_path}"
+            file_url = public_url(r2_path)
         
         # Save file metadata to database
         try:
             new_file = FileModel(
                 user_id=current_user.id,
                 absolute_path=r2_path,
-                url=file_url
+                url=file_url,
+                sha256=sha256
             )
             
             db.add(new_file)
             await db.commit()
             await db.refresh(new_file)
+            row_counts.add(FILES)
+            list_cache.invalidate(FILES)
+            change_feed.notify()
         except Exception as db_error:
             await db.rollback()
             raise HTTPException(
@@ -167,55 +304,48 @@ async def upload_file(
                 detail=f"Database Error: Failed to save file metadata to database: {str(db_error)}"
             )
         
-        # Trigger AI Search sync to index the new file
-        sync_job_id = None
-        sync_message = "File uploaded successfully"
+        if existing is not None:
+            # Retrieval results are unchanged: keep cached answers, indexes and sync state
+            return UploadResponse(
+                success=True,
+                message="File uploaded successfully. Identical content is already stored; the existing file is reused and no AI Search sync is needed",
+                file_uid=new_file.uid,
+                url=file_url,
+                size=size,
+                sha256=sha256,
+                deduplicated=True,
+                sync=sync_scheduler.status()
+            )
         
+        # New documents change retrieval results: drop cached AI answers
         try:
-            sync_url = f"https://api.cloudflare.com/client/v4/accounts/{settings.cloudflare_account_id}/autorag/rags/{settings.ai_search_name}/sync"
-            sync_headers = {
-                "Authorization": f"Bearer {settings.cloudflare_api_token}"
-            }
-            
-            async with httpx.AsyncClient() as client:
-                sync_response = await client.patch(
-                    sync_url,
-                    headers=sync_headers,
-                    timeout=10.0
-                )
-                sync_response.raise_for_status()
-                sync_result = sync_response.json()
-                
-                if sync_result.get("success", False):
-                    sync_job_id = sync_result.get("result", {}).get("job_id")
-                    sync_message = f"File uploaded successfully. AI Search sync job started (Job ID: {sync_job_id})"
-                else:
-                    sync_message = "File uploaded successfully, but AI Search sync could not be triggered"
-                    
-        except httpx.HTTPStatusError as sync_error:
-            # Log sync error but don't fail the upload
-            error_msg = f"HTTP {sync_error.response.status_code}"
-            
-            if sync_error.response.status_code == 401:
-                error_msg = "Invalid API token for AI Search sync"
-            elif sync_error.response.status_code == 403:
-                error_msg = "API token lacks permissions for AI Search sync"
-            elif sync_error.response.status_code == 404:
-                error_msg = f"AI Search '{settings.ai_search_name}' not found"
-            
-            sync_message = f"File uploaded successfully, but AI Search sync failed: {error_msg}"
-            
-        except Exception as sync_error:
-            # Log sync error but don't fail the upload
-            sync_message = f"File uploaded successfully, but AI Search sync encountered an error: {str(sync_error)}"
+            await answer_cache.invalidate(db)
+            await db.commit()
+        except Exception as cache_error:
+            await db.rollback()
+            print(f"Warning: Could not invalidate answer cache: {cache_error}")
+        
+        # Index the document text for local lexical (BM25) retrieval
+        if lexical_index is not None:
+            try:
+                await file.seek(0)
+                await index_document(lexical_index, settings.lexical_index_path, r2_path, cleaned_filename, file.file)
+            except Exception as index_error:
+                print(f"Warning: Could not add file to lexical index: {index_error}")
+        
+        # Mark the AI Search index dirty; the scheduler coalesces syncs across uploads
+        sync = sync_scheduler.mark_dirty()
         
         return UploadResponse(
             success=True,
-            message=sync_message,
+            message=f"File uploaded successfully. {describe_sync(sync)}",
             file_uid=new_file.uid,
-            url=file_url
+            url=file_url,
+            size=size,
+            sha256=sha256,
+            sync=sync
         )
-        
+    
     except HTTPException:
         # Re-raise HTTP exceptions without modification
         raise
@@ -225,3 +355,539 @@ async def upload_file(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Unexpected error during file upload: {str(e)}"
         )
+
+
+@router.post("/upload/batch", response_model=UploadBatchResponse)
+async def upload_files_batch(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    lexical_index: Optional[LexicalIndex] = Depends(get_lexical_index),
+    r2: R2Storage = Depends(get_r2_storage),
+    sync_scheduler: SyncScheduler = Depends(get_sync_scheduler)
+):
+    """
+    Batch upload endpoint (authenticated).
+    Streams many files to R2 with bounded parallelism (UPLOAD_BATCH_CONCURRENCY),
+    saves all file rows with one bulk insert and schedules a single AI Search sync.
+    An invalid or failing file is reported in its own result instead of failing the batch.
+    Files whose content is already stored, or appears earlier in the batch, reuse that
+    object (UPLOAD_DEDUP_ENABLED) and are neither uploaded nor synced again.
+    
+    Args:
+        files: Files to upload
+        current_user: Current authenticated user
+        db: Database session
+        lexical_index: Shared BM25 index of uploaded documents (None when disabled)
+        r2: Shared pooled R2 client
+        sync_scheduler: Shared AI Search sync scheduler
+    
+    Returns:
+        Per-file results in input order
+    
+    Raises:
+        HTTPException: If the batch is too large or the file rows cannot be saved
+    """
+    if len(files) > settings.upload_batch_max_files:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files in batch. Maximum allowed is {settings.upload_batch_max_files}"
+        )
+    
+    semaphore = asyncio.Semaphore(settings.upload_batch_concurrency)
+    results: List[Optional[UploadBatchItemResult]] = [None] * len(files)
+    r2_paths: Dict[int, str] = {}
+    hashes: Dict[int, str] = {}
+    sizes: Dict[int, int] = {}
+    
+    async def digest(index: int, file: UploadFile) -> None:
+        async with semaphore:
+            try:
+                sizes[index], hashes[index] = await hash_content(file.read, settings.max_file_size_bytes)
+            except FileTooLargeError:
+                results[index] = UploadBatchItemResult(
+                    index=index,
+                    filename=file.filename,
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    error=f"File size exceeds maximum allowed size of {settings.max_file_size_mb}MB"
+                )
+            await file.seek(0)
+    
+    async def store(index: int, file: UploadFile) -> UploadBatchItemResult:
+        result = UploadBatchItemResult(index=index, filename=file.filename)
+        try:
+            async with semaphore:
+                stored = await stream_upload(
+                    r2.client,
+                    file.read,
+                    settings.r2_bucket_name,
+                    r2_paths[index],
+                    settings.max_file_size_bytes
+                )
+        except FileTooLargeError:
+            return result.model_copy(update={
+                "status_code": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                "error": f"File size exceeds maximum allowed size of {settings.max_file_size_mb}MB"
+            })
+        except Exception as r2_error:
+            return result.model_copy(update={
+                "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "error": r2_error_detail(r2_error)
+            })
+        return result.model_copy(update={"url": public_url(r2_paths[index]), "size": stored.size, "sha256": stored.sha256})
+    
+    # Validate every file
+    valid = []
+    for index, file in enumerate(files):
+        if not validate_file_extension(file.filename):
+            results[index] = UploadBatchItemResult(
+                index=index,
+                filename=file.filename,
+                status_code=status.HTTP_400_BAD_REQUEST,
+                error=f"File type not supported. Allowed extensions: {', '.join(settings.allowed_file_extensions_list)}"
+            )
+        elif file.size is not None and file.size > settings.max_file_size_bytes:
+            results[index] = UploadBatchItemResult(
+                index=index,
+                filename=file.filename,
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                error=f"File size exceeds maximum allowed size of {settings.max_file_size_mb}MB"
+            )
+        else:
+            valid.append(index)
+    
+    # Hash the valid files locally and look up content that is already stored
+    if settings.upload_dedup_enabled:
+        await asyncio.gather(*(digest(index, files[index]) for index in valid))
+        valid = [index for index in valid if results[index] is None]
+    existing = await find_stored_objects(db, [hashes[index] for index in valid if index in hashes])
+    
+    # Stream each distinct new content to R2 once, in parallel
+    uploads = []
+    first_index: Dict[str, int] = {}
+    copies: Dict[int, int] = {}
+    for index in valid:
+        file = files[index]
+        sha256 = hashes.get(index)
+        if sha256 in existing:
+            r2_paths[index] = existing[sha256].absolute_path
+            results[index] = UploadBatchItemResult(
+                index=index,
+                filename=file.filename,
+                url=existing[sha256].url,
+                size=sizes[index],
+                sha256=sha256,
+                deduplicated=True
+            )
+        elif sha256 in first_index:
+            copies[index] = first_index[sha256]
+        else:
+            if sha256 is not None:
+                first_index[sha256] = index
+            # Files with the same name in one batch would get the same timestamped key
+            r2_path = r2_object_key(clean_filename(file.filename))
+            if r2_path in r2_paths.values():
+                r2_path = r2_object_key(f"{index}_{clean_filename(file.filename)}")
+            r2_paths[index] = r2_path
+            uploads.append(store(index, file))
+    
+    for result in await asyncio.gather(*uploads):
+        results[result.index] = result
+    
+    # Repeated content within the batch shares the first copy's object (or its error)
+    for index, original in copies.items():
+        update = {"index": index, "filename": files[index].filename}
+        if results[original].error is None:
+            r2_paths[index] = r2_paths[original]
+            update["deduplicated"] = True
+        results[index] = results[original].model_copy(update=update)
+    
+    # Save all file rows with one multi-row INSERT
+    rows = [
+        {
+            "uid": str(uuid.uuid4()),
+            "user_id": current_user.id,
+            "absolute_path": r2_paths[result.index],
+            "url": result.url,
+            "sha256": result.sha256
+        }
+        for result in results if result.error is None
+    ]
+    new_indexes = [result.index for result in results if result.error is None and not result.deduplicated]
+    if rows:
+        try:
+            await db.execute(insert(FileModel), rows)
+            await db.commit()
+            row_counts.add(FILES, len(rows))
+            list_cache.invalidate(FILES)
+            change_feed.notify()
+        except Exception as db_error:
+            await db.rollback()
+            # Do not leave objects in R2 that no file row points to (reused objects stay)
+            await asyncio.gather(
+                *(r2.client.delete_object(Bucket=settings.r2_bucket_name, Key=r2_paths[index]) for index in new_indexes),
+                return_exceptions=True
+            )
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Database Error: Failed to save file metadata to database: {str(db_error)}"
+            )
+        
+        stored_indexes = [result.index for result in results if result.error is None]
+        for index, row in zip(stored_indexes, rows):
+            results[index] = results[index].model_copy(update={"file_uid": row["uid"]})
+    
+    if new_indexes:
+        # New documents change retrieval results: drop cached AI answers (once per batch)
+        try:
+            await answer_cache.invalidate(db)
+            await db.commit()
+        except Exception as cache_error:
+            await db.rollback()
+            print(f"Warning: Could not invalidate answer cache: {cache_error}")
+        
+        # Index the documents for local lexical (BM25) retrieval (saves are coalesced)
+        if lexical_index is not None:
+            for index in new_indexes:
+                try:
+                    await files[index].seek(0)
+                    await index_document(
+                        lexical_index, settings.lexical_index_path, r2_paths[index],
+                        clean_filename(files[index].filename), files[index].file
+                    )
+                except Exception as index_error:
+                    print(f"Warning: Could not add file to lexical index: {index_error}")
+        
+        # One sync for the whole batch
+        sync = sync_scheduler.mark_dirty(len(new_indexes))
+        message = f"Uploaded {len(rows)} of {len(files)} files. {describe_sync(sync)}"
+        if len(new_indexes) < len(rows):
+            message += f". {len(rows) - len(new_indexes)} file(s) reused already stored content"
+    elif rows:
+        sync = sync_scheduler.status()
+        message = f"Uploaded {len(rows)} of {len(files)} files. All content was already stored; no AI Search sync is needed"
+    else:
+        sync = sync_scheduler.status()
+        message = "No files were uploaded"
+    
+    return UploadBatchResponse(
+        message=message,
+        results=results,
+        succeeded=len(rows),
+        failed=len(files) - len(rows),
+        sync=sync
+    )
+
+
+@router.post("/upload/presign", response_model=PresignUploadResponse)
+async def presign_direct_upload(
+    request: PresignUploadRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    r2: R2Storage = Depends(get_r2_storage)
+):
+    """
+    Start a direct-to-R2 upload (authenticated).
+    The client PUTs the bytes to the returned presigned URL(s), so they never pass
+    through the API, then calls /api/upload/complete with the upload token.
+    Files up to one part (R2_PART_SIZE_MB) get a single PUT URL; larger files get one
+    URL per part of a multipart upload. Size and content type are part of the signature.
+    When the client sends the file's SHA-256 and that content is already stored
+    (UPLOAD_DEDUP_ENABLED), method is "none" and nothing has to be uploaded.
+    
+    Args:
+        request: Filename, exact size and optional SHA-256 of the file
+        current_user: Current authenticated user
+        db: Database session
+        r2: Shared pooled R2 client
+    
+    Returns:
+        Upload token, presigned URL(s) and headers the PUT requests must send
+    
+    Raises:
+        HTTPException: If the file is invalid or R2 cannot start the upload
+    """
+    if not validate_file_extension(request.filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not supported. Allowed extensions: {', '.join(settings.allowed_file_extensions_list)}"
+        )
+    if request.size > settings.max_file_size_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size exceeds maximum allowed size of {settings.max_file_size_mb}MB"
+        )
+    
+    cleaned_filename = clean_filename(request.filename)
+    content_type = mimetypes.guess_type(cleaned_filename)[0] or "application/octet-stream"
+    sha256 = request.sha256.lower() if request.sha256 else None
+    claims = {
+        "purpose": "upload",
+        "uid": current_user.id,
+        "file_uid": str(uuid.uuid4()),
+        "filename": cleaned_filename,
+        "size": request.size,
+        "content_type": content_type,
+    }
+    # The token outlives the URLs so an upload finishing near expiry can still be completed
+    token_lifetime = timedelta(seconds=2 * settings.r2_presign_expires_seconds)
+    
+    # Stored hashes are computed from the stored bytes, so the declared hash only
+    # finds content that really has it
+    existing = None
+    if sha256 and settings.upload_dedup_enabled:
+        existing = (await find_stored_objects(db, [sha256])).get(sha256)
+    if existing is not None:
+        claims.update({"method": "none", "key": existing.absolute_path, "url": existing.url, "sha256": sha256})
+        return PresignUploadResponse(
+            upload_token=create_access_token(claims, token_lifetime),
+            method="none",
+            key=existing.absolute_path,
+            expires_in=settings.r2_presign_expires_seconds,
+            deduplicated=True
+        )
+    
+    r2_path = r2_object_key(cleaned_filename)
+    try:
+        upload = await presign_upload(
+            r2.client,
+            settings.r2_bucket_name,
+            r2_path,
+            request.size,
+            content_type,
+            settings.r2_presign_expires_seconds,
+            sha256
+        )
+    except Exception as r2_error:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=r2_error_detail(r2_error)
+        )
+    
+    claims.update({"method": upload["method"], "key": r2_path, "url": public_url(r2_path)})
+    if upload["method"] == "multipart":
+        claims["upload_id"] = upload["upload_id"]
+    if sha256:
+        # Checked against the stored bytes by /api/upload/complete (and by R2 on single PUTs)
+        claims["sha256"] = sha256
+    return PresignUploadResponse(
+        upload_token=create_access_token(claims, token_lifetime),
+        method=upload["method"],
+        key=r2_path,
+        url=upload.get("url"),
+        headers=upload["headers"],
+        parts=upload.get("parts", []),
+        expires_in=settings.r2_presign_expires_seconds
+    )
+
+
+@router.post("/upload/complete", response_model=UploadResponse)
+async def complete_direct_upload(
+    request: CompleteUploadRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    lexical_index: Optional[LexicalIndex] = Depends(get_lexical_index),
+    r2: R2Storage = Depends(get_r2_storage),
+    sync_scheduler: SyncScheduler = Depends(get_sync_scheduler)
+):
+    """
+    Finish a direct-to-R2 upload (authenticated).
+    Completes the multipart upload if there is one, checks the object with a HEAD
+    request (size and content type), then streams it once to compute its SHA-256
+    (and to index its text when LEXICAL_INDEX_ENABLED). Only this computed hash is
+    recorded for deduplication. Saves the file row and schedules the AI Search sync.
+    An object that does not match what was presigned (size, content type or the
+    declared SHA-256) is deleted.
+    
+    Args:
+        request: Upload token from /api/upload/presign and, for multipart uploads, the part ETags
+        current_user: Current authenticated user
+        db: Database session
+        lexical_index: Shared BM25 index of uploaded documents (None when disabled)
+        r2: Shared pooled R2 client
+        sync_scheduler: Shared AI Search sync scheduler
+    
+    Returns:
+        Upload response with file information
+    
+    Raises:
+        HTTPException: If the token is invalid, the object is missing or does not match,
+            or the upload was already completed
+    """
+    claims = decode_upload_token(request.upload_token)
+    if claims is None or claims.get("uid") != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired upload token. Please start the upload again."
+        )
+    
+    # One file row per upload token
+    result = await db.execute(select(FileModel.id).where(FileModel.uid == claims["file_uid"]))
+    if result.first() is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This upload has already been completed"
+        )
+    
+    r2_path = claims["key"]
+    deduplicated = claims["method"] == "none"
+    if claims["method"] == "multipart":
+        if not request.parts:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The ETag of every uploaded part is required to complete a multipart upload"
+            )
+        try:
+            await r2.client.complete_multipart_upload(
+                Bucket=settings.r2_bucket_name,
+                Key=r2_path,
+                UploadId=claims["upload_id"],
+                MultipartUpload={"Parts": [
+                    {"PartNumber": part.part_number, "ETag": part.etag}
+                    for part in sorted(request.parts, key=lambda part: part.part_number)
+                ]}
+            )
+        except ClientError as r2_error:
+            if r2_error.response.get("Error", {}).get("Code") == "NoSuchUpload":
+                # Completed (or aborted) by a concurrent request with the same token
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="This upload has already been completed"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Could not complete the multipart upload: {r2_error}"
+            )
+    
+    if not deduplicated:
+        try:
+            head = await r2.client.head_object(Bucket=settings.r2_bucket_name, Key=r2_path)
+        except ClientError as r2_error:
+            if r2_error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="The file was not found in R2. Upload it to the presigned URL before completing."
+                )
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=r2_error_detail(r2_error)
+            )
+        
+        # The signature already pins size and type; never record an object that does not match
+        stored_type = head.get("ContentType", "").split(";")[0].strip()
+        if head["ContentLength"] != claims["size"] or stored_type != claims["content_type"]:
+            await delete_rejected_object(r2, r2_path)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Uploaded file does not match the presigned upload ({claims['size']} bytes of {claims['content_type']} expected)"
+            )
+        
+        # A wrong hash in the dedup index would point later uploads at this object, so
+        # hash the stored bytes; the BM25 index needs them too (spooled, on disk above one part)
+        with tempfile.SpooledTemporaryFile(max_size=part_size()) as spool:
+            try:
+                _, sha256 = await hash_object(
+                    r2.client, settings.r2_bucket_name, r2_path,
+                    copy_to=spool if lexical_index is not None else None
+                )
+            except Exception as r2_error:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=r2_error_detail(r2_error)
+                )
+            if claims.get("sha256") and sha256 != claims["sha256"]:
+                await delete_rejected_object(r2, r2_path)
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Uploaded file does not match the SHA-256 sent to /api/upload/presign"
+                )
+            
+            # Indexed before the row is saved, while the spooled copy exists (re-adding a document is a no-op)
+            if lexical_index is not None:
+                try:
+                    spool.seek(0)
+                    await index_document(lexical_index, settings.lexical_index_path, r2_path, claims["filename"], spool)
+                except Exception as index_error:
+                    print(f"Warning: Could not add file to lexical index: {index_error}")
+    else:
+        # Content found by a stored (computed) hash
+        sha256 = claims["sha256"]
+    
+    # Save file metadata to database
+    try:
+        new_file = FileModel(
+            uid=claims["file_uid"],
+            user_id=current_user.id,
+            absolute_path=r2_path,
+            url=claims["url"],
+            sha256=sha256
+        )
+        db.add(new_file)
+        await db.commit()
+        row_counts.add(FILES)
+        list_cache.invalidate(FILES)
+        change_feed.notify()
+    except IntegrityError:
+        # A concurrent request with the same token passed the check above and saved the row first
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This upload has already been completed"
+        )
+    except Exception as db_error:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database Error: Failed to save file metadata to database: {str(db_error)}"
+        )
+    
+    if deduplicated:
+        return UploadResponse(
+            success=True,
+            message="File uploaded successfully. Identical content is already stored; the existing file is reused and no AI Search sync is needed",
+            file_uid=new_file.uid,
+            url=new_file.url,
+            size=claims["size"],
+            sha256=new_file.sha256,
+            deduplicated=True,
+            sync=sync_scheduler.status()
+        )
+    
+    # New documents change retrieval results: drop cached AI answers
+    try:
+        await answer_cache.invalidate(db)
+        await db.commit()
+    except Exception as cache_error:
+        await db.rollback()
+        print(f"Warning: Could not invalidate answer cache: {cache_error}")
+    
+    # Mark the AI Search index dirty; the scheduler coalesces syncs across uploads
+    sync = sync_scheduler.mark_dirty()
+    
+    return UploadResponse(
+        success=True,
+        message=f"File uploaded successfully. {describe_sync(sync)}",
+        file_uid=new_file.uid,
+        url=new_file.url,
+        size=claims["size"],
+        sha256=new_file.sha256,
+        sync=sync
+    )
+
+
+@router.get("/upload/sync")
+async def get_sync_status(
+    current_user: User = Depends(get_current_user),
+    sync_scheduler: SyncScheduler = Depends(get_sync_scheduler)
+):
+    """
+    Get the AI Search sync state (authenticated).
+    
+    Args:
+        current_user: Current authenticated user
+        sync_scheduler: Shared AI Search sync scheduler
+    
+    Returns:
+        Current sync state, sync counters and recent sync jobs
+    """
+    return sync_scheduler.stats()
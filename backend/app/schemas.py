@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation.
 """
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -115,6 +115,21 @@ class ResponsePublicResponse(BaseModel):
     created_at: datetime
 
 
+class ResponseSummaryResponse(BaseModel):
+    """Public response list item with a snippet of the answer (full text: /api/results/{uid})"""
+    uid: str
+    question: str
+    snippet: str
+    truncated: bool
+    probability_percentage: Optional[int] = None
+    created_at: datetime
+
+
+class ResponseSearchResult(ResponseSummaryResponse):
+    """Search hit (/api/results/search) with its relevance"""
+    score: float
+
+
 # ============= Request Schemas =============
 
 class AIRequestSchema(BaseModel):
@@ -139,16 +154,115 @@ class AIResponseSchema(BaseModel):
     response: str
     probability_percentage: Optional[int] = None
     created_at: datetime
+    cached: bool = False
+
+
+class AIBatchRequestSchema(BaseModel):
+    """AI batch request schema"""
+    questions: List[Annotated[str, Field(min_length=1, max_length=5000)]] = Field(..., min_length=1)
+
+
+class AIBatchItemResult(BaseModel):
+    """Result of a single question in a batch (either an answer or an error)"""
+    index: int
+    question: str
+    response: Optional[str] = None
+    probability_percentage: Optional[int] = None
+    created_at: Optional[datetime] = None
+    cached: bool = False
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+class AIBatchResponseSchema(BaseModel):
+    """AI batch response schema (results in input order)"""
+    results: List[AIBatchItemResult]
+    succeeded: int
+    failed: int
 
 
 # ============= Upload Schemas =============
 
+class SyncStatus(BaseModel):
+    """AI Search sync scheduler state"""
+    state: str
+    pending_uploads: int
+    next_sync_in_seconds: Optional[float] = None
+    current_job_id: Optional[str] = None
+    last_job_id: Optional[str] = None
+    last_error: Optional[str] = None
+
+
 class UploadResponse(BaseModel):
     """Upload response schema"""
     success: bool
     message: str
     file_uid: Optional[str] = None
     url: Optional[str] = None
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    deduplicated: bool = False
+    sync: Optional[SyncStatus] = None
+
+
+class UploadBatchItemResult(BaseModel):
+    """Result of a single file in a batch upload (either stored or an error)"""
+    index: int
+    filename: str
+    file_uid: Optional[str] = None
+    url: Optional[str] = None
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    deduplicated: bool = False
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+class UploadBatchResponse(BaseModel):
+    """Batch upload response schema (results in input order)"""
+    message: str
+    results: List[UploadBatchItemResult]
+    succeeded: int
+    failed: int
+    sync: Optional[SyncStatus] = None
+
+
+class PresignUploadRequest(BaseModel):
+    """Direct-to-R2 upload request schema"""
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., ge=0)
+    sha256: Optional[str] = Field(None, pattern=r"^[0-9a-fA-F]{64}$")
+
+
+class PresignedPart(BaseModel):
+    """Presigned URL of one multipart upload part"""
+    part_number: int
+    url: str
+    size: int
+
+
+class PresignUploadResponse(BaseModel):
+    """Presigned upload schema (method is put, multipart or none when the content is already stored)"""
+    upload_token: str
+    method: str
+    key: str
+    url: Optional[str] = None
+    headers: Dict[str, str] = {}
+    parts: List[PresignedPart] = []
+    expires_in: int
+    deduplicated: bool = False
+
+
+class CompletedPart(BaseModel):
+    """Uploaded multipart part (ETag response header of the part PUT)"""
+    part_number: int = Field(..., ge=1, le=10000)
+    etag: str = Field(..., min_length=1)
+
+
+class CompleteUploadRequest(BaseModel):
+    """Direct-to-R2 upload completion schema"""
+    upload_token: str
+    parts: List[CompletedPart] = []
 
 
 # ============= Generic Schemas =============
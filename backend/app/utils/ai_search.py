@@ -0,0 +1,237 @@
+"""
+Cloudflare AI Search client helpers.
+"""
+import json
+from typing import AsyncIterator
+
+import httpx
+from app.config import settings
+from app.utils.answer_cache import make_cache_key
+from app.utils.resilience import ai_search_upstream, is_retryable
+from fastapi import HTTPException, status
+
+# System message to guide the AI to return structured probability analysis
+AI_SEARCH_SYSTEM_MESSAGE = """You are an expert exoplanet analyst. When analyzing celestial bodies:
+
+1. Review the available data about the celestial body
+2. Provide a brief analysis of its characteristics
+3. Conclude with your probability assessment
+
+CRITICAL FORMAT REQUIREMENT:
+You MUST include the probability percentage in your response using ONE of these formats:
+- "the probability is approximately XX%"
+- "probability of XX%"
+- If you find a koi_score value (0.0 to 1.0), convert it to percentage (multiply by 100)
+
+The probability MUST be a number between 0 and 100.
+
+Example response:
+"Based on the koi_score of 0.98, this celestial body shows strong indicators of being an exoplanet. The high score suggests excellent confidence in the detection. The probability is approximately 98%."
+
+If insufficient data is provided, respond with your best analysis but DO NOT include a percentage."""
+
+# Retrieval parameters sent to AI Search (also part of the answer cache key)
+AI_SEARCH_MAX_NUM_RESULTS = 10
+AI_SEARCH_REWRITE_QUERY = False
+
+NO_RESPONSE_TEXT = "No response was generated by the AI model. Please try rephrasing your question."
+
+
+def ai_search_url() -> str:
+    """Get the Cloudflare AI Search endpoint URL"""
+    return f"{settings.cloudflare_api_base_url}/accounts/{settings.cloudflare_account_id}/autorag/rags/{settings.ai_search_name}/ai-search"
+
+
+def cloudflare_headers() -> dict:
+    """Get the authorization headers for the Cloudflare API"""
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {settings.cloudflare_api_token}"
+    }
+
+
+def build_payload(query: str, stream: bool = False) -> dict:
+    """
+    Build the AI Search request payload.
+    
+    Args:
+        query: User question
+        stream: Whether to request a streamed (SSE) response
+    
+    Returns:
+        JSON payload
+    """
+    return {
+        "query": query,
+        "max_num_results": AI_SEARCH_MAX_NUM_RESULTS,
+        "rewrite_query": AI_SEARCH_REWRITE_QUERY,
+        "stream": stream,
+        "system_message": AI_SEARCH_SYSTEM_MESSAGE
+    }
+
+
+def answer_cache_key(query: str) -> str:
+    """
+    Get the answer cache key for a question with the current retrieval parameters.
+    
+    Args:
+        query: User question
+    
+    Returns:
+        Cache key
+    """
+    return make_cache_key(query, AI_SEARCH_SYSTEM_MESSAGE, AI_SEARCH_MAX_NUM_RESULTS, AI_SEARCH_REWRITE_QUERY)
+
+
+async def query_ai_search(client: httpx.AsyncClient, query: str) -> str:
+    """
+    Send a query to Cloudflare AI Search and return the generated text.
+    
+    Transient failures are retried and the circuit breaker is consulted
+    (see app/utils/resilience.py).
+    
+    Args:
+        client: Shared HTTP client for the Cloudflare API
+        query: User question
+    
+    Returns:
+        Generated response text (empty string if the model returned nothing)
+    
+    Raises:
+        httpx.HTTPError: On transport or HTTP status errors (after retries)
+        HTTPException: If AI Search reports an unsuccessful response or the circuit is open
+    """
+    async def attempt() -> httpx.Response:
+        response = await client.post(
+            ai_search_url(),
+            json=build_payload(query),
+            headers=cloudflare_headers(),
+            timeout=settings.ai_search_timeout
+        )
+        response.raise_for_status()
+        return response
+    
+    response = await ai_search_upstream.call(attempt)
+    ai_result = response.json()
+    
+    # Extract response from the API result
+    if not ai_result.get("success", False):
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Cloudflare AI Search returned unsuccessful response: {ai_result.get('errors', 'Unknown error')}"
+        )
+    
+    # Get the generated response text
+    return ai_result.get("result", {}).get("response", "")
+
+
+async def stream_ai_search(client: httpx.AsyncClient, query: str) -> AsyncIterator[str]:
+    """
+    Send a query to Cloudflare AI Search with streaming enabled and yield text tokens.
+    
+    The upstream answers with Server-Sent Events whose data lines carry JSON
+    objects such as {"response": "token"}, terminated by "data: [DONE]".
+    Streams are not retried (fragments may already be relayed), but they
+    report to and are gated by the AI Search circuit breaker.
+    
+    Args:
+        client: Shared HTTP client for the Cloudflare API
+        query: User question
+    
+    Yields:
+        Response text fragments as they arrive
+    
+    Raises:
+        httpx.HTTPError: On transport or HTTP status errors
+        CircuitOpenError: If the circuit is open
+    """
+    breaker = ai_search_upstream.breaker
+    breaker.acquire()
+    try:
+        async for token in _relay_stream(client, query):
+            yield token
+    except Exception as error:
+        if is_retryable(error):
+            breaker.on_failure()
+        else:
+            breaker.release()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.on_success()
+
+
+async def _relay_stream(client: httpx.AsyncClient, query: str) -> AsyncIterator[str]:
+    async with client.stream(
+        "POST",
+        ai_search_url(),
+        json=build_payload(query, stream=True),
+        headers=cloudflare_headers(),
+        timeout=settings.ai_search_timeout
+    ) as response:
+        if response.is_error:
+            # Load the body so error handlers can read the upstream error message
+            await response.aread()
+        response.raise_for_status()
+        
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            token = chunk.get("response") if isinstance(chunk, dict) else None
+            if token:
+                yield token
+
+
+def ai_search_http_exception(error: httpx.HTTPError) -> HTTPException:
+    """
+    Translate an httpx error from AI Search into an HTTPException.
+    
+    Args:
+        error: Error raised while calling AI Search
+    
+    Returns:
+        HTTPException with a descriptive message
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        # HTTP error from Cloudflare API
+        error_detail = f"Cloudflare AI Search API error (HTTP {error.response.status_code})"
+        
+        if error.response.status_code == 401:
+            error_detail = "Cloudflare AI Authentication Error: Invalid API token. Please verify CLOUDFLARE_API_TOKEN in .env file."
+        elif error.response.status_code == 403:
+            error_detail = "Cloudflare AI Permission Error: API token does not have access to AI Search. Please verify token permissions."
+        elif error.response.status_code == 404:
+            error_detail = f"Cloudflare AI Search Error: The AI Search '{settings.ai_search_name}' does not exist. Please verify AI_SEARCH_NAME in .env file."
+        else:
+            try:
+                error_data = error.response.json()
+                error_detail = f"Cloudflare AI API Error: {error_data.get('errors', [{}])[0].get('message', str(error))}"
+            except:
+                error_detail = f"Cloudflare AI API Error: {str(error)}"
+        
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=error_detail
+        )
+    if isinstance(error, httpx.TimeoutException):
+        return HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Cloudflare AI Search request timed out. The service may be overloaded or slow to respond."
+        )
+    if isinstance(error, httpx.ConnectError):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Cloudflare AI Connection Error: Unable to connect to Cloudflare AI Search API. Please check your internet connection."
+        )
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Cloudflare AI Network Error: {str(error)}"
+    )
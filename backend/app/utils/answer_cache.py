@@ -0,0 +1,322 @@
+"""
+Exact-match answer cache for AI Search requests.
+
+Two tiers:
+- In-process LRU (OrderedDict) with per-entry TTL, answers in microseconds.
+- Persistent tier in the `answer_cache` table, shared by all workers and
+  surviving restarts.
+
+invalidate() deletes the persistent tier and bumps the generation in the
+`answer_cache_generation` table. Every worker re-reads the generation at most
+every ANSWER_CACHE_GENERATION_CHECK_SECONDS (on lookups) and clears its LRU
+tier when it changed, so answers invalidated by another worker are served for
+at most that long. Without the persistent tier the cache is per worker and
+invalidations stay local.
+"""
+import hashlib
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from app.config import settings
+from app.models import AnswerCacheEntry, AnswerCacheGeneration
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Primary key of the single answer_cache_generation row
+GENERATION_ID = 1
+
+
+@dataclass
+class CachedAnswer:
+    """Cached AI answer"""
+    response: str
+    probability_percentage: Optional[int]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a question so trivially different spellings share a cache entry.
+    
+    Args:
+        query: Raw question text
+    
+    Returns:
+        Unicode-normalized, case-folded text with collapsed whitespace
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def make_cache_key(query: str, system_message: str, max_num_results: int, rewrite_query: bool) -> str:
+    """
+    Build the cache key for a question and its retrieval parameters.
+    
+    Args:
+        query: Question text
+        system_message: System message sent to AI Search
+        max_num_results: Number of retrieved chunks
+        rewrite_query: Whether AI Search rewrites the query
+    
+    Returns:
+        SHA-256 hex digest
+    """
+    material = "\x1f".join([
+        normalize_query(query),
+        system_message,
+        str(max_num_results),
+        "1" if rewrite_query else "0",
+    ])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    Two-tier (LRU + database) cache of AI answers keyed by make_cache_key().
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: int, enabled: bool = True, persistent: bool = True,
+                 generation_check_seconds: float = 2.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.persistent = persistent
+        self.generation_check_seconds = generation_check_seconds
+        self._entries: "OrderedDict[str, tuple[float, CachedAnswer]]" = OrderedDict()
+        self._generation: Optional[int] = None
+        self._generation_checked_at = 0.0
+        self.local_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+    
+    def _get_local(self, key: str) -> Optional[CachedAnswer]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, answer = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return answer
+    
+    def _set_local(self, key: str, answer: CachedAnswer, ttl_seconds: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl_seconds, answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    async def _check_generation(self, db: AsyncSession) -> None:
+        """Clear the LRU tier if the cache was invalidated since the last check (by any worker)"""
+        if not self.persistent:
+            return
+        now = time.monotonic()
+        if self._generation is not None and now - self._generation_checked_at < self.generation_check_seconds:
+            return
+        generation = await db.scalar(
+            select(AnswerCacheGeneration.generation).where(AnswerCacheGeneration.id == GENERATION_ID)
+        ) or 0
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+        self._generation_checked_at = now
+    
+    async def get(self, db: AsyncSession, key: str) -> Optional[CachedAnswer]:
+        """
+        Look up an answer, first in memory and then in the database.
+        
+        Args:
+            db: Database session
+            key: Cache key
+        
+        Returns:
+            CachedAnswer on hit, None on miss
+        """
+        if not self.enabled:
+            return None
+        
+        await self._check_generation(db)
+        answer = self._get_local(key)
+        if answer is not None:
+            self.local_hits += 1
+            return answer
+        
+        if self.persistent:
+            now = datetime.utcnow()
+            result = await db.execute(
+                select(AnswerCacheEntry.response, AnswerCacheEntry.probability_percentage, AnswerCacheEntry.expires_at)
+                .where(AnswerCacheEntry.cache_key == key, AnswerCacheEntry.expires_at > now)
+            )
+            row = result.first()
+            if row is not None:
+                answer = CachedAnswer(response=row.response, probability_percentage=row.probability_percentage)
+                # Promote to the LRU tier for the remaining lifetime of the entry
+                self._set_local(key, answer, (row.expires_at - now).total_seconds())
+                self.persistent_hits += 1
+                return answer
+        
+        self.misses += 1
+        return None
+    
+    async def get_many(self, db: AsyncSession, keys: Iterable[str]) -> Dict[str, CachedAnswer]:
+        """
+        Look up many answers at once (one database query for all local misses).
+        
+        Args:
+            db: Database session
+            keys: Cache keys
+            
+        Returns:
+            Mapping of key to CachedAnswer for every hit
+        """
+        found: Dict[str, CachedAnswer] = {}
+        if not self.enabled:
+            return found
+        
+        await self._check_generation(db)
+        missing = []
+        for key in dict.fromkeys(keys):
+            answer = self._get_local(key)
+            if answer is not None:
+                self.local_hits += 1
+                found[key] = answer
+            else:
+                missing.append(key)
+        
+        if missing and self.persistent:
+            now = datetime.utcnow()
+            result = await db.execute(
+                select(AnswerCacheEntry.cache_key, AnswerCacheEntry.response, AnswerCacheEntry.probability_percentage, AnswerCacheEntry.expires_at)
+                .where(AnswerCacheEntry.cache_key.in_(missing), AnswerCacheEntry.expires_at > now)
+            )
+            for row in result:
+                answer = CachedAnswer(response=row.response, probability_percentage=row.probability_percentage)
+                self._set_local(row.cache_key, answer, (row.expires_at - now).total_seconds())
+                self.persistent_hits += 1
+                found[row.cache_key] = answer
+        
+        self.misses += sum(1 for key in missing if key not in found)
+        return found
+    
+    async def set(self, db: AsyncSession, key: str, question: str, response: str, probability_percentage: Optional[int]) -> None:
+        """
+        Store an answer in both tiers.
+        Failures of the persistent tier are logged and never propagate to the request.
+        
+        Args:
+            db: Database session
+            key: Cache key
+            question: Original question text
+            response: Answer text
+            probability_percentage: Extracted probability (if any)
+        """
+        if not self.enabled:
+            return
+        
+        self._set_local(key, CachedAnswer(response=response, probability_percentage=probability_percentage), self.ttl_seconds)
+        
+        if self.persistent:
+            now = datetime.utcnow()
+            try:
+                # merge() upserts, so expired rows for the same key are refreshed
+                await db.merge(AnswerCacheEntry(
+                    cache_key=key,
+                    question=question,
+                    response=response,
+                    probability_percentage=probability_percentage,
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl_seconds)
+                ))
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                print(f"Warning: Could not persist answer cache entry: {e}")
+    
+    async def set_many(self, db: AsyncSession, entries: List[tuple]) -> None:
+        """
+        Store many answers with a single commit.
+        Failures of the persistent tier are logged and never propagate to the request.
+        
+        Args:
+            db: Database session
+            entries: (key, question, response, probability_percentage) tuples
+        """
+        if not self.enabled or not entries:
+            return
+        
+        for key, _, response, probability_percentage in entries:
+            self._set_local(key, CachedAnswer(response=response, probability_percentage=probability_percentage), self.ttl_seconds)
+        
+        if self.persistent:
+            now = datetime.utcnow()
+            try:
+                for key, question, response, probability_percentage in entries:
+                    await db.merge(AnswerCacheEntry(
+                        cache_key=key,
+                        question=question,
+                        response=response,
+                        probability_percentage=probability_percentage,
+                        created_at=now,
+                        expires_at=now + timedelta(seconds=self.ttl_seconds)
+                    ))
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                print(f"Warning: Could not persist answer cache entries: {e}")
+    
+    async def invalidate(self, db: AsyncSession) -> None:
+        """
+        Drop every cached answer (e.g. after new documents are added to the index).
+        Other workers clear their LRU tier when they see the new generation.
+        The persistent delete and the generation bump are committed by the caller.
+        
+        Args:
+            db: Database session
+        """
+        self._entries.clear()
+        if self.enabled and self.persistent:
+            await db.execute(delete(AnswerCacheEntry))
+            now = datetime.utcnow()
+            result = await db.execute(
+                update(AnswerCacheGeneration)
+                .where(AnswerCacheGeneration.id == GENERATION_ID)
+                .values(generation=AnswerCacheGeneration.generation + 1, updated_at=now)
+            )
+            if result.rowcount == 0:
+                # The row is created by the schema scripts; only a bare database lacks it
+                db.add(AnswerCacheGeneration(id=GENERATION_ID, generation=1, updated_at=now))
+            # Answers cached from now on belong to the new generation (no second clear at the next check)
+            self._generation = await db.scalar(
+                select(AnswerCacheGeneration.generation).where(AnswerCacheGeneration.id == GENERATION_ID)
+            )
+            self._generation_checked_at = time.monotonic()
+    
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+        
+        Returns:
+            Dictionary with size and hit/miss counters
+        """
+        lookups = self.local_hits + self.persistent_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "generation": self._generation,
+            "local_hits": self.local_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.local_hits + self.persistent_hits) / lookups if lookups else 0.0,
+        }
+
+
+# Global answer cache instance
+answer_cache = AnswerCache(
+    max_entries=settings.answer_cache_max_entries,
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+    enabled=settings.answer_cache_enabled,
+    persistent=settings.answer_cache_persistent,
+    generation_check_seconds=settings.answer_cache_generation_check_seconds,
+)
@@ -0,0 +1,321 @@
+"""
+Change feed of new files and results, pushed to /api/events subscribers.
+
+Public pages used to poll the list and count endpoints every few seconds;
+now they subscribe to a Server-Sent Events stream instead. Code that inserts
+rows calls notify() after commit, and a single broadcaster task reads the new
+rows once, in (created_at, id) order, and appends the encoded events to every
+subscriber's buffer. Rows inserted by other workers are found through the
+row_counts watermark, checked every EVENTS_POLL_SECONDS.
+
+Rows can commit after newer rows (two concurrent requests, write-behind), so
+each pass re-reads the LATE_ROW_WINDOW_SECONDS before the position and skips
+the rows already published (by uid). Rows committed later than that are only
+seen after a reload.
+
+Buffers are bounded (EVENTS_SUBSCRIBER_BUFFER): a subscriber that does not
+keep up loses its oldest events and gets a reset event telling it to reload.
+
+Event ids hold the position of both tables ("<files cursor>.<results cursor>",
+cursors as in pagination.py), so a client reconnecting with Last-Event-ID gets
+the rows it missed replayed from the database (from the late row window before
+its position on, so clients drop rows they already have by uid).
+"""
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import File, Response
+from app.schemas import FilePublicResponse, ResponsePublicResponse
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.row_counts import FILES, RESPONSES, row_counts
+from app.utils.sse import format_sse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# (created_at, id) of the last row published, None before the first row
+Position = Optional[Tuple[datetime, int]]
+
+# Event name, model and public schema per table
+TABLES = {
+    FILES: ("file", File, FilePublicResponse),
+    RESPONSES: ("result", Response, ResponsePublicResponse),
+}
+
+
+def encode_event_id(positions: Dict[str, Position]) -> str:
+    """
+    Encode the position of every table as an event id.
+    
+    Args:
+        positions: Position per table
+    
+    Returns:
+        Event id
+    """
+    return ".".join(encode_cursor(*positions[name]) if positions[name] else "" for name in TABLES)
+
+
+def decode_event_id(event_id: str) -> Dict[str, Position]:
+    """
+    Decode an event id created by encode_event_id().
+    
+    Args:
+        event_id: Event id (Last-Event-ID)
+    
+    Returns:
+        Position per table
+    
+    Raises:
+        ValueError: If the event id is malformed
+    """
+    parts = event_id.split(".")
+    if len(parts) != len(TABLES):
+        raise ValueError("Invalid event id")
+    return {name: decode_cursor(part) if part else None for name, part in zip(TABLES, parts)}
+
+
+def _window_start(position: Position) -> Position:
+    """Position LATE_ROW_WINDOW_SECONDS before another one (reads start there)"""
+    if position is None:
+        return None
+    return position[0] - timedelta(seconds=settings.late_row_window_seconds), 0
+
+
+async def _rows_after(db: AsyncSession, name: str, after: Position, limit: int, until: Position = None) -> List[Any]:
+    """Rows after a position (and up to another one), oldest first"""
+    model = TABLES[name][1]
+    query = select(model)
+    if after:
+        query = query.where(or_(
+            model.created_at > after[0],
+            and_(model.created_at == after[0], model.id > after[1])
+        ))
+    if until:
+        query = query.where(or_(
+            model.created_at < until[0],
+            and_(model.created_at == until[0], model.id <= until[1])
+        ))
+    result = await db.execute(query.order_by(model.created_at, model.id).limit(limit))
+    return list(result.scalars().all())
+
+
+class _Subscriber:
+    """Bounded event buffer of one /api/events connection (drops the oldest event when full)"""
+    
+    def __init__(self):
+        self.events: Deque[str] = deque(maxlen=settings.events_subscriber_buffer)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+    
+    def push(self, event: str) -> None:
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append(event)
+        self.ready.set()
+
+
+class ChangeFeed:
+    """
+    In-process broadcaster of committed File and Response rows.
+    """
+    
+    def __init__(self):
+        self._subscribers: Set[_Subscriber] = set()
+        self._positions: Dict[str, Position] = {name: None for name in TABLES}
+        # uid -> created_at of the rows published within the late row window
+        # (None: not tracked, the rows up to the position count as published)
+        self._recent: Dict[str, Optional[Dict[str, datetime]]] = {name: None for name in TABLES}
+        self._seeded = False
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.notifications = 0
+        self.published = 0
+        self.replayed = 0
+        self.late = 0
+        self.dropped = 0
+    
+    def notify(self) -> None:
+        """
+        Signal that rows were committed (call after commit, next to row_counts.add()).
+        """
+        self.notifications += 1
+        self._changed.set()
+    
+    async def start(self) -> None:
+        """
+        Read the current position of every table and start the broadcaster task.
+        """
+        if self._task is not None:
+            return
+        try:
+            await self._seed()
+        except Exception as e:
+            # Seeded by the broadcaster task instead
+            print(f"⚠️  Warning: Could not seed change feed: {e}")
+        self._task = asyncio.create_task(self._run())
+    
+    async def _seed(self) -> None:
+        for name in TABLES:
+            self._positions[name] = await row_counts.watermark(name)
+        self._seeded = True
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), settings.events_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            try:
+                if not self._seeded:
+                    await self._seed()
+                else:
+                    await self._publish_new_rows()
+            except Exception as e:
+                print(f"⚠️  Warning: Could not read new rows for the change feed: {e}")
+    
+    async def _publish_new_rows(self) -> None:
+        for name in TABLES:
+            if not self._subscribers:
+                # Nobody to tell, skip the rows
+                watermark = await row_counts.watermark(name)
+                position = self._positions[name]
+                if watermark is not None and (position is None or watermark > position):
+                    self._positions[name] = watermark
+                self._recent[name] = None
+                continue
+            # Read every pass, not only when the watermark moves: a late row leaves it in place
+            async with AsyncSessionLocal() as db:
+                await self._publish_window(db, name)
+    
+    async def _publish_window(self, db: AsyncSession, name: str) -> None:
+        """Publish the rows from the late row window on that were not published yet"""
+        position = self._positions[name]
+        tracked = self._recent[name] is not None
+        recent = self._recent[name] = self._recent[name] or {}
+        after = _window_start(position)
+        while True:
+            rows = await _rows_after(db, name, after, settings.events_replay_limit)
+            for row in rows:
+                if row.uid in recent:
+                    continue
+                recent[row.uid] = row.created_at
+                if position is not None and (row.created_at, row.id) <= position:
+                    if not tracked:
+                        # Published before the window was tracked (or nobody was listening)
+                        continue
+                    self.late += 1
+                self._broadcast(self._event(name, row, self._positions))
+            if len(rows) < settings.events_replay_limit:
+                break
+            after = (rows[-1].created_at, rows[-1].id)
+        
+        oldest = _window_start(self._positions[name])
+        if oldest is not None:
+            for uid in [uid for uid, created_at in recent.items() if created_at < oldest[0]]:
+                del recent[uid]
+    
+    @staticmethod
+    def _event(name: str, row: Any, positions: Dict[str, Position]) -> str:
+        """Advance positions to row (unless it is a late one) and encode its event"""
+        event, _, schema = TABLES[name]
+        if positions[name] is None or (row.created_at, row.id) > positions[name]:
+            positions[name] = (row.created_at, row.id)
+        return format_sse(event, schema.model_validate(row).model_dump(mode="json"), encode_event_id(positions))
+    
+    def _broadcast(self, event: str) -> None:
+        self.published += 1
+        for subscriber in self._subscribers:
+            subscriber.push(event)
+    
+    async def _replay(self, last_event_id: str, until: Dict[str, Position]) -> List[str]:
+        """Events between a client's Last-Event-ID and the current positions"""
+        try:
+            positions = decode_event_id(last_event_id)
+        except ValueError:
+            return [format_sse("reset", {"reason": "invalid Last-Event-ID"})]
+        
+        missed = []
+        async with AsyncSessionLocal() as db:
+            for name in TABLES:
+                if until[name] is None:
+                    continue
+                rows = await _rows_after(db, name, _window_start(positions[name]), settings.events_replay_limit + 1, until[name])
+                if len(rows) > settings.events_replay_limit:
+                    return [format_sse("reset", {"reason": "too many missed events"})]
+                missed.extend((name, row) for row in rows)
+        
+        missed.sort(key=lambda item: item[1].created_at)
+        self.replayed += len(missed)
+        return [self._event(name, row, positions) for name, row in missed]
+    
+    async def subscribe(self, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream events to one client until it disconnects.
+        
+        Args:
+            last_event_id: Id of the last event the client received (replays what it missed)
+        
+        Yields:
+            Encoded events: missed rows, ready, then file / result / reset as they happen
+        """
+        subscriber = _Subscriber()
+        # Registered before reading the positions, so no event falls between replay and live
+        self._subscribers.add(subscriber)
+        try:
+            positions = dict(self._positions)
+            if last_event_id:
+                for event in await self._replay(last_event_id, positions):
+                    yield event
+            yield format_sse("ready", {}, encode_event_id(positions))
+            
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), settings.events_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # Comment line: keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                subscriber.ready.clear()
+                if subscriber.dropped:
+                    self.dropped += subscriber.dropped
+                    yield format_sse("reset", {"reason": "slow consumer", "dropped": subscriber.dropped})
+                    subscriber.dropped = 0
+                while subscriber.events:
+                    yield subscriber.events.popleft()
+        finally:
+            self._subscribers.discard(subscriber)
+    
+    async def stop(self) -> None:
+        """
+        Stop the broadcaster task.
+        """
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    
+    def stats(self) -> dict:
+        """
+        Get change feed counters.
+        
+        Returns:
+            Dictionary with subscribers, notifications, published, replayed, late and dropped events
+        """
+        return {
+            "subscribers": len(self._subscribers),
+            "notifications": self.notifications,
+            "published": self.published,
+            "replayed": self.replayed,
+            "late": self.late,
+            "dropped": self.dropped,
+        }
+
+
+# Global change feed for /api/events
+change_feed = ChangeFeed()
@@ -0,0 +1,227 @@
+"""
+Per-user fair scheduling of upstream (Cloudflare) capacity.
+
+- A global cap on in-flight upstream calls (SCHEDULER_MAX_IN_FLIGHT).
+- Excess calls wait in per-user queues served by weighted fair queuing:
+  every queued call gets a virtual finish tag of
+  max(virtual time, user's last tag) + 1 / weight, and free slots go to the
+  smallest tag, so a user with a deep queue cannot starve everyone else.
+- Admission control per user: a token bucket (SCHEDULER_USER_RATE per
+  second, SCHEDULER_USER_BURST) and a queue limit; rejected requests get
+  429 with a computed Retry-After.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple
+
+from app.config import settings
+from fastapi import HTTPException, status
+
+
+class UserState:
+    """Scheduling state and counters of one user"""
+    
+    def __init__(self, weight: float, burst: float):
+        self.weight = weight
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.finish_tag = 0.0
+        self.queued = 0
+        self.in_flight = 0
+        self.served = 0
+        self.rejected_rate = 0
+        self.rejected_queue = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+def parse_weights(value: str) -> Dict[str, float]:
+    """
+    Parse per-user weights ("alice:2,bob:0.5").
+    
+    Args:
+        value: Comma-separated user:weight pairs
+    
+    Returns:
+        Dictionary of username to weight
+    """
+    weights = {}
+    for pair in value.split(","):
+        if ":" in pair:
+            user, weight = pair.rsplit(":", 1)
+            weights[user.strip()] = float(weight)
+    return weights
+
+
+class FairScheduler:
+    """
+    Weighted fair queuing of upstream calls with per-user admission control.
+    """
+    
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue_per_user: int,
+        user_rate: float,
+        user_burst: float,
+        weights: Dict[str, float]
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue_per_user = max_queue_per_user
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.weights = weights
+        self._users: Dict[str, UserState] = {}
+        self._queue: List[Tuple[float, int, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._in_flight = 0
+        # Moving average of the time a call holds a slot (for Retry-After estimates)
+        self._service_seconds = 1.0
+    
+    def _user(self, user: str) -> UserState:
+        state = self._users.get(user)
+        if state is None:
+            state = UserState(self.weights.get(user, 1.0), self.user_burst)
+            self._users[user] = state
+        return state
+    
+    def _refill(self, state: UserState) -> None:
+        now = time.monotonic()
+        state.tokens = min(self.user_burst, state.tokens + (now - state.refilled_at) * self.user_rate)
+        state.refilled_at = now
+    
+    def _queue_retry_after(self, state: UserState) -> int:
+        """Estimated seconds until the user's queue has room again"""
+        active_weight = sum(s.weight for s in self._users.values() if s.queued or s.in_flight) or state.weight
+        share = max(1.0, self.max_in_flight * state.weight / active_weight)
+        return max(1, math.ceil(self._service_seconds * (state.queued + 1) / share))
+    
+    def admit(self, user: str) -> None:
+        """
+        Admission control for a request that will call the upstream.
+        
+        Args:
+            user: Username
+        
+        Raises:
+            HTTPException: 429 with Retry-After if the user's queue is full or rate exceeded
+        """
+        state = self._user(user)
+        if state.queued >= self.max_queue_per_user:
+            state.rejected_queue += 1
+            retry_after = self._queue_retry_after(state)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many queued AI requests ({state.queued}). Please retry in {retry_after} seconds.",
+                headers={"Retry-After": str(retry_after)}
+            )
+        
+        self._refill(state)
+        if state.tokens < 1:
+            state.rejected_rate += 1
+            retry_after = max(1, math.ceil((1 - state.tokens) / self.user_rate))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"AI request rate limit exceeded. Please retry in {retry_after} seconds.",
+                headers={"Retry-After": str(retry_after)}
+            )
+        state.tokens -= 1
+    
+    def _release(self) -> None:
+        """Hand the freed slot to the queued call with the smallest finish tag"""
+        while self._queue:
+            finish_tag, _, _, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue
+            self._virtual_time = max(self._virtual_time, finish_tag)
+            waiter.set_result(None)
+            return
+        self._in_flight -= 1
+    
+    @asynccontextmanager
+    async def slot(self, user: str) -> AsyncIterator[None]:
+        """
+        Hold one upstream slot, waiting in the user's fair queue if all are busy.
+        
+        Args:
+            user: Username the call is charged to
+        """
+        state = self._user(user)
+        enqueued_at = time.monotonic()
+        
+        if self._in_flight < self.max_in_flight:
+            # Free capacity means every queued entry left is a cancelled waiter
+            self._queue.clear()
+            self._in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            state.finish_tag = max(self._virtual_time, state.finish_tag) + 1.0 / state.weight
+            heapq.heappush(self._queue, (state.finish_tag, next(self._sequence), user, waiter))
+            state.queued += 1
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just before the cancellation: pass it on
+                    self._release()
+                waiter.cancel()
+                raise
+            finally:
+                state.queued -= 1
+        
+        waited = time.monotonic() - enqueued_at
+        state.wait_total += waited
+        state.wait_max = max(state.wait_max, waited)
+        state.in_flight += 1
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            state.in_flight -= 1
+            state.served += 1
+            self._service_seconds = 0.9 * self._service_seconds + 0.1 * (time.monotonic() - started_at)
+            self._release()
+    
+    def stats(self) -> dict:
+        """
+        Get global and per-user queue depths, wait times and rejections.
+        
+        Returns:
+            Dictionary for monitoring
+        """
+        users = {}
+        for user, state in self._users.items():
+            self._refill(state)
+            users[user] = {
+                "weight": state.weight,
+                "queued": state.queued,
+                "in_flight": state.in_flight,
+                "served": state.served,
+                "rejected_rate_limit": state.rejected_rate,
+                "rejected_queue_full": state.rejected_queue,
+                "avg_wait_ms": round(state.wait_total / state.served * 1000, 1) if state.served else 0.0,
+                "max_wait_ms": round(state.wait_max * 1000, 1),
+                "tokens": round(state.tokens, 2),
+            }
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "queued": sum(state.queued for state in self._users.values()),
+            "avg_service_ms": round(self._service_seconds * 1000, 1),
+            "users": users,
+        }
+
+
+# Global scheduler for AI Search / Workers AI calls
+upstream_scheduler = FairScheduler(
+    max_in_flight=settings.scheduler_max_in_flight,
+    max_queue_per_user=settings.scheduler_max_queue_per_user,
+    user_rate=settings.scheduler_user_rate,
+    user_burst=settings.scheduler_user_burst,
+    weights=parse_weights(settings.scheduler_user_weights)
+)
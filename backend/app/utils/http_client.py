@@ -0,0 +1,100 @@
+"""
+Shared, pooled HTTP clients for Cloudflare upstream APIs.
+"""
+import importlib.util
+from typing import Dict
+
+import httpx
+from app.config import settings
+
+# Upstream names
+CLOUDFLARE_API = "cloudflare_api"
+TURNSTILE = "turnstile"
+
+
+def http2_available() -> bool:
+    """
+    Check whether HTTP/2 can be negotiated (enabled in settings and 'h2' installed).
+    
+    Returns:
+        True if HTTP/2 should be enabled, False otherwise
+    """
+    return settings.http2_enabled and importlib.util.find_spec("h2") is not None
+
+
+class HTTPClientRegistry:
+    """
+    Application-scoped registry of keep-alive httpx clients, one per upstream.
+    
+    Clients are created once in the application lifespan and reused by every
+    request, so connections (DNS + TCP + TLS) are pooled instead of being
+    re-established on each call.
+    """
+    
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+    
+    def start(self) -> None:
+        """
+        Create the pooled clients for all known upstreams.
+        """
+        http2 = http2_available()
+        
+        self._clients[CLOUDFLARE_API] = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.cloudflare_api_max_connections,
+                max_keepalive_connections=settings.cloudflare_api_max_keepalive_connections,
+                keepalive_expiry=settings.cloudflare_api_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.ai_search_timeout,
+                connect=settings.cloudflare_api_connect_timeout,
+            ),
+        )
+        
+        self._clients[TURNSTILE] = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.turnstile_max_connections,
+                max_keepalive_connections=settings.turnstile_max_keepalive_connections,
+                keepalive_expiry=settings.turnstile_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(settings.turnstile_timeout),
+        )
+    
+    def get(self, name: str) -> httpx.AsyncClient:
+        """
+        Get the pooled client for an upstream.
+        
+        Args:
+            name: Upstream name (e.g. CLOUDFLARE_API)
+        
+        Returns:
+            Shared httpx.AsyncClient
+        
+        Raises:
+            RuntimeError: If the registry has not been started
+        """
+        client = self._clients.get(name)
+        if client is None:
+            raise RuntimeError(f"HTTP client '{name}' is not available. Was the registry started in the lifespan?")
+        return client
+    
+    @property
+    def cloudflare(self) -> httpx.AsyncClient:
+        """Client for api.cloudflare.com (AI Search and sync)"""
+        return self.get(CLOUDFLARE_API)
+    
+    @property
+    def turnstile(self) -> httpx.AsyncClient:
+        """Client for Turnstile siteverify"""
+        return self.get(TURNSTILE)
+    
+    async def aclose(self) -> None:
+        """
+        Close all clients and release their pooled connections.
+        """
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
@@ -54,3 +54,24 @@ def decode_access_token(token: str) -> Optional[TokenData]:
         return TokenData(user_id=user_id, username=username)
     except JWTError:
         return None
+
+
+def decode_upload_token(token: str) -> Optional[dict]:
+    """
+    Decode and validate a direct upload token (see /api/upload/presign).
+    
+    Upload tokens carry no user_id/sub claims, so they are never accepted as access tokens.
+    
+    Args:
+        token: JWT token to decode
+    
+    Returns:
+        Token claims if valid, None otherwise
+    """
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+    if payload.get("purpose") != "upload":
+        return None
+    return payload
@@ -0,0 +1,552 @@
+"""
+Local BM25 lexical index over uploaded documents.
+
+Dense retrieval handles exact identifiers ("KOI-7016.01", "Kepler-452 b") poorly,
+so uploaded documents are also split into passages and indexed here:
+
+- Tokens keep identifier punctuation ("koi-7016.01") and also index their parts
+  ("koi", "7016", "01"), so both exact and partial identifiers match.
+- Postings are compact arrays: passage ids delta-encoded in array('I') plus a
+  parallel array of term frequencies. Passages only get appended, so updates
+  on upload are cheap appends.
+- Query terms with long postings present in more than half of the passages
+  are skipped (their BM25 idf is ~0), so identifier queries resolve by
+  scanning a handful of postings.
+- The index file is a full snapshot. index_saver writes it in a worker thread
+  (pickling included), at most once per LEXICAL_INDEX_SAVE_DELAY_SECONDS.
+- Every worker process keeps its own index and saves it to the same file.
+  Saves hold an exclusive lock on '<path>.lock' and first append the
+  documents other workers saved since this worker last wrote the file, so
+  the file is the union of all workers' indexes (and each worker picks up
+  the others' uploads at its next save).
+"""
+import asyncio
+import heapq
+import importlib.util
+import json
+import math
+import os
+import pickle
+import re
+import tempfile
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from itertools import accumulate
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.config import settings
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Postings longer than this are skipped for terms found in most passages
+PRUNE_MIN_POSTINGS = 1000
+
+# Passage size in tokens (documents are split so answers can cite chunks)
+PASSAGE_TOKENS = 200
+
+# Identifier-friendly tokens: letters/digits joined by '-', '.', '_' or '/'
+_TOKEN = re.compile(r'[0-9a-z]+(?:[-._/][0-9a-z]+)*')
+_TOKEN_PART = re.compile(r'[0-9a-z]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms.
+    
+    Args:
+        text: Raw text
+    
+    Returns:
+        Lowercase terms; compound identifiers are followed by their parts
+    """
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(_TOKEN_PART.findall(token))
+    return terms
+
+
+def pdf_text_available() -> bool:
+    """
+    Check whether PDF text can be extracted ('pypdf' installed).
+    
+    Returns:
+        True if PDF documents can be indexed
+    """
+    return importlib.util.find_spec("pypdf") is not None
+
+
+def _flatten_json(value, prefix: str = "") -> List[str]:
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            lines.extend(_flatten_json(item, f"{prefix}{key} "))
+        return lines
+    if isinstance(value, list):
+        return [line for item in value for line in _flatten_json(item, prefix)]
+    return [f"{prefix}{value}"]
+
+
+def extract_text(filename: str, file: BinaryIO, max_bytes: Optional[int] = None) -> str:
+    """
+    Extract indexable text from an uploaded document.
+    
+    Blocking (file reads and PDF parsing): run it in a worker thread.
+    
+    Args:
+        filename: Original filename (the extension selects the parser)
+        file: Binary file positioned at the start of the document
+        max_bytes: Read at most this much text: bytes of a text file, characters
+            of PDF text (None for all of it)
+    
+    Returns:
+        Document text (empty if the format cannot be read)
+    """
+    extension = Path(filename).suffix.lower()
+    if extension == ".pdf":
+        if not pdf_text_available():
+            return ""
+        from pypdf import PdfReader
+        # pypdf reads objects from the file as the pages need them
+        reader = PdfReader(file)
+        pages, total = [], 0
+        for page in reader.pages:
+            if max_bytes is not None and total >= max_bytes:
+                break
+            pages.append(page.extract_text() or "")
+            total += len(pages[-1]) + 1
+        return "\n".join(pages)[:max_bytes]
+    
+    content = file.read(-1 if max_bytes is None else max_bytes)
+    text = content.decode("utf-8", errors="replace")
+    if extension == ".json":
+        try:
+            return "\n".join(_flatten_json(json.loads(text)))
+        except ValueError:
+            pass
+    return text
+
+
+@dataclass
+class Passage:
+    """Indexed passage of a document"""
+    source: str
+    position: int
+    text: str
+
+
+@dataclass
+class PreparedDocument:
+    """Tokenized passages ready to be appended to the index"""
+    source: str
+    passages: List[Tuple[str, Counter, int]]
+
+
+def prepare_document(source: str, text: str) -> PreparedDocument:
+    """
+    Split a document into passages and count their terms.
+    
+    This is the expensive part of indexing and touches no shared state, so it
+    can run in a worker thread.
+    
+    Args:
+        source: Document identifier (R2 path)
+        text: Document text
+    
+    Returns:
+        PreparedDocument for LexicalIndex.add_prepared()
+    """
+    words = text.split()
+    passages = []
+    for start in range(0, len(words), PASSAGE_TOKENS):
+        passage_text = " ".join(words[start:start + PASSAGE_TOKENS])
+        terms = tokenize(passage_text)
+        if terms:
+            passages.append((passage_text, Counter(terms), len(terms)))
+    return PreparedDocument(source=source, passages=passages)
+
+
+class LexicalIndex:
+    """
+    Append-only BM25 inverted index of document passages.
+    """
+    
+    def __init__(self):
+        self.passages: List[Passage] = []
+        self.lengths = array('I')
+        self.total_length = 0
+        # term -> (delta-encoded passage ids, term frequencies, last passage id)
+        self._postings: Dict[str, Tuple[array, array, int]] = {}
+        self.sources: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self.passages)
+    
+    def add_prepared(self, document: PreparedDocument) -> int:
+        """
+        Append a tokenized document (empty or already indexed documents are skipped).
+        
+        Args:
+            document: Output of prepare_document()
+        
+        Returns:
+            Number of passages added
+        """
+        if document.source in self.sources or not document.passages:
+            return 0
+        
+        for position, (text, counts, length) in enumerate(document.passages):
+            passage_id = len(self.passages)
+            self.passages.append(Passage(document.source, position, text))
+            self.lengths.append(length)
+            self.total_length += length
+            for term, frequency in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = (array('I'), array('I'), 0)
+                ids, frequencies, last = postings
+                ids.append(passage_id - last)
+                frequencies.append(frequency)
+                self._postings[term] = (ids, frequencies, passage_id)
+        
+        self.sources[document.source] = len(document.passages)
+        return len(document.passages)
+    
+    def add_document(self, source: str, text: str) -> int:
+        """
+        Tokenize and append a document.
+        
+        Args:
+            source: Document identifier (R2 path)
+            text: Document text
+        
+        Returns:
+            Number of passages added
+        """
+        return self.add_prepared(prepare_document(source, text))
+    
+    def documents(self, skip: Set[str] = frozenset()) -> Iterator[PreparedDocument]:
+        """
+        Re-tokenize the indexed documents (e.g. to append them to another index).
+        
+        Args:
+            skip: Sources to leave out
+        
+        Yields:
+            PreparedDocument per source, in indexing order
+        """
+        # add_prepared() appends the passages of a document contiguously
+        passage_id = 0
+        while passage_id < len(self.passages):
+            source = self.passages[passage_id].source
+            end = passage_id + self.sources[source]
+            if source not in skip:
+                passages = []
+                for passage in self.passages[passage_id:end]:
+                    terms = tokenize(passage.text)
+                    passages.append((passage.text, Counter(terms), len(terms)))
+                yield PreparedDocument(source=source, passages=passages)
+            passage_id = end
+    
+    def search(self, query: str, k: int = 10) -> List[Tuple[Passage, float]]:
+        """
+        Rank passages with BM25.
+        
+        Args:
+            query: Query text
+            k: Number of results
+        
+        Returns:
+            List of (passage, score) sorted by descending score
+        """
+        count = len(self.passages)
+        if not count:
+            return []
+        average_length = self.total_length / count
+        
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            ids, frequencies, _ = postings
+            document_frequency = len(ids)
+            # Terms in most passages of a large index carry (almost) no information
+            if document_frequency > PRUNE_MIN_POSTINGS and document_frequency * 2 > count:
+                continue
+            idf = math.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+            for passage_id, frequency in zip(accumulate(ids), frequencies):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[passage_id] / average_length)
+                scores[passage_id] = scores.get(passage_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.passages[passage_id], score) for passage_id, score in best]
+    
+    def stats(self) -> dict:
+        """
+        Get index size counters.
+        
+        Returns:
+            Dictionary with document, passage and term counts
+        """
+        return {
+            "documents": len(self.sources),
+            "passages": len(self.passages),
+            "terms": len(self._postings),
+            "postings": sum(len(ids) for ids, _, _ in self._postings.values()),
+        }
+    
+    def dumps(self) -> bytes:
+        """
+        Serialize the index.
+        
+        Returns:
+            Pickled index state
+        """
+        return pickle.dumps(self.__dict__, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """
+        Load an index saved with save_index_file(), or create an empty one.
+        
+        Args:
+            path: Index file path
+        
+        Returns:
+            LexicalIndex
+        """
+        index = cls()
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                index.__dict__.update(pickle.load(f))
+        return index
+
+
+def index_file_version(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Identify the current content of an index file.
+    
+    Args:
+        path: Index file path
+    
+    Returns:
+        (modification time in ns, size), None if the file does not exist
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class IndexFileLock:
+    """
+    Exclusive lock on '<index path>.lock', taken by every process writing the index file.
+    Blocking: acquire it in a worker thread from async code.
+    """
+    
+    def __init__(self, path: str):
+        self.path = f"{path}.lock"
+        self._file: Optional[BinaryIO] = None
+    
+    def acquire(self) -> None:
+        """Wait for the lock"""
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a+b")
+        if os.name == "nt":
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+    
+    def release(self) -> None:
+        """Release the lock"""
+        if self._file is None:
+            return
+        if os.name == "nt":
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+    
+    def __enter__(self) -> "IndexFileLock":
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+def read_new_documents(path: str, sources: Set[str], known_version: Optional[Tuple[int, int]]) -> List[PreparedDocument]:
+    """
+    Read the documents of an index file that an index lacks (saved by other processes).
+    
+    Blocking (unpickling and tokenizing): run it in a worker thread, holding the IndexFileLock.
+    
+    Args:
+        path: Index file path
+        sources: Sources already in the index
+        known_version: index_file_version() of the file when this process last read or wrote it
+    
+    Returns:
+        Documents to append (none if the file is unchanged or missing)
+    """
+    version = index_file_version(path)
+    if version is None or version == known_version:
+        return []
+    return list(LexicalIndex.load(path).documents(skip=sources))
+
+
+def write_index_file(path: str, data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Atomically write serialized index data (callers hold the IndexFileLock).
+    
+    Args:
+        path: Index file path
+        data: Output of LexicalIndex.dumps()
+    
+    Returns:
+        index_file_version() of the written file
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Unique temporary name: other processes may be writing the same index
+    with tempfile.NamedTemporaryFile(dir=target.parent, prefix=f"{target.name}.", suffix=".tmp", delete=False) as temporary:
+        temporary.write(data)
+    try:
+        os.replace(temporary.name, target)
+    except OSError:
+        os.unlink(temporary.name)
+        raise
+    return index_file_version(path)
+
+
+def save_index_file(path: str, data: bytes) -> None:
+    """
+    Atomically replace an index file (e.g. with a rebuilt index).
+    
+    Args:
+        path: Index file path
+        data: Output of LexicalIndex.dumps()
+    """
+    with IndexFileLock(path):
+        write_index_file(path, data)
+
+
+class IndexSaver:
+    """
+    Debounced background saves of lexical indexes.
+    
+    Uploads arriving within LEXICAL_INDEX_SAVE_DELAY_SECONDS share one save.
+    Saves pickle and write the index in a worker thread while holding lock,
+    which appends take too, so the index never changes while it is pickled.
+    Documents saved by other workers are appended first (on the event loop,
+    like every append), under the IndexFileLock of the file.
+    """
+    
+    def __init__(self, delay_seconds: float):
+        self.delay_seconds = delay_seconds
+        self.lock = asyncio.Lock()
+        self._pending: Dict[str, LexicalIndex] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush = asyncio.Event()
+        # index_file_version() of each file as last written by this process
+        self._versions: Dict[str, Optional[Tuple[int, int]]] = {}
+        self.scheduled = 0
+        self.saves = 0
+        self.merged_documents = 0
+    
+    def schedule(self, index: LexicalIndex, path: str) -> None:
+        """
+        Save an index after the delay (no-op without a path).
+        
+        Args:
+            index: Index to save
+            path: Index file path
+        """
+        if not path:
+            return
+        self._pending[path] = index
+        self.scheduled += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def _run(self) -> None:
+        try:
+            await asyncio.wait_for(self._flush.wait(), self.delay_seconds)
+        except asyncio.TimeoutError:
+            pass
+        await self._save_pending()
+    
+    async def _save_pending(self) -> None:
+        while self._pending:
+            path, index = self._pending.popitem()
+            file_lock = IndexFileLock(path)
+            try:
+                async with self.lock:
+                    await asyncio.to_thread(file_lock.acquire)
+                    try:
+                        documents = await asyncio.to_thread(read_new_documents, path, set(index.sources), self._versions.get(path))
+                        for document in documents:
+                            if index.add_prepared(document):
+                                self.merged_documents += 1
+                        self._versions[path] = await asyncio.to_thread(lambda: write_index_file(path, index.dumps()))
+                    finally:
+                        file_lock.release()
+                self.saves += 1
+            except Exception as e:
+                print(f"⚠️  Warning: Could not save lexical index '{path}': {e}")
+    
+    async def stop(self) -> None:
+        """
+        Write the pending saves now (on shutdown).
+        """
+        # Not cancelled: a save in progress holds the file lock
+        self._flush.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self._save_pending()
+        self._flush.clear()
+
+
+# Global saver of the lexical index file
+index_saver = IndexSaver(delay_seconds=settings.lexical_index_save_delay_seconds)
+
+
+async def index_document(index: LexicalIndex, path: str, source: str, filename: str, file: BinaryIO) -> int:
+    """
+    Extract, tokenize and append an uploaded document, then schedule a save of the index.
+    
+    Reading, parsing and tokenizing run in a worker thread, and at most
+    LEXICAL_INDEX_MAX_TEXT_MB of text is read; only the append happens on
+    the event loop (under index_saver.lock).
+    
+    Args:
+        index: Shared lexical index
+        path: Index file path (empty to keep the index in memory only)
+        source: Document identifier (R2 path)
+        filename: Original filename
+        file: Binary file positioned at the start of the document (e.g. the spooled upload)
+    
+    Returns:
+        Number of passages added
+    """
+    text = await asyncio.to_thread(extract_text, filename, file, settings.lexical_index_max_text_bytes)
+    prepared = await asyncio.to_thread(prepare_document, source, text)
+    async with index_saver.lock:
+        added = index.add_prepared(prepared)
+    if added:
+        index_saver.schedule(index, path)
+    return added
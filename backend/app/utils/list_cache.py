@@ -0,0 +1,251 @@
+"""
+Read-through cache of /api/files and /api/results pages.
+
+Pages are stored as serialized JSON bytes (plus their pagination headers), so
+a hit skips the session, the query, ORM hydration and validation.
+
+Keys are the list ETags (see row_counts.etag()), which contain the table's
+newest (created_at, id) and row count: a committed insert moves the
+watermark and with it every key of the table, so writes invalidate pages in
+every worker and in the shared tier without deleting anything. Inserts in
+this worker also drop the table's local pages right away.
+
+Two tiers:
+- In-process LRU (OrderedDict) with per-entry TTL.
+- Optional shared tier (LIST_CACHE_SHARED), pluggable through SharedCache
+  for multi-worker deployments. InMemorySharedCache is a fake for tests and
+  single-process setups.
+"""
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from app.config import settings
+
+# Shared tier names (LIST_CACHE_SHARED)
+NO_SHARED_CACHE = "none"
+MEMORY_SHARED_CACHE = "memory"
+
+
+@dataclass
+class CachedPage:
+    """Serialized list page"""
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    
+    def to_bytes(self) -> bytes:
+        """Encode for the shared tier (headers as a JSON line, then the body)"""
+        return json.dumps(self.headers).encode() + b"\n" + self.body
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedPage":
+        """Decode a value written by to_bytes()"""
+        headers, body = data.split(b"\n", 1)
+        return cls(body=body, headers=json.loads(headers))
+
+
+class SharedCache:
+    """
+    Interface of a cache shared by all workers (e.g. Redis or Memcached).
+    """
+    
+    name = "base"
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a value.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            Stored bytes, None if missing or expired
+        """
+        raise NotImplementedError
+    
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        """
+        Store a value.
+        
+        Args:
+            key: Cache key
+            value: Bytes to store
+            ttl_seconds: Time to live
+        """
+        raise NotImplementedError
+
+
+class InMemorySharedCache(SharedCache):
+    """
+    Process-local stand-in for a shared cache (tests, single-process setups).
+    """
+    
+    name = MEMORY_SHARED_CACHE
+    
+    def __init__(self):
+        self._values: Dict[str, tuple] = {}
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._values.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._values[key]
+            return None
+        return value
+    
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._values[key] = (time.monotonic() + ttl_seconds, value)
+
+
+def create_shared_cache() -> Optional[SharedCache]:
+    """
+    Create the shared tier selected by LIST_CACHE_SHARED.
+    
+    Returns:
+        SharedCache instance, None without a shared tier
+    
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    backend = settings.list_cache_shared.lower()
+    if backend == NO_SHARED_CACHE:
+        return None
+    if backend == MEMORY_SHARED_CACHE:
+        return InMemorySharedCache()
+    raise ValueError(f"Unknown LIST_CACHE_SHARED '{settings.list_cache_shared}'")
+
+
+class ListCache:
+    """
+    Two-tier (LRU + shared) cache of serialized list pages keyed by ETag.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: int, enabled: bool = True, shared: Optional[SharedCache] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.shared = shared
+        self._entries: "OrderedDict[str, tuple[float, CachedPage]]" = OrderedDict()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+        self.bytes_served = 0
+    
+    def _get_local(self, key: str) -> Optional[CachedPage]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, page = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return page
+    
+    def _set_local(self, key: str, page: CachedPage) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, page)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    async def get(self, name: str, etag: str) -> Optional[CachedPage]:
+        """
+        Look up a page, first in memory and then in the shared tier.
+        
+        Args:
+            name: Table (FILES or RESPONSES)
+            etag: ETag of the page
+        
+        Returns:
+            Cached page or None
+        """
+        if not self.enabled:
+            return None
+        key = f"{name}:{etag}"
+        page = self._get_local(key)
+        if page is not None:
+            self.local_hits += 1
+            self.bytes_served += len(page.body)
+            return page
+        
+        if self.shared is not None:
+            try:
+                value = await self.shared.get(key)
+            except Exception as e:
+                self.shared_errors += 1
+                print(f"⚠️  Warning: List cache shared tier read failed: {e}")
+                value = None
+            if value is not None:
+                page = CachedPage.from_bytes(value)
+                self._set_local(key, page)
+                self.shared_hits += 1
+                self.bytes_served += len(page.body)
+                return page
+        
+        self.misses += 1
+        return None
+    
+    async def set(self, name: str, etag: str, page: CachedPage) -> None:
+        """
+        Store a page in both tiers.
+        
+        Args:
+            name: Table (FILES or RESPONSES)
+            etag: ETag of the page
+            page: Serialized page
+        """
+        if not self.enabled:
+            return
+        key = f"{name}:{etag}"
+        self._set_local(key, page)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, page.to_bytes(), self.ttl_seconds)
+            except Exception as e:
+                self.shared_errors += 1
+                print(f"⚠️  Warning: List cache shared tier write failed: {e}")
+    
+    def invalidate(self, name: str) -> None:
+        """
+        Drop the local pages of a table (call after commit, next to row_counts.add()).
+        
+        Args:
+            name: Table (FILES or RESPONSES)
+        """
+        prefix = f"{name}:"
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+    
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+        
+        Returns:
+            Dictionary with size, hit/miss counters and bytes served from the cache
+        """
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "shared": self.shared.name if self.shared is not None else None,
+            "entries": len(self._entries),
+            "bytes": sum(len(page.body) for _, page in self._entries.values()),
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "shared_errors": self.shared_errors,
+            "hit_ratio": (self.local_hits + self.shared_hits) / lookups if lookups else 0.0,
+            "bytes_served": self.bytes_served,
+        }
+
+
+# Global list page cache (shared tier attached in the lifespan)
+list_cache = ListCache(
+    max_entries=settings.list_cache_max_entries,
+    ttl_seconds=settings.list_cache_ttl_seconds,
+    enabled=settings.list_cache_enabled,
+)
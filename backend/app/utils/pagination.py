@@ -0,0 +1,180 @@
+"""
+Keyset (cursor) pagination on (created_at, id).
+
+OFFSET pagination reads and discards every skipped row, so deep pages get
+slower as tables grow, and rows inserted between requests shift pages.
+A cursor instead names the last row returned; the next page starts right
+after it through the (created_at, id) index, so every page costs the same
+and concurrent inserts never duplicate or skip rows.
+
+Cursors are opaque to clients: URL-safe base64 of "<created_at>|<id>".
+The next cursor is returned in the X-Next-Cursor response header.
+
+The same cursor format marks the newest row (X-Watermark header), and
+fetch_since() returns the rows newer than such a watermark. Rows can commit
+after newer ones (concurrent requests, write-behind), so it also returns the
+rows of a short window before the watermark again; clients skip the ones they
+already have (by uid).
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import Result, Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+WATERMARK_HEADER = "X-Watermark"
+TRUNCATED_HEADER = "X-Delta-Truncated"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    Encode the position of a row as an opaque cursor.
+    
+    Args:
+        created_at: Row creation time
+        row_id: Row primary key
+    
+    Returns:
+        Cursor token
+    """
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor created by encode_cursor().
+    
+    Args:
+        cursor: Cursor token
+    
+    Returns:
+        (created_at, id) of the last row of the previous page
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _rows(result: Result, query: Select) -> List[Any]:
+    # select(Model) returns entities, select(column, ...) returns Row tuples (no ORM identity map)
+    if len(query.column_descriptions) == 1:
+        return list(result.scalars().all())
+    return list(result.all())
+
+
+async def fetch_page(
+    db: AsyncSession,
+    query: Select,
+    model: Any,
+    page_size: int,
+    cursor: Optional[str] = None,
+    page: int = 1
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one page of rows, newest first.
+    
+    Args:
+        db: Database session
+        query: SELECT of the model, or of columns including created_at and id (filters allowed, no ordering)
+        model: Mapped class with created_at and id columns
+        page_size: Rows per page
+        cursor: Cursor from a previous page (takes precedence over page)
+        page: 1-indexed page number (OFFSET, kept for backwards compatibility)
+    
+    Returns:
+        Rows and the cursor of the next page (None on the last page)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # Expanded form of (created_at, id) < (:created_at, :id), which MySQL turns into an index range
+        query = query.where(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+    elif page > 1:
+        query = query.offset((page - 1) * page_size)
+    
+    # One extra row tells whether there is a next page
+    result = await db.execute(query.limit(page_size + 1))
+    rows = _rows(result, query)
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+async def fetch_since(
+    db: AsyncSession,
+    query: Select,
+    model: Any,
+    since: str,
+    page_size: int,
+    window_seconds: float = 0
+) -> Tuple[List[Any], bool]:
+    """
+    Fetch the rows newer than a watermark, newest first.
+    With window_seconds, rows up to that much older than the watermark are
+    included too, so rows committed after newer ones are not missed.
+    
+    Args:
+        db: Database session
+        query: SELECT of the model, or of columns including created_at and id (filters allowed, no ordering)
+        model: Mapped class with created_at and id columns
+        since: Watermark (X-Watermark) of the client's last response
+        page_size: Maximum rows returned
+        window_seconds: Late row window before the watermark
+    
+    Returns:
+        Rows and whether more than page_size rows are newer (the client should reload)
+    
+    Raises:
+        ValueError: If the watermark is malformed
+    """
+    created_at, row_id = decode_cursor(since)
+    if window_seconds > 0:
+        newer = model.created_at >= created_at - timedelta(seconds=window_seconds)
+    else:
+        newer = or_(
+            model.created_at > created_at,
+            and_(model.created_at == created_at, model.id > row_id)
+        )
+    result = await db.execute(
+        query
+        .where(newer)
+        .order_by(model.created_at.desc(), model.id.desc())
+        .limit(page_size + 1)
+    )
+    rows = _rows(result, query)
+    return rows[:page_size], len(rows) > page_size
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against the current ETag.
+    
+    Args:
+        if_none_match: Header value (one or more ETags, or *)
+        etag: Current quoted ETag
+    
+    Returns:
+        True if the client's copy is current (answer 304)
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
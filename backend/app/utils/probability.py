@@ -0,0 +1,107 @@
+"""
+Probability percentage extraction from AI responses.
+
+The patterns are compiled once at import time. Candidates are looked up in
+priority order by anchored forward searches. Each stage of a multi-part pattern
+("probability" -> "is" -> "XX%") resumes at the end of the previous stage
+instead of backtracking through `.*?` with re.DOTALL. Every stage is a
+literal-prefixed forward search, so the worst-case cost is linear in the length
+of the response. The old sequential searches were super-linear on long answers
+that mention "probability" but contain no percentage. Results are identical to
+the old patterns.
+"""
+import re
+from typing import Optional, Tuple
+
+# 1. "PROBABILITY: XX%" or "Probability: XX%"
+_LABEL = re.compile(r'PROBABILITY:\s*(\d+)%', re.IGNORECASE)
+
+# 2. "... is approximately **XX%**"
+_APPROXIMATELY = re.compile(r'is\s+approximately\s+\*\*(\d+)%\*\*', re.IGNORECASE)
+
+# 3. "probability ... is ... XX%" (three chained stages)
+_PROBABILITY_WORD = re.compile(r'probability', re.IGNORECASE)
+_IS_WORD = re.compile(r'is', re.IGNORECASE)
+_PERCENTAGE = re.compile(r'(?<!\d)(\d+)%')
+
+# 4. "koi_score ... of **0.XX**" (two chained stages, converted to percentage)
+_KOI_SCORE = re.compile(r'koi[_\s]*score', re.IGNORECASE)
+_KOI_VALUE = re.compile(r'(?:of|is)\s+\*\*?(0\.\d+)\*\*?', re.IGNORECASE)
+
+# 5. "XX%" at the end of a line
+_LINE_END_PERCENTAGE = re.compile(r'(?<!\d)(\d+)%[^\S\n]*$', re.MULTILINE)
+
+# Explicit probability lines removed from the response once a value is found
+_PROBABILITY_LINE = re.compile(r'\n*PROBABILITY:\s*\d+%\s*$', re.IGNORECASE | re.MULTILINE)
+
+
+def _in_range(percentage_value: int) -> Optional[int]:
+    return percentage_value if 0 <= percentage_value <= 100 else None
+
+
+def _explicit_percentage(ai_response_text: str) -> Optional[str]:
+    """Digits of the highest-priority explicit percentage (patterns 1-3), if any"""
+    match = _LABEL.search(ai_response_text) or _APPROXIMATELY.search(ai_response_text)
+    if match:
+        return match.group(1)
+    
+    word = _PROBABILITY_WORD.search(ai_response_text)
+    if word:
+        verb = _IS_WORD.search(ai_response_text, word.end())
+        if verb:
+            match = _PERCENTAGE.search(ai_response_text, verb.end())
+            if match:
+                return match.group(1)
+    return None
+
+
+def find_probability(ai_response_text: str) -> Optional[int]:
+    """
+    Find the probability percentage in an AI response.
+    
+    Args:
+        ai_response_text: Generated answer
+    
+    Returns:
+        Percentage (0-100) or None if no valid candidate is found
+    """
+    # Explicit percentages decide on their own (even when out of range)
+    explicit = _explicit_percentage(ai_response_text)
+    if explicit is not None:
+        return _in_range(int(explicit))
+    
+    probability_percentage = None
+    koi = _KOI_SCORE.search(ai_response_text)
+    if koi:
+        value = _KOI_VALUE.search(ai_response_text, koi.end())
+        if value:
+            probability_percentage = _in_range(int(float(value.group(1)) * 100))
+    
+    # A koi_score of 0 still lets an end-of-line percentage win
+    if not probability_percentage:
+        match = _LINE_END_PERCENTAGE.search(ai_response_text)
+        if match and _in_range(int(match.group(1))) is not None:
+            probability_percentage = int(match.group(1))
+    
+    return probability_percentage
+
+
+def extract_probability(ai_response_text: str) -> Tuple[str, Optional[int]]:
+    """
+    Extract the probability percentage from an AI response.
+    
+    Args:
+        ai_response_text: Generated answer
+    
+    Returns:
+        Tuple of (cleaned response text, probability percentage or None)
+    """
+    probability_percentage = find_probability(ai_response_text)
+    
+    # Clean up the response text by removing explicit probability lines
+    if probability_percentage is not None:
+        if "probability:" in ai_response_text.lower():
+            ai_response_text = _PROBABILITY_LINE.sub('', ai_response_text)
+        ai_response_text = ai_response_text.strip()
+    
+    return ai_response_text, probability_percentage
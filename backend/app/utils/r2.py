@@ -0,0 +1,328 @@
+"""
+Cloudflare R2 (S3-compatible) storage helpers.
+
+One S3 client is created in the application lifespan (R2Storage) and shared
+by every request, so credential resolution, botocore service model loading
+and TLS handshakes happen once instead of on every upload.
+
+Uploads are streamed: the file is read one part at a time, hashed in the same
+pass and sent to R2 as it is read, so memory per upload is bounded by
+R2_PART_SIZE_MB * R2_UPLOAD_CONCURRENCY instead of the file size. Files that
+fit in one part use a single PutObject; larger ones use a multipart upload,
+which is aborted if the size limit is exceeded or anything fails.
+
+hash_content() hashes a file without uploading it, so an upload whose content
+is already stored can be detected before anything is written to R2.
+hash_object() does the same for an object already in R2, and can spool it to
+a local file on the way instead of holding it in memory.
+
+presign_upload() lets clients send the bytes to R2 themselves (presigned PUT,
+or multipart above one part), with the size and content type in the signature.
+"""
+import asyncio
+import base64
+import hashlib
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+import aioboto3
+from app.config import settings
+from botocore.config import Config
+
+# S3 (and R2) reject multipart parts smaller than 5 MiB, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class FileTooLargeError(Exception):
+    """Raised when a streamed upload exceeds the allowed size"""
+    
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the maximum size of {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class StoredObject:
+    """Result of a streamed upload"""
+    key: str
+    size: int
+    sha256: str
+
+
+class R2Storage:
+    """
+    Application-scoped, pooled S3 client for the R2 bucket.
+    """
+    
+    def __init__(self):
+        self._stack: Optional[AsyncExitStack] = None
+        self._client: Any = None
+    
+    async def start(self) -> None:
+        """
+        Create the shared client (connection pool, timeouts and retries from settings).
+        """
+        config = Config(
+            max_pool_connections=settings.r2_max_connections,
+            connect_timeout=settings.r2_connect_timeout,
+            read_timeout=settings.r2_read_timeout,
+            retries={"max_attempts": settings.r2_max_attempts, "mode": settings.r2_retry_mode},
+            tcp_keepalive=True,
+            # Presigned URLs must use SigV4 (the default presigner is SigV2)
+            signature_version="s3v4",
+        )
+        stack = AsyncExitStack()
+        self._client = await stack.enter_async_context(
+            aioboto3.Session().client(
+                's3',
+                endpoint_url=settings.r2_endpoint_url or None,
+                aws_access_key_id=settings.r2_access_key_id,
+                aws_secret_access_key=settings.r2_secret_access_key,
+                config=config
+            )
+        )
+        self._stack = stack
+    
+    @property
+    def client(self) -> Any:
+        """
+        Get the shared aioboto3 S3 client.
+        
+        Raises:
+            RuntimeError: If the client has not been started
+        """
+        if self._client is None:
+            raise RuntimeError("R2 client is not available. Was it started in the lifespan?")
+        return self._client
+    
+    async def aclose(self) -> None:
+        """
+        Close the client and its pooled connections.
+        """
+        if self._stack is not None:
+            await self._stack.aclose()
+        self._stack = None
+        self._client = None
+
+
+def part_size() -> int:
+    """Multipart part size in bytes (R2_PART_SIZE_MB, at least 5 MiB)"""
+    return max(MIN_PART_SIZE, settings.r2_part_size_mb * 1024 * 1024)
+
+
+async def _read_part(read: Callable[[int], Awaitable[bytes]], size: int) -> bytes:
+    """Read up to size bytes (the reader may return less than asked before EOF)"""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = await read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+async def hash_content(
+    read: Callable[[int], Awaitable[bytes]],
+    max_bytes: Optional[int] = None
+) -> Tuple[int, str]:
+    """
+    Hash content one part at a time without keeping it in memory.
+    
+    Args:
+        read: Async reader returning up to n bytes (e.g. UploadFile.read or an R2 object body), b"" at EOF
+        max_bytes: Maximum allowed size (None for no limit)
+    
+    Returns:
+        Size in bytes and hex SHA-256 of the content
+    
+    Raises:
+        FileTooLargeError: If the content exceeds max_bytes
+    """
+    size = part_size()
+    hasher = hashlib.sha256()
+    total = 0
+    while True:
+        chunk = await _read_part(read, size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_bytes is not None and total > max_bytes:
+            raise FileTooLargeError(max_bytes)
+        await asyncio.to_thread(hasher.update, chunk)
+    return total, hasher.hexdigest()
+
+
+async def hash_object(
+    s3_client: Any,
+    bucket: str,
+    key: str,
+    copy_to: Optional[BinaryIO] = None
+) -> Tuple[int, str]:
+    """
+    Hash an R2 object one part at a time as it is downloaded.
+    
+    Args:
+        s3_client: aioboto3 S3 client
+        bucket: Bucket name
+        key: Object key
+        copy_to: Local binary file the content is also written to (optional)
+    
+    Returns:
+        Size in bytes and hex SHA-256 of the object
+    
+    Raises:
+        Exception: botocore errors from R2
+    """
+    obj = await s3_client.get_object(Bucket=bucket, Key=key)
+    body = obj["Body"]
+    # Entering the body yields the raw HTTP response: read from the StreamingBody itself
+    async with body:
+        async def read(size: int) -> bytes:
+            chunk = await body.read(size)
+            if chunk and copy_to is not None:
+                await asyncio.to_thread(copy_to.write, chunk)
+            return chunk
+        
+        return await hash_content(read)
+
+
+async def stream_upload(
+    s3_client: Any,
+    read: Callable[[int], Awaitable[bytes]],
+    bucket: str,
+    key: str,
+    max_bytes: int
+) -> StoredObject:
+    """
+    Stream a file to R2, enforcing a size limit and computing its SHA-256.
+    
+    Args:
+        s3_client: aioboto3 S3 client
+        read: Async reader returning up to n bytes (e.g. UploadFile.read), b"" at EOF
+        bucket: Bucket name
+        key: Object key
+        max_bytes: Maximum allowed size
+    
+    Returns:
+        StoredObject with the size and hex SHA-256 of the content
+    
+    Raises:
+        FileTooLargeError: If the content exceeds max_bytes (nothing is left in R2)
+        Exception: botocore errors from R2
+    """
+    size = part_size()
+    hasher = hashlib.sha256()
+    
+    # Read one byte past the limit so oversized files are detected without reading them whole
+    first = await _read_part(read, min(size, max_bytes + 1))
+    total = len(first)
+    if total > max_bytes:
+        raise FileTooLargeError(max_bytes)
+    await asyncio.to_thread(hasher.update, first)
+    
+    if total < size:
+        # Fits in one part: a single request
+        await s3_client.put_object(Bucket=bucket, Key=key, Body=first)
+        return StoredObject(key=key, size=total, sha256=hasher.hexdigest())
+    
+    upload_id = (await s3_client.create_multipart_upload(Bucket=bucket, Key=key))["UploadId"]
+    parts: List[dict] = []
+    pending: List[asyncio.Task] = []
+    
+    async def send(number: int, body: bytes) -> dict:
+        response = await s3_client.upload_part(
+            Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body
+        )
+        return {"PartNumber": number, "ETag": response["ETag"]}
+    
+    try:
+        chunk = first
+        number = 1
+        while chunk:
+            pending.append(asyncio.create_task(send(number, chunk)))
+            # Bound the parts held in memory
+            if len(pending) >= settings.r2_upload_concurrency:
+                parts.append(await pending.pop(0))
+            
+            chunk = await _read_part(read, size)
+            total += len(chunk)
+            if total > max_bytes:
+                raise FileTooLargeError(max_bytes)
+            if chunk:
+                await asyncio.to_thread(hasher.update, chunk)
+            number += 1
+        
+        for task in pending:
+            parts.append(await task)
+        pending.clear()
+        await s3_client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        try:
+            await s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception as abort_error:
+            print(f"Warning: Could not abort multipart upload of {key}: {abort_error}")
+        raise
+    
+    return StoredObject(key=key, size=total, sha256=hasher.hexdigest())
+
+
+async def presign_upload(
+    s3_client: Any,
+    bucket: str,
+    key: str,
+    size: int,
+    content_type: str,
+    expires_in: int,
+    sha256: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Presign a direct upload of one object.
+    
+    Content-Length (and Content-Type for single PUTs) are signed, so R2 rejects
+    a body of another size or type. With sha256, a single PUT also signs the
+    x-amz-checksum-sha256 header and R2 rejects content with another hash.
+    
+    Args:
+        s3_client: aioboto3 S3 client
+        bucket: Bucket name
+        key: Object key
+        size: Exact size of the content in bytes
+        content_type: Content type the object must be stored with
+        expires_in: URL lifetime in seconds
+        sha256: Hex SHA-256 declared by the client (optional)
+    
+    Returns:
+        {"method": "put", "url", "headers"} for content up to one part, otherwise
+        {"method": "multipart", "upload_id", "parts": [{"part_number", "url", "size"}], "headers"}
+    
+    Raises:
+        Exception: botocore errors from R2 (creating the multipart upload)
+    """
+    headers = {"Content-Type": content_type}
+    size_per_part = part_size()
+    if size <= size_per_part:
+        params = {"Bucket": bucket, "Key": key, "ContentType": content_type, "ContentLength": size}
+        if sha256:
+            headers["x-amz-checksum-sha256"] = params["ChecksumSHA256"] = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = await s3_client.generate_presigned_url("put_object", Params=params, ExpiresIn=expires_in)
+        return {"method": "put", "url": url, "headers": headers}
+    
+    upload_id = (await s3_client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type))["UploadId"]
+    parts = []
+    for number, offset in enumerate(range(0, size, size_per_part), start=1):
+        length = min(size_per_part, size - offset)
+        url = await s3_client.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": bucket, "Key": key, "UploadId": upload_id, "PartNumber": number, "ContentLength": length},
+            ExpiresIn=expires_in
+        )
+        parts.append({"part_number": number, "url": url, "size": length})
+    return {"method": "multipart", "upload_id": upload_id, "parts": parts, "headers": {}}
@@ -0,0 +1,408 @@
+"""
+Resilience layer for Cloudflare upstream calls.
+
+- Retries with exponential backoff and full jitter, honoring Retry-After.
+- Global retry budget: retries (and hedges) may only add a bounded fraction
+  of extra load over a sliding window, so a struggling upstream is not
+  hammered by every caller retrying at once.
+- Circuit breaker over a sliding window of outcomes: above the failure rate
+  threshold callers fail fast with 503 instead of waiting for timeouts, and
+  after a cool-down a few probe calls decide whether to close it again.
+- Optional hedged requests: if an attempt is slower than the recent p95
+  latency, a second identical attempt is started and the first to succeed wins.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+from app.config import settings
+from fastapi import HTTPException, status
+
+T = TypeVar("T")
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upstream answers that mean "try again later"
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Latency samples required before hedging starts
+HEDGE_MIN_SAMPLES = 20
+
+
+class CircuitOpenError(HTTPException):
+    """Raised instead of calling an upstream whose circuit is open"""
+    
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Upstream '{name}' is temporarily unavailable (circuit open). Please retry later.",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Check whether an upstream error is transient (worth a retry and counted by the breaker).
+    
+    Args:
+        error: Exception raised by an upstream call
+    
+    Returns:
+        True for timeouts, transport errors and retryable HTTP status codes
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, httpx.TransportError)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Read the Retry-After header of an HTTP error (delta-seconds or HTTP date).
+    
+    Args:
+        error: Exception raised by an upstream call
+    
+    Returns:
+        Seconds to wait, or None if the header is absent or invalid
+    """
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Exponential backoff with full jitter.
+    
+    Args:
+        attempt: Retry number (1 for the first retry)
+        base: Base delay in seconds
+        cap: Maximum delay in seconds
+    
+    Returns:
+        Random delay in [0, min(cap, base * 2^(attempt-1))]
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class RetryBudget:
+    """
+    Sliding-window retry budget shared by all callers of an upstream.
+    
+    Within the window, retries may not exceed
+    min_per_second * window + ratio * requests.
+    """
+    
+    def __init__(self, ratio: float, min_per_second: float, window_seconds: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.spent = 0
+        self.denied = 0
+    
+    def _trim(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        for events in (self._requests, self._retries):
+            while events and events[0] < horizon:
+                events.popleft()
+    
+    def record_request(self) -> None:
+        """Count an original (non-retry) request"""
+        self._requests.append(time.monotonic())
+    
+    def try_spend(self) -> bool:
+        """
+        Take one retry from the budget.
+        
+        Returns:
+            True if the retry is allowed
+        """
+        now = time.monotonic()
+        self._trim(now)
+        allowed = self.min_per_second * self.window_seconds + self.ratio * len(self._requests)
+        if len(self._retries) >= allowed:
+            self.denied += 1
+            return False
+        self._retries.append(now)
+        self.spent += 1
+        return True
+    
+    def stats(self) -> dict:
+        self._trim(time.monotonic())
+        return {
+            "retries_spent": self.spent,
+            "retries_denied": self.denied,
+            "window_requests": len(self._requests),
+            "window_retries": len(self._retries),
+        }
+
+
+class CircuitBreaker:
+    """
+    Count-based sliding-window circuit breaker.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float,
+        window_size: int,
+        min_calls: int,
+        open_seconds: float,
+        half_open_max_calls: int
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.opened = 0
+    
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+        self.opened += 1
+    
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._outcomes.clear()
+        self._probes = 0
+    
+    def acquire(self) -> None:
+        """
+        Ask permission for a call.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open (or all half-open probes are in flight)
+        """
+        if self.state == OPEN:
+            remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, remaining)
+            self.state = HALF_OPEN
+            self._probes = 0
+        
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 1)
+            self._probes += 1
+    
+    def on_success(self) -> None:
+        """Record a healthy upstream answer"""
+        if self.state == HALF_OPEN:
+            self._close()
+            return
+        self._outcomes.append(True)
+    
+    def on_failure(self) -> None:
+        """Record a transient upstream failure"""
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        if self.state == OPEN:
+            return
+        self._outcomes.append(False)
+        if len(self._outcomes) >= self.min_calls and self.failure_rate() >= self.failure_rate_threshold:
+            self._open()
+    
+    def release(self) -> None:
+        """Give back a permission without an outcome (e.g. caller cancelled or client error)"""
+        if self.state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+    
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+    
+    def stats(self) -> dict:
+        stats = {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate(), 4),
+            "window_calls": len(self._outcomes),
+            "times_opened": self.opened,
+            "rejected": self.rejected,
+        }
+        if self.state == OPEN:
+            stats["retry_after"] = max(0.0, round(self.open_seconds - (time.monotonic() - self._opened_at), 3))
+        return stats
+
+
+class LatencyTracker:
+    """Recent successful attempt latencies (for the hedging delay)"""
+    
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+    
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self._samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ResilientUpstream:
+    """
+    Circuit breaker + retry budget + backoff + optional hedging for one upstream.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            name,
+            failure_rate_threshold=settings.breaker_failure_rate,
+            window_size=settings.breaker_window_size,
+            min_calls=settings.breaker_min_calls,
+            open_seconds=settings.breaker_open_seconds,
+            half_open_max_calls=settings.breaker_half_open_calls
+        )
+        self.budget = RetryBudget(settings.retry_budget_ratio, settings.retry_budget_min_per_second)
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+    
+    async def _timed(self, fn: Callable[[], Awaitable[T]]) -> T:
+        start = time.monotonic()
+        result = await fn()
+        self.latency.record(time.monotonic() - start)
+        return result
+    
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """One logical attempt, hedged after the p95 latency when enabled"""
+        if not settings.hedge_enabled:
+            return await self._timed(fn)
+        p95 = self.latency.percentile(0.95)
+        if p95 is None:
+            return await self._timed(fn)
+        
+        primary = asyncio.ensure_future(self._timed(fn))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=max(p95, settings.hedge_min_delay_ms / 1000))
+            if done or not self.budget.try_spend():
+                return await primary
+            
+            self.hedges += 1
+            pending.add(asyncio.ensure_future(self._timed(fn)))
+            errors = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    errors.append(task.exception())
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run an upstream call through the breaker, with retries and hedging.
+        
+        Args:
+            fn: Zero-argument coroutine factory performing one attempt
+        
+        Returns:
+            Result of the first successful attempt
+        
+        Raises:
+            CircuitOpenError: If the circuit is open
+            Exception: The last attempt's error once retries are exhausted or denied
+        """
+        self.calls += 1
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            self.breaker.acquire()
+            try:
+                result = await self._attempt(fn)
+            except BaseException as error:
+                if not isinstance(error, Exception) or not is_retryable(error):
+                    self.breaker.release()
+                    raise
+                self.breaker.on_failure()
+                
+                attempt += 1
+                delay = backoff_delay(attempt, settings.retry_backoff_base_ms / 1000, settings.retry_backoff_max_ms / 1000)
+                retry_after = retry_after_seconds(error)
+                if retry_after is not None:
+                    # Waiting longer than our own backoff cap would only hold the caller
+                    if retry_after > settings.retry_backoff_max_ms / 1000:
+                        raise
+                    delay = max(delay, retry_after)
+                if attempt > settings.upstream_max_retries or not self.budget.try_spend():
+                    raise
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.on_success()
+            return result
+    
+    def stats(self) -> dict:
+        """
+        Get breaker, budget and hedging counters.
+        
+        Returns:
+            Dictionary for monitoring
+        """
+        p95 = self.latency.percentile(0.95)
+        return {
+            "circuit": self.breaker.stats(),
+            "retry_budget": self.budget.stats(),
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p95_latency_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+# Per-upstream resilience state
+ai_search_upstream = ResilientUpstream("ai_search")
+workers_ai_upstream = ResilientUpstream("workers_ai")
+
+
+def resilience_stats() -> Dict[str, dict]:
+    """
+    Get the state of every protected upstream.
+    
+    Returns:
+        Dictionary keyed by upstream name
+    """
+    return {upstream.name: upstream.stats() for upstream in (ai_search_upstream, workers_ai_upstream)}
@@ -0,0 +1,200 @@
+"""
+Persistence helpers for AI responses.
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Response as ResponseModel
+from app.utils.change_feed import change_feed
+from app.utils.list_cache import list_cache
+from app.utils.row_counts import RESPONSES, row_counts
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def new_response_row(user_id: int, question: str, response: str, probability_percentage: Optional[int]) -> dict:
+    """
+    Build a `responses` row with client-side uid and created_at,
+    so it can be returned to the caller without reading it back.
+    created_at is the request time in UTC (sessions use time_zone '+00:00',
+    see app/database.py), so it matches CURRENT_TIMESTAMP defaults.
+    
+    Args:
+        user_id: ID of the requesting user
+        question: Question text
+        response: Answer text
+        probability_percentage: Extracted probability (if any)
+    
+    Returns:
+        Column values for ResponseModel
+    """
+    return {
+        "uid": str(uuid.uuid4()),
+        "user_id": user_id,
+        "question": question,
+        "response": response,
+        "probability_percentage": probability_percentage,
+        # TIMESTAMP columns have second precision
+        "created_at": datetime.utcnow().replace(microsecond=0),
+    }
+
+
+async def bulk_insert_responses(db: AsyncSession, rows: List[dict]) -> None:
+    """
+    Insert many responses with a single multi-row INSERT (not committed).
+    
+    Args:
+        db: Database session
+        rows: Rows built with new_response_row()
+    """
+    if rows:
+        await db.execute(insert(ResponseModel), rows)
+
+
+class ResponseWriter:
+    """
+    Write-behind persistence of AI responses.
+    
+    Rows are queued by the request handlers and written by a background task
+    started in the application lifespan. The task flushes them as multi-row
+    INSERTs when RESPONSE_WRITE_BATCH_SIZE rows are pending or
+    RESPONSE_WRITE_FLUSH_INTERVAL_MS has elapsed since the first pending row,
+    and drains the queue on shutdown.
+    
+    Rows carry a client-side uid and created_at (see new_response_row()), so the
+    API can answer without waiting for the database.
+    
+    A row is therefore committed after its created_at: up to the flush interval
+    later, more while a flush is retried. Rows inserted directly while the queue
+    is full can commit before older queued rows. Code following the
+    (created_at, id) order must not assume rows appear in that order.
+    """
+    
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.written = 0
+        self.flushes = 0
+        self.dropped = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether rows are currently accepted for write-behind"""
+        return self._task is not None and not self._task.done()
+    
+    def start(self) -> None:
+        """
+        Start the background flush task (no-op unless RESPONSE_WRITE_BEHIND is enabled).
+        """
+        if not settings.response_write_behind or self.enabled:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.response_write_queue_size)
+        self._task = asyncio.create_task(self._run())
+    
+    def enqueue(self, rows: List[dict]) -> bool:
+        """
+        Queue rows for the next flush.
+        
+        Args:
+            rows: Rows built with new_response_row()
+        
+        Returns:
+            True if the rows were queued, False if the caller must insert them
+            itself (write-behind disabled, stopping or queue full)
+        """
+        if not self.enabled or self._queue.qsize() + len(rows) > self._queue.maxsize:
+            return False
+        for row in rows:
+            self._queue.put_nowait(row)
+        self.enqueued += len(rows)
+        return True
+    
+    async def _collect(self, batch: List[dict]) -> bool:
+        """Fill batch up to the size limit or until the flush interval ends; False once stopping"""
+        deadline = time.monotonic() + settings.response_write_flush_interval_ms / 1000
+        while len(batch) < settings.response_write_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                row = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if row is None:
+                return False
+            batch.append(row)
+        return True
+    
+    async def _flush(self, batch: List[dict]) -> None:
+        for attempt in range(settings.response_write_max_retries + 1):
+            try:
+                async with AsyncSessionLocal() as db:
+                    await bulk_insert_responses(db, batch)
+                    await db.commit()
+                row_counts.add(RESPONSES, len(batch))
+                list_cache.invalidate(RESPONSES)
+                change_feed.notify()
+                self.written += len(batch)
+                self.flushes += 1
+                return
+            except Exception as e:
+                print(f"⚠️  Warning: Failed to write {len(batch)} responses (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(min(2 ** attempt, 10))
+        self.dropped += len(batch)
+        print(f"❌ Dropped {len(batch)} responses after {settings.response_write_max_retries + 1} attempts")
+    
+    async def _run(self) -> None:
+        running = True
+        while running:
+            row = await self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+            running = await self._collect(batch)
+            await self._flush(batch)
+        
+        # Drain whatever was queued before stop()
+        batch = []
+        while not self._queue.empty():
+            row = self._queue.get_nowait()
+            if row is not None:
+                batch.append(row)
+            if len(batch) >= settings.response_write_batch_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+    
+    async def stop(self) -> None:
+        """
+        Stop accepting rows, flush everything still queued and wait for the task.
+        """
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        if not task.done():
+            # The task keeps consuming, so put() only waits while the queue is full
+            await self._queue.put(None)
+        await task
+    
+    def stats(self) -> dict:
+        """
+        Get write-behind counters.
+        
+        Returns:
+            Dictionary with queued, written and dropped row counts
+        """
+        return {
+            "enabled": self.enabled,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }
@@ -0,0 +1,211 @@
+"""
+Full-text search over stored questions and answers (/api/results/search).
+
+On MySQL/MariaDB, responses are ranked with MATCH (question, response)
+AGAINST (...) in natural language mode, served by the FULLTEXT index from
+database/08_add_responses_fulltext.sql. Pages are keyed on (score, id):
+the cursor holds the score and id of the last row, so deep pages do not
+re-read skipped matches.
+
+Other databases (SQLite in tests) have no FULLTEXT index; there the same
+ranking and paging run over an in-process BM25 LexicalIndex of the responses
+(one per engine). Before each search it indexes the rows newer than the last
+indexed id, and re-checks the LATE_ROW_WINDOW_SECONDS before the newest
+indexed row for rows that committed after higher ids.
+"""
+import asyncio
+import base64
+import binascii
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from app.config import settings
+from app.models import Response
+from app.utils.lexical_index import LexicalIndex
+from sqlalchemy import Engine, Select, and_, or_, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Candidate passages first scored by the fallback, per row of the page (grows x4 as needed)
+CANDIDATES_PER_ROW = 4
+
+
+def encode_search_cursor(score: float, row_id: int) -> str:
+    """
+    Encode the position of a search result as an opaque cursor.
+    
+    Args:
+        score: Relevance of the row
+        row_id: Row primary key
+    
+    Returns:
+        Cursor token
+    """
+    # repr() round-trips the float exactly, so the next page starts right after the row
+    raw = f"{score!r}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Decode a cursor created by encode_search_cursor().
+    
+    Args:
+        cursor: Cursor token
+    
+    Returns:
+        (score, id) of the last row of the previous page
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        score, row_id = raw.rsplit("|", 1)
+        return float(score), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class LocalResultIndex:
+    """
+    In-process BM25 index of responses for databases without FULLTEXT.
+    """
+    
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        """
+        Drop everything indexed (rebuilt by the next refresh()).
+        """
+        self.index = LexicalIndex()
+        self.last_id = 0
+        self.newest: Optional[datetime] = None
+    
+    async def refresh(self, db: AsyncSession) -> None:
+        """
+        Index responses not indexed yet (responses are never edited).
+        
+        Args:
+            db: Database session
+        """
+        async with self._lock:
+            query = select(Response.id, Response.created_at)
+            if self.newest is not None:
+                window_start = self.newest - timedelta(seconds=settings.late_row_window_seconds)
+                query = query.where(or_(Response.id > self.last_id, Response.created_at >= window_start))
+            result = await db.execute(query)
+            missing = []
+            for row in result:
+                self.last_id = max(self.last_id, row.id)
+                self.newest = max(self.newest or row.created_at, row.created_at)
+                if str(row.id) not in self.index.sources:
+                    missing.append(row.id)
+            
+            for start in range(0, len(missing), 500):
+                result = await db.execute(
+                    select(Response.id, Response.question, Response.response)
+                    .where(Response.id.in_(missing[start:start + 500]))
+                )
+                for row in result:
+                    self.index.add_document(str(row.id), f"{row.question}\n{row.response}")
+    
+    def scores(self, text: str, k: int) -> Tuple[Dict[int, float], Optional[float]]:
+        """
+        Score the responses of the k best matching passages.
+        
+        Args:
+            text: Search text
+            k: Number of passages
+        
+        Returns:
+            Response id -> score of its best passage, and the lowest passage score
+            taken (None if every matching passage was taken)
+        """
+        passages = self.index.search(text, k=k)
+        scores: Dict[int, float] = {}
+        for passage, score in passages:
+            row_id = int(passage.source)
+            scores[row_id] = max(scores.get(row_id, 0.0), score)
+        return scores, passages[-1][1] if len(passages) == k else None
+
+
+# Fallback indexes (only built when the database has no FULLTEXT support)
+_local_indexes: "WeakKeyDictionary[Engine, LocalResultIndex]" = WeakKeyDictionary()
+
+
+def get_local_result_index(db: AsyncSession) -> LocalResultIndex:
+    """
+    Get the fallback index of the session's database.
+        
+    Args:
+        db: Database session
+        
+    Returns:
+        LocalResultIndex of the session's engine
+    """
+    engine = db.get_bind()
+    index = _local_indexes.get(engine)
+    if index is None:
+        index = _local_indexes[engine] = LocalResultIndex()
+    return index
+
+
+async def search_responses(
+    db: AsyncSession,
+    query: Select,
+    text: str,
+    page_size: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Tuple[Any, float]], Optional[str]]:
+    """
+    Fetch one page of responses matching a search, most relevant first.
+    
+    Args:
+        db: Database session
+        query: SELECT of Response columns including id (filters allowed, no ordering)
+        text: Search text
+        page_size: Rows per page
+        cursor: Cursor from a previous page
+    
+    Returns:
+        (row, score) pairs and the cursor of the next page (None on the last page)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    after = decode_search_cursor(cursor) if cursor else None
+    
+    if db.get_bind().dialect.name == "mysql":
+        score = match(Response.question, Response.response, against=text)
+        query = query.add_columns(score.label("score")).where(score)
+        if after:
+            query = query.where(or_(score < after[0], and_(score == after[0], Response.id < after[1])))
+        result = await db.execute(query.order_by(score.desc(), Response.id.desc()).limit(page_size + 1))
+        rows = [(row, row.score) for row in result.all()]
+    else:
+        index = get_local_result_index(db)
+        await index.refresh(db)
+        k = (page_size + 1) * CANDIDATES_PER_ROW
+        while True:
+            scores, threshold = index.scores(text, k)
+            if not scores:
+                return [], None
+            result = await db.execute(query.where(Response.id.in_(scores)))
+            rows = sorted(((row, scores[row.id]) for row in result.all()), key=lambda item: (item[1], item[0].id), reverse=True)
+            if after:
+                rows = [(row, score) for row, score in rows if (score, row.id) < after]
+            # Responses left out all score <= threshold: the page is final once its extra row beats it
+            if threshold is None or (len(rows) > page_size and rows[page_size][1] > threshold):
+                break
+            k *= CANDIDATES_PER_ROW
+        rows = rows[:page_size + 1]
+    
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last_row, last_score = rows[-1]
+    return rows, encode_search_cursor(last_score, last_row.id)
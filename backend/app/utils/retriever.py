@@ -0,0 +1,310 @@
+"""
+Pluggable answer backends for AI requests.
+
+- AISearchRetriever: Cloudflare AI Search (remote retrieval + generation).
+- LocalRetriever: in-process cosine search over a VectorIndex exported from the
+  Vectorize index, with query embedding and generation through Workers AI.
+- HybridRetriever: LocalRetriever whose dense results are fused with the BM25
+  LexicalIndex of uploaded documents (reciprocal rank fusion).
+
+The backend is selected with RETRIEVAL_BACKEND and created once in the lifespan.
+"""
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from app.config import settings
+from app.utils.ai_search import (AI_SEARCH_MAX_NUM_RESULTS,
+                                 AI_SEARCH_SYSTEM_MESSAGE, answer_cache_key,
+                                 cloudflare_headers, query_ai_search,
+                                 stream_ai_search)
+from app.utils.answer_cache import make_cache_key
+from app.utils.lexical_index import LexicalIndex
+from app.utils.resilience import workers_ai_upstream
+from app.utils.vector_index import IndexItem, VectorIndex
+from fastapi import HTTPException, status
+
+# Backend names (RETRIEVAL_BACKEND)
+AI_SEARCH_BACKEND = "ai_search"
+LOCAL_BACKEND = "local"
+HYBRID_BACKEND = "hybrid"
+
+
+class Retriever:
+    """
+    Interface of an answer backend used by the AI request endpoints.
+    """
+    
+    name = "base"
+    
+    def cache_key(self, query: str) -> str:
+        """
+        Get the answer cache (and request coalescing) key for a question.
+        
+        Args:
+            query: User question
+        
+        Returns:
+            Cache key
+        """
+        raise NotImplementedError
+    
+    async def answer(self, client: httpx.AsyncClient, query: str) -> str:
+        """
+        Generate an answer for a question.
+        
+        Args:
+            client: Shared HTTP client for the Cloudflare API
+            query: User question
+        
+        Returns:
+            Generated response text (empty string if the model returned nothing)
+        
+        Raises:
+            httpx.HTTPError: On transport or HTTP status errors
+            HTTPException: If the backend reports an unsuccessful response
+        """
+        raise NotImplementedError
+    
+    async def stream(self, client: httpx.AsyncClient, query: str) -> AsyncIterator[str]:
+        """
+        Generate an answer as text fragments (a single fragment unless overridden).
+        
+        Args:
+            client: Shared HTTP client for the Cloudflare API
+            query: User question
+        
+        Yields:
+            Response text fragments
+        """
+        text = await self.answer(client, query)
+        if text:
+            yield text
+    
+    def stats(self) -> dict:
+        """
+        Describe the backend.
+        
+        Returns:
+            Dictionary with the backend name
+        """
+        return {"backend": self.name}
+
+
+class AISearchRetriever(Retriever):
+    """
+    Cloudflare AI Search backend (default).
+    """
+    
+    name = AI_SEARCH_BACKEND
+    
+    def cache_key(self, query: str) -> str:
+        return answer_cache_key(query)
+    
+    async def answer(self, client: httpx.AsyncClient, query: str) -> str:
+        return await query_ai_search(client, query)
+    
+    async def stream(self, client: httpx.AsyncClient, query: str) -> AsyncIterator[str]:
+        async for fragment in stream_ai_search(client, query):
+            yield fragment
+
+
+def workers_ai_url(model: str) -> str:
+    """Get the Workers AI endpoint URL of a model"""
+    return f"{settings.cloudflare_api_base_url}/accounts/{settings.cloudflare_account_id}/ai/run/{model}"
+
+
+async def _run_workers_ai(client: httpx.AsyncClient, model: str, payload: dict) -> dict:
+    async def attempt() -> httpx.Response:
+        response = await client.post(
+            workers_ai_url(model),
+            json=payload,
+            headers=cloudflare_headers(),
+            timeout=settings.ai_search_timeout
+        )
+        response.raise_for_status()
+        return response
+    
+    ai_result = (await workers_ai_upstream.call(attempt)).json()
+    
+    if not ai_result.get("success", False):
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Cloudflare Workers AI returned unsuccessful response: {ai_result.get('errors', 'Unknown error')}"
+        )
+    return ai_result.get("result", {})
+
+
+def build_context_prompt(query: str, matches: List[Tuple[IndexItem, float]]) -> str:
+    """
+    Build the generation prompt from the retrieved chunks.
+    
+    Args:
+        query: User question
+        matches: Retrieved (item, similarity) pairs
+    
+    Returns:
+        Prompt with numbered context chunks followed by the question
+    """
+    context = "\n\n".join(
+        f"[{i}] {item.metadata.get('filename', item.id)}\n{item.text}"
+        for i, (item, _) in enumerate(matches, 1)
+    )
+    return f"Context:\n{context}\n\nQuestion: {query}"
+
+
+class LocalRetriever(Retriever):
+    """
+    In-process vector retrieval over an exported Vectorize index.
+    
+    Only the query embedding and the final generation leave the process; the
+    top-k search runs on the local NumPy matrix (in a worker thread, so large
+    scans do not block the event loop).
+    """
+    
+    name = LOCAL_BACKEND
+    
+    def __init__(self, index: Optional[VectorIndex], top_k: int = AI_SEARCH_MAX_NUM_RESULTS):
+        self.index = index
+        self.top_k = top_k
+    
+    def cache_key(self, query: str) -> str:
+        # Different models and parameters must not share answers with AI Search
+        system_message = f"{self.name}:{settings.workers_ai_embedding_model}:{settings.workers_ai_text_model}\n{AI_SEARCH_SYSTEM_MESSAGE}"
+        return make_cache_key(query, system_message, self.top_k, False)
+    
+    async def embed(self, client: httpx.AsyncClient, query: str) -> List[float]:
+        """
+        Embed a question with the same model used to build the index.
+        
+        Args:
+            client: Shared HTTP client for the Cloudflare API
+            query: User question
+        
+        Returns:
+            Query embedding
+        """
+        result = await _run_workers_ai(client, settings.workers_ai_embedding_model, {"text": [query]})
+        return result["data"][0]
+    
+    async def retrieve(self, client: httpx.AsyncClient, query: str) -> List[Tuple[IndexItem, float]]:
+        """
+        Find the chunks most similar to a question.
+        
+        Args:
+            client: Shared HTTP client for the Cloudflare API
+            query: User question
+        
+        Returns:
+            List of (item, cosine similarity) sorted by descending similarity
+        """
+        vector = await self.embed(client, query)
+        return await asyncio.to_thread(self.index.query, vector, self.top_k)
+    
+    async def answer(self, client: httpx.AsyncClient, query: str) -> str:
+        matches = await self.retrieve(client, query)
+        result = await _run_workers_ai(client, settings.workers_ai_text_model, {
+            "messages": [
+                {"role": "system", "content": AI_SEARCH_SYSTEM_MESSAGE},
+                {"role": "user", "content": build_context_prompt(query, matches)}
+            ]
+        })
+        return result.get("response") or ""
+    
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "vectors": len(self.index),
+            "dimensions": self.index.dimensions,
+            "dtype": str(self.index.vectors.dtype),
+            "top_k": self.top_k,
+        }
+
+
+def reciprocal_rank_fusion(rankings: List[List[IndexItem]], limit: int, k: int = 60) -> List[Tuple[IndexItem, float]]:
+    """
+    Fuse several rankings with reciprocal rank fusion (score = sum of 1 / (k + rank)).
+    
+    Items with identical text are merged, so a chunk found by both retrievers
+    ranks above chunks found by only one of them.
+    
+    Args:
+        rankings: Ranked item lists (best first)
+        limit: Number of fused results
+        k: RRF rank constant
+    
+    Returns:
+        List of (item, fused score) sorted by descending score
+    """
+    fused: Dict[str, Tuple[IndexItem, float]] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            key = " ".join(item.text.split()) or item.id
+            current = fused.get(key)
+            fused[key] = (current[0] if current else item, (current[1] if current else 0.0) + 1.0 / (k + rank))
+    return sorted(fused.values(), key=lambda entry: entry[1], reverse=True)[:limit]
+
+
+class HybridRetriever(LocalRetriever):
+    """
+    Dense + lexical retrieval: BM25 over uploaded documents fused with the local
+    vector index (when configured) before the prompt is built.
+    
+    Without a vector index only the lexical results are used and no embedding
+    call is made.
+    """
+    
+    name = HYBRID_BACKEND
+    
+    def __init__(self, index: Optional[VectorIndex], lexical: LexicalIndex, top_k: int = AI_SEARCH_MAX_NUM_RESULTS):
+        super().__init__(index, top_k)
+        self.lexical = lexical
+    
+    async def retrieve(self, client: httpx.AsyncClient, query: str) -> List[Tuple[IndexItem, float]]:
+        lexical = [
+            IndexItem(id=f"{passage.source}#{passage.position}", text=passage.text, metadata={"filename": passage.source})
+            for passage, _ in self.lexical.search(query, self.top_k)
+        ]
+        dense = []
+        if self.index is not None:
+            dense = [item for item, _ in await super().retrieve(client, query)]
+        return reciprocal_rank_fusion([lexical, dense], self.top_k, settings.hybrid_rrf_k)
+    
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "vectors": len(self.index) if self.index is not None else 0,
+            "lexical": self.lexical.stats(),
+            "top_k": self.top_k,
+        }
+
+
+def create_retriever(lexical_index: Optional[LexicalIndex] = None) -> Retriever:
+    """
+    Create the answer backend selected by RETRIEVAL_BACKEND.
+    
+    Args:
+        lexical_index: Shared BM25 index of uploaded documents (required for hybrid)
+    
+    Returns:
+        Retriever instance
+    
+    Raises:
+        ValueError: If the backend is unknown or its indexes are not configured
+    """
+    backend = settings.retrieval_backend.lower()
+    if backend == AI_SEARCH_BACKEND:
+        return AISearchRetriever()
+    if backend == LOCAL_BACKEND:
+        if not settings.local_index_path:
+            raise ValueError("LOCAL_INDEX_PATH is required when RETRIEVAL_BACKEND=local")
+        index = VectorIndex.load(settings.local_index_path, mmap=settings.local_index_mmap)
+        return LocalRetriever(index, settings.local_index_top_k)
+    if backend == HYBRID_BACKEND:
+        if lexical_index is None:
+            raise ValueError("LEXICAL_INDEX_ENABLED=true is required when RETRIEVAL_BACKEND=hybrid")
+        index = None
+        if settings.local_index_path:
+            index = VectorIndex.load(settings.local_index_path, mmap=settings.local_index_mmap)
+        return HybridRetriever(index, lexical_index, settings.local_index_top_k)
+    raise ValueError(f"Unknown RETRIEVAL_BACKEND '{settings.retrieval_backend}'")
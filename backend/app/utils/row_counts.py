@@ -0,0 +1,219 @@
+"""
+In-process row counters and change watermarks for the public list endpoints.
+
+/api/files/count and /api/results/count are polled by every open public page,
+and COUNT(*) on InnoDB scans a whole index. Instead, each count is read from
+the database once at startup, incremented by the code that inserts rows
+(after commit) and re-read every ROW_COUNTS_RECONCILE_SECONDS. The re-read
+corrects drift, e.g. rows inserted by other workers or processes.
+
+With ROW_COUNTS_CACHED=false (or ?exact=true) the endpoints run COUNT(*).
+
+The watermark of a table is its newest (created_at, id). With the row count it
+versions the list pages (ETag), and it is the starting point of ?since= delta
+requests. Inserts in this process invalidate it; otherwise it is re-read (one index lookup) at most
+every LIST_WATERMARK_TTL_SECONDS, which bounds how long rows inserted by other
+workers go unnoticed.
+"""
+import asyncio
+import hashlib
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import File, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Counter names
+FILES = "files"
+RESPONSES = "responses"
+
+
+class RowCounts:
+    """
+    Cached row counts, kept current by insert notifications and periodic reconciliation.
+    """
+    
+    def __init__(self, models: Dict[str, Any]):
+        self._models = models
+        self._counts: Dict[str, int] = {}
+        # Rows added since startup, to keep increments made during a reconcile query
+        self._added: Dict[str, int] = defaultdict(int)
+        self._task: Optional[asyncio.Task] = None
+        self._watermarks: Dict[str, Optional[Tuple[datetime, int]]] = {}
+        self._watermark_read_at: Dict[str, float] = {}
+        self._watermark_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.reconciled_at: Optional[float] = None
+        self.hits = 0
+        self.exact_queries = 0
+        self.corrections = 0
+        self.watermark_queries = 0
+    
+    async def _count(self, db: AsyncSession, name: str) -> int:
+        model = self._models[name]
+        self.exact_queries += 1
+        result = await db.execute(select(func.count(model.id)))
+        return result.scalar()
+    
+    async def start(self) -> None:
+        """
+        Seed the counters and start periodic reconciliation (no-op unless ROW_COUNTS_CACHED).
+        """
+        if not settings.row_counts_cached or self._task is not None:
+            return
+        try:
+            await self.reconcile()
+        except Exception as e:
+            # Counts are seeded by the first request instead
+            print(f"⚠️  Warning: Could not seed row counts: {e}")
+        self._task = asyncio.create_task(self._run())
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.row_counts_reconcile_seconds)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                print(f"⚠️  Warning: Could not reconcile row counts: {e}")
+    
+    async def reconcile(self) -> None:
+        """
+        Re-read every count from the database.
+        """
+        async with AsyncSessionLocal() as db:
+            for name in self._models:
+                await self._refresh(db, name)
+        self.reconciled_at = time.time()
+    
+    async def _refresh(self, db: AsyncSession, name: str) -> int:
+        added_before = self._added[name]
+        count = await self._count(db, name)
+        # Keep rows reported while the query ran (they may be counted twice until the next reconcile)
+        count += self._added[name] - added_before
+        if name in self._counts and self._counts[name] != count:
+            self.corrections += 1
+        self._counts[name] = count
+        return count
+    
+    def add(self, name: str, rows: int = 1) -> None:
+        """
+        Record committed inserts.
+        
+        Args:
+            name: Counter name (FILES or RESPONSES)
+            rows: Number of inserted rows
+        """
+        self._added[name] += rows
+        if name in self._counts:
+            self._counts[name] += rows
+        self._watermark_read_at.pop(name, None)
+    
+    async def get(self, db: AsyncSession, name: str, exact: bool = False) -> int:
+        """
+        Get a row count.
+        
+        Args:
+            db: Database session (used for exact counts and unseeded counters)
+            name: Counter name (FILES or RESPONSES)
+            exact: Run COUNT(*) instead of using the counter
+        
+        Returns:
+            Number of rows
+        """
+        if exact or not settings.row_counts_cached:
+            return await self._count(db, name)
+        if name not in self._counts:
+            return await self._refresh(db, name)
+        self.hits += 1
+        return self._counts[name]
+    
+    async def watermark(self, name: str) -> Optional[Tuple[datetime, int]]:
+        """
+        Get the newest (created_at, id) of a table.
+        
+        Args:
+            name: Counter name (FILES or RESPONSES)
+        
+        Returns:
+            (created_at, id) of the newest row, None if the table is empty
+        """
+        async with self._watermark_locks[name]:
+            read_at = self._watermark_read_at.get(name)
+            if read_at is not None and time.monotonic() - read_at < settings.list_watermark_ttl_seconds:
+                return self._watermarks[name]
+            model = self._models[name]
+            self.watermark_queries += 1
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(model.created_at, model.id)
+                    .order_by(model.created_at.desc(), model.id.desc())
+                    .limit(1)
+                )
+                row = result.first()
+            self._watermarks[name] = (row.created_at, row.id) if row else None
+            self._watermark_read_at[name] = time.monotonic()
+            return self._watermarks[name]
+    
+    async def etag(self, name: str, *variant: Any) -> Tuple[str, Optional[Tuple[datetime, int]]]:
+        """
+        Build a strong ETag for a view of a table.
+        The tag covers the watermark and the row count, so that deletes change it too:
+        the cached count (deletes show after the next reconcile), or COUNT(*) when
+        ROW_COUNTS_CACHED=false.
+        
+        Args:
+            name: Counter name (FILES or RESPONSES)
+            variant: Request parameters selecting the view (page, page size, cursors)
+        
+        Returns:
+            Quoted ETag and the watermark it was derived from
+        """
+        watermark = await self.watermark(name)
+        # The count changes on deletes, which leave the newest row in place
+        parts = [name, *(watermark or ("", "")), await self._etag_count(name), *variant]
+        digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32]
+        return f'"{digest}"', watermark
+    
+    async def _etag_count(self, name: str) -> int:
+        if settings.row_counts_cached and name in self._counts:
+            self.hits += 1
+            return self._counts[name]
+        # Live count without the cache, seeded count otherwise
+        async with AsyncSessionLocal() as db:
+            return await self.get(db, name)
+    
+    async def stop(self) -> None:
+        """
+        Stop periodic reconciliation.
+        """
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    
+    def stats(self) -> dict:
+        """
+        Get counter values and usage.
+        
+        Returns:
+            Dictionary with counts, cache hits, COUNT(*) queries, corrections made by
+            reconciliation and watermark lookups
+        """
+        return {
+            "enabled": settings.row_counts_cached,
+            "counts": dict(self._counts),
+            "hits": self.hits,
+            "exact_queries": self.exact_queries,
+            "corrections": self.corrections,
+            "watermark_queries": self.watermark_queries,
+            "reconciled_seconds_ago": round(time.time() - self.reconciled_at, 1) if self.reconciled_at else None,
+        }
+
+
+# Global counters for the public count endpoints
+row_counts = RowCounts({FILES: File, RESPONSES: Response})
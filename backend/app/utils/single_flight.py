@@ -0,0 +1,94 @@
+"""
+In-flight request coalescing (single-flight).
+
+Concurrent callers asking for the same key share one upstream call: the first
+caller starts it and everyone else awaits the same future.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls by key.
+    
+    The shared call runs in its own task and is shielded from the callers, so a
+    disconnecting client never cancels the work other callers are waiting on.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+    
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # Also marks the exception as retrieved when nobody is left waiting
+            self.failures += 1
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() once per key among concurrent callers and share its result.
+        
+        Args:
+            key: Deduplication key
+            fn: Zero-argument coroutine factory performing the actual call
+        
+        Returns:
+            Result of the shared call
+        
+        Raises:
+            Exception: Whatever the shared call raised, re-raised in every caller
+        """
+        self.calls += 1
+        
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        
+        return await asyncio.shield(task)
+    
+    def in_flight(self, key: str) -> bool:
+        """
+        Check whether a call for key is already running (joining it costs no upstream call).
+        
+        Args:
+            key: Deduplication key
+        
+        Returns:
+            True if a shared call is in flight
+        """
+        return key in self._inflight
+    
+    def stats(self) -> dict:
+        """
+        Get coalescing counters.
+        
+        Returns:
+            Dictionary with call, execution and coalesced counts
+        """
+        return {
+            "calls": self.calls,
+            "upstream_executions": self.executions,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "in_flight": len(self._inflight),
+            "coalesced_ratio": self.coalesced / self.calls if self.calls else 0.0,
+        }
+
+
+# Global single-flight group for Cloudflare AI Search queries
+ai_search_flight = SingleFlight()
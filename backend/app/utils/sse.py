@@ -0,0 +1,32 @@
+"""
+Server-Sent Events helpers.
+"""
+import json
+from typing import Any, Optional
+
+# Headers for SSE responses (disable proxy buffering so events are flushed immediately)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    """
+    Format a single Server-Sent Event.
+    
+    Args:
+        event: Event name
+        data: JSON-serializable payload
+        event_id: Optional event id (used by clients for Last-Event-ID)
+    
+    Returns:
+        Encoded event block
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
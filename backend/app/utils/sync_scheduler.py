@@ -0,0 +1,289 @@
+"""
+Debounced, coalesced AI Search sync scheduling.
+
+Every sync re-scans the whole R2 bucket, so instead of one sync per uploaded
+file, uploads only mark the index dirty:
+
+- A sync starts once no upload has arrived for AI_SEARCH_SYNC_DEBOUNCE_SECONDS,
+  or AI_SEARCH_SYNC_MAX_DELAY_SECONDS after the first pending upload (so a
+  steady stream of uploads still gets indexed).
+- Only one sync runs at a time. The returned job is followed until it ends
+  (AI_SEARCH_SYNC_POLL_SECONDS); uploads arriving meanwhile are coalesced
+  into a single follow-up sync.
+- A failed trigger keeps the index dirty and is retried after
+  AI_SEARCH_SYNC_RETRY_SECONDS.
+- When the job ends (or can no longer be followed), cached AI answers are
+  dropped again: questions asked while the new files were being indexed
+  were answered from the old index.
+"""
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Optional
+
+import httpx
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.utils.ai_search import cloudflare_headers
+from app.utils.answer_cache import answer_cache
+from app.utils.http_client import HTTPClientRegistry
+
+# Scheduler states
+IDLE = "idle"
+SCHEDULED = "scheduled"
+RUNNING = "running"
+
+# Sync jobs kept for the status endpoint
+JOB_HISTORY = 20
+
+
+def sync_url() -> str:
+    """Get the AI Search sync endpoint URL"""
+    return f"{settings.cloudflare_api_base_url}/accounts/{settings.cloudflare_account_id}/autorag/rags/{settings.ai_search_name}/sync"
+
+
+def sync_error_message(error: Exception) -> str:
+    """
+    Describe a failed sync trigger.
+    
+    Args:
+        error: Exception raised while calling the sync endpoint
+    
+    Returns:
+        Human-readable reason
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        if error.response.status_code == 401:
+            return "Invalid API token for AI Search sync"
+        if error.response.status_code == 403:
+            return "API token lacks permissions for AI Search sync"
+        if error.response.status_code == 404:
+            return f"AI Search '{settings.ai_search_name}' not found"
+        return f"HTTP {error.response.status_code}"
+    return str(error) or type(error).__name__
+
+
+def _utc(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class SyncScheduler:
+    """
+    Background task turning "index is dirty" marks into as few syncs as possible.
+    """
+    
+    def __init__(self):
+        self._http_clients: Optional[HTTPClientRegistry] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._stop = asyncio.Event()
+        self.pending = 0
+        self._first_pending_at = 0.0
+        self._last_pending_at = 0.0
+        self._retry_at = 0.0
+        self.running = False
+        self.current_job_id: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.jobs: Deque[dict] = deque(maxlen=JOB_HISTORY)
+        self.marks = 0
+        self.syncs = 0
+        self.failures = 0
+    
+    def start(self, http_clients: HTTPClientRegistry) -> None:
+        """
+        Start the background scheduling task.
+        
+        Args:
+            http_clients: Shared HTTP client registry (Cloudflare API client)
+        """
+        self._http_clients = http_clients
+        if self._task is None or self._task.done():
+            self._stop.clear()
+            self._task = asyncio.create_task(self._run())
+    
+    def mark_dirty(self, uploads: int = 1) -> dict:
+        """
+        Record new files in R2 that AI Search has not indexed yet.
+        
+        Args:
+            uploads: Number of uploaded files
+        
+        Returns:
+            Current sync status (see status())
+        """
+        now = time.monotonic()
+        if not self.pending:
+            self._first_pending_at = now
+        self._last_pending_at = now
+        self.pending += uploads
+        self.marks += uploads
+        self._wake.set()
+        return self.status()
+    
+    def _due_in(self) -> float:
+        """Seconds until the pending uploads should be synced"""
+        due = min(
+            self._last_pending_at + settings.ai_search_sync_debounce_seconds,
+            self._first_pending_at + settings.ai_search_sync_max_delay_seconds
+        )
+        return max(due, self._retry_at) - time.monotonic()
+    
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            
+            # Debounce: wait until uploads stop arriving (or the maximum delay passes)
+            while self.pending and not self._stop.is_set():
+                delay = self._due_in()
+                if delay <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                    self._wake.clear()
+                except asyncio.TimeoutError:
+                    pass
+            
+            if self.pending:
+                coalesced, self.pending = self.pending, 0
+                if not await self._sync(coalesced):
+                    # Keep the index dirty and try again later
+                    self.pending += coalesced
+                    self._retry_at = time.monotonic() + settings.ai_search_sync_retry_seconds
+                    self._wake.set()
+            
+            if self._stop.is_set() and (not self.pending or self._retry_at > time.monotonic()):
+                return
+    
+    async def _sync(self, uploads: int) -> bool:
+        """Trigger one sync and follow its job; False if it could not be started"""
+        self.running = True
+        try:
+            response = await self._http_clients.cloudflare.patch(
+                sync_url(),
+                headers=cloudflare_headers(),
+                timeout=settings.ai_search_sync_timeout
+            )
+            response.raise_for_status()
+            result = response.json()
+            if not result.get("success", False):
+                raise RuntimeError(f"AI Search sync could not be triggered: {result.get('errors', 'Unknown error')}")
+        except Exception as error:
+            self.failures += 1
+            self.last_error = sync_error_message(error)
+            print(f"⚠️  Warning: AI Search sync failed ({uploads} pending uploads): {self.last_error}")
+            self.running = False
+            return False
+        
+        self.syncs += 1
+        self.last_error = None
+        self._retry_at = 0.0
+        job = {
+            "job_id": (result.get("result") or {}).get("job_id"),
+            "uploads": uploads,
+            "started_at": _utc(time.time()),
+            "ended_at": None,
+            "end_reason": None,
+        }
+        self.jobs.appendleft(job)
+        self.current_job_id = job["job_id"]
+        try:
+            if job["job_id"] and settings.ai_search_sync_poll_seconds > 0:
+                await self._wait_for_job(job)
+        finally:
+            self.current_job_id = None
+            self.running = False
+        # Also after a timeout or unknown job status: the index may have changed by now
+        await self._invalidate_answers()
+        return True
+    
+    async def _invalidate_answers(self) -> None:
+        """Drop answers cached while the sync job was indexing"""
+        try:
+            async with AsyncSessionLocal() as db:
+                await answer_cache.invalidate(db)
+                await db.commit()
+        except Exception as e:
+            print(f"⚠️  Warning: Could not invalidate answer cache after sync: {e}")
+    
+    async def _wait_for_job(self, job: dict) -> None:
+        """Poll the sync job until AI Search reports it ended (bounded; stops on shutdown)"""
+        url = f"{sync_url().rsplit('/', 1)[0]}/jobs/{job['job_id']}"
+        deadline = time.monotonic() + settings.ai_search_sync_job_timeout
+        while time.monotonic() < deadline:
+            try:
+                await asyncio.wait_for(self._stop.wait(), settings.ai_search_sync_poll_seconds)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                response = await self._http_clients.cloudflare.get(
+                    url,
+                    headers=cloudflare_headers(),
+                    timeout=settings.ai_search_sync_timeout
+                )
+                response.raise_for_status()
+                result = response.json().get("result") or {}
+            except Exception as error:
+                # Without job status, fall back to the debounce alone
+                print(f"⚠️  Warning: Could not read AI Search sync job {job['job_id']}: {sync_error_message(error)}")
+                return
+            if result.get("ended_at"):
+                job["ended_at"] = result["ended_at"]
+                job["end_reason"] = result.get("end_reason")
+                return
+    
+    def status(self) -> dict:
+        """
+        Get the current sync state.
+        
+        Returns:
+            Dictionary with state (idle, scheduled or running), pending uploads,
+            seconds until the next sync, current and last job IDs and last error
+        """
+        if self.running:
+            state = RUNNING
+        elif self.pending:
+            state = SCHEDULED
+        else:
+            state = IDLE
+        return {
+            "state": state,
+            "pending_uploads": self.pending,
+            "next_sync_in_seconds": round(max(0.0, self._due_in()), 1) if self.pending and not self.running else None,
+            "current_job_id": self.current_job_id,
+            "last_job_id": self.jobs[0]["job_id"] if self.jobs else None,
+            "last_error": self.last_error,
+        }
+    
+    def stats(self) -> dict:
+        """
+        Get sync status, counters and recent jobs.
+        
+        Returns:
+            Dictionary for monitoring
+        """
+        return {
+            **self.status(),
+            "uploads_marked": self.marks,
+            "syncs_started": self.syncs,
+            "syncs_saved": max(0, self.marks - self.syncs - self.pending),
+            "failures": self.failures,
+            "jobs": list(self.jobs),
+        }
+    
+    async def stop(self) -> None:
+        """
+        Run a final sync for uploads still pending, then stop the task.
+        """
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        self._stop.set()
+        self._wake.set()
+        try:
+            await asyncio.wait_for(task, settings.ai_search_sync_timeout + 5)
+        except asyncio.TimeoutError:
+            task.cancel()
+            print(f"⚠️  Warning: AI Search sync did not finish before shutdown ({self.pending} uploads pending)")
@@ -5,11 +5,12 @@ import httpx
 from app.config import settings
 
 
-async def verify_turnstile(token: str, remote_ip: str = "") -> bool:
+async def verify_turnstile(client: httpx.AsyncClient, token: str, remote_ip: str = "") -> bool:
     """
     Verify Cloudflare Turnstile token.
     
     Args:
+        client: Shared HTTP client for the Turnstile upstream
         token: Turnstile token from client
         remote_ip: Client IP address (optional)
         
@@ -20,8 +21,6 @@ async def verify_turnstile(token: str, remote_ip: str = "") -> bool:
         # Development mode with test key - always pass
         return True
     
-    url = "https://challenges.cloudflare.com/turnstile/v0/siteverify"
-    
     data = {
         "secret": settings.turnstile_secret_key,
         "response": token,
@@ -31,9 +30,8 @@ async def verify_turnstile(token: str, remote_ip: str = "") -> bool:
         data["remoteip"] = remote_ip
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, data=data)
-            result = response.json()
-            return result.get("success", False)
+        response = await client.post(settings.turnstile_verify_url, data=data)
+        result = response.json()
+        return result.get("success", False)
     except Exception:
         return False
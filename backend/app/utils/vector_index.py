@@ -0,0 +1,246 @@
+"""
+In-process vector index for local retrieval.
+
+Vectors exported by utils/vectorize-inspector (id, values, metadata) are stored
+L2-normalized in one contiguous row-major NumPy matrix, so a cosine top-k query
+is a matrix product followed by a partial sort. Queries are scored in batches
+and the matrix is scanned in row blocks, which bounds temporary memory and lets
+memory-mapped indexes larger than RAM be searched.
+
+Saved index layout (directory):
+    vectors.npy   normalized float32/float16 matrix (n x dimensions)
+    items.jsonl   one {"id", "text", "metadata"} object per row
+
+Usage:
+    python -m app.utils.vector_index <export.json> <index_dir> [float32|float16]
+"""
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"
+ITEMS_FILE = "items.jsonl"
+
+# Rows scored per block (bounds the temporary score matrix to block x queries)
+DEFAULT_BLOCK_SIZE = 65536
+
+
+@dataclass
+class IndexItem:
+    """Payload of one indexed vector"""
+    id: str
+    text: str = ""
+    metadata: dict = field(default_factory=dict)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize the rows of a matrix (zero rows are left as zeros).
+    
+    Args:
+        matrix: 2-D array
+    
+    Returns:
+        float32 array with unit-length rows
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _merge_top_k(scores: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the k best columns of each row of scores (unordered)"""
+    if scores.shape[1] <= k:
+        return scores, ids
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, best, axis=1), np.take_along_axis(ids, best, axis=1)
+
+
+class VectorIndex:
+    """
+    Exact cosine-similarity index over a contiguous (optionally memory-mapped) matrix.
+    """
+    
+    def __init__(self, vectors: np.ndarray, items: List[IndexItem]):
+        """
+        Args:
+            vectors: Row-normalized matrix (n x dimensions), float32 or float16
+            items: Payload for every row
+        
+        Raises:
+            ValueError: If the matrix and items do not match
+        """
+        if vectors.ndim != 2 or vectors.shape[0] != len(items):
+            raise ValueError(f"Expected {len(items)} rows, got matrix of shape {vectors.shape}")
+        self.vectors = vectors
+        self.items = items
+    
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+    
+    @property
+    def dimensions(self) -> int:
+        return self.vectors.shape[1]
+    
+    @classmethod
+    def from_arrays(cls, vectors: np.ndarray, items: List[IndexItem], dtype: str = "float32") -> "VectorIndex":
+        """
+        Build an index from raw (unnormalized) vectors.
+        
+        Args:
+            vectors: Matrix of embeddings (n x dimensions)
+            items: Payload for every row
+            dtype: Storage type ("float32" or "float16")
+        
+        Returns:
+            VectorIndex
+        """
+        matrix = np.ascontiguousarray(normalize_rows(vectors).astype(dtype, copy=False))
+        return cls(matrix, items)
+    
+    @classmethod
+    def from_export(cls, path: str, dtype: str = "float32") -> "VectorIndex":
+        """
+        Load a JSON export written by utils/vectorize-inspector.
+        
+        Chunk text is read from the vector metadata ("text"), as stored by AI Search.
+        
+        Args:
+            path: Path to the export file ({"vectors": [{"id", "values", "metadata"}]})
+            dtype: Storage type ("float32" or "float16")
+        
+        Returns:
+            VectorIndex
+        
+        Raises:
+            ValueError: If the export contains no vectors with values
+        """
+        with open(path, encoding="utf-8") as f:
+            export = json.load(f)
+        
+        records = [v for v in export.get("vectors", []) if v.get("values")]
+        if not records:
+            raise ValueError(f"No vectors with values found in {path}")
+        
+        items = []
+        for record in records:
+            metadata = record.get("metadata") or {}
+            items.append(IndexItem(id=str(record["id"]), text=record.get("text") or metadata.get("text", ""), metadata=metadata))
+        return cls.from_arrays(np.array([r["values"] for r in records], dtype=np.float32), items, dtype)
+    
+    def save(self, directory: str) -> None:
+        """
+        Save the index so it can be loaded memory-mapped.
+        
+        Args:
+            directory: Target directory (created if missing)
+        """
+        target = Path(directory)
+        target.mkdir(parents=True, exist_ok=True)
+        np.save(target / VECTORS_FILE, self.vectors)
+        with open(target / ITEMS_FILE, "w", encoding="utf-8") as f:
+            for item in self.items:
+                f.write(json.dumps({"id": item.id, "text": item.text, "metadata": item.metadata}, ensure_ascii=False) + "\n")
+    
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorIndex":
+        """
+        Load a saved index directory or a vectorize-inspector JSON export.
+        
+        Args:
+            path: Index directory (see save()) or export .json file
+            mmap: Memory-map the matrix instead of reading it into RAM
+        
+        Returns:
+            VectorIndex
+        """
+        source = Path(path)
+        if source.is_file():
+            return cls.from_export(str(source))
+        
+        vectors = np.load(source / VECTORS_FILE, mmap_mode="r" if mmap else None)
+        with open(source / ITEMS_FILE, encoding="utf-8") as f:
+            items = [IndexItem(**json.loads(line)) for line in f if line.strip()]
+        return cls(vectors, items)
+    
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        block_size: int = DEFAULT_BLOCK_SIZE
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact top-k cosine search for a batch of query vectors.
+        
+        Args:
+            queries: One query (dimensions,) or a batch (m x dimensions)
+            k: Number of neighbours per query
+            block_size: Rows of the matrix scored at a time
+        
+        Returns:
+            Tuple of (row indices, scores), both m x k and sorted by descending score
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        if queries.shape[1] != self.dimensions:
+            raise ValueError(f"Query has {queries.shape[1]} dimensions, index has {self.dimensions}")
+        k = min(k, len(self))
+        
+        best_scores = np.empty((queries.shape[0], 0), dtype=np.float32)
+        best_ids = np.empty((queries.shape[0], 0), dtype=np.int64)
+        for start in range(0, len(self), block_size):
+            block = np.asarray(self.vectors[start:start + block_size], dtype=np.float32)
+            scores = queries @ block.T
+            # Reduce the block to its own top-k before merging with the running best
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if scores.shape[1] > k else np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            best_scores, best_ids = _merge_top_k(
+                np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1),
+                np.concatenate([best_ids, top + start], axis=1),
+                k
+            )
+        
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_ids, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+    
+    def query(self, vector: Sequence[float], k: int = 10) -> List[Tuple[IndexItem, float]]:
+        """
+        Top-k items for a single query vector.
+        
+        Args:
+            vector: Query embedding
+            k: Number of results
+        
+        Returns:
+            List of (item, cosine similarity) sorted by descending similarity
+        """
+        ids, scores = self.search(np.asarray(vector, dtype=np.float32), k)
+        return [(self.items[i], float(s)) for i, s in zip(ids[0], scores[0])]
+
+
+def convert_export(export_path: str, index_dir: str, dtype: str = "float32") -> VectorIndex:
+    """
+    Convert a vectorize-inspector export into a memory-mappable index directory.
+    
+    Args:
+        export_path: Export JSON file
+        index_dir: Target index directory
+        dtype: Storage type ("float32" or "float16")
+    
+    Returns:
+        The converted index
+    """
+    index = VectorIndex.from_export(export_path, dtype)
+    index.save(index_dir)
+    return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    converted = convert_export(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "float32")
+    print(f"✅ Saved {len(converted)} vectors ({converted.dimensions} dimensions, {converted.vectors.dtype}) to {sys.argv[2]}")
@@ -0,0 +1,86 @@
+"""
+Backfill the SHA-256 of files stored before content deduplication.
+
+Uploads record the hash of their content (files.sha256) and reuse the stored
+R2 object when the same content is uploaded again. Rows created before that
+have no hash, so their content is never matched; run this once after
+database/06_add_files_sha256.sql to hash their R2 objects.
+
+Objects are streamed part by part, never loaded whole. Rows sharing an object
+are updated together. Duplicate content already stored under several keys is
+reported, not merged.
+
+Usage:
+    python backfill_file_hashes.py [--concurrency 8]
+"""
+import argparse
+import asyncio
+
+from app.config import settings
+from app.database import AsyncSessionLocal, close_db
+from app.models import File as FileModel
+from app.utils.r2 import R2Storage, hash_content
+from sqlalchemy import func, select, update
+
+
+async def backfill(concurrency: int) -> None:
+    print("=" * 60)
+    print("FILE HASH BACKFILL")
+    print("=" * 60)
+    
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(FileModel.absolute_path).where(FileModel.sha256.is_(None)).distinct()
+        )
+        paths = list(result.scalars())
+    print(f"Objects to hash: {len(paths)}\n")
+    
+    r2 = R2Storage()
+    await r2.start()
+    semaphore = asyncio.Semaphore(concurrency)
+    hashed = 0
+    
+    async def hash_object(path: str) -> None:
+        nonlocal hashed
+        async with semaphore:
+            try:
+                obj = await r2.client.get_object(Bucket=settings.r2_bucket_name, Key=path)
+                async with obj["Body"]:
+                    size, sha256 = await hash_content(obj["Body"].read)
+            except Exception as e:
+                print(f"✗ {path}: {e}")
+                return
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(FileModel)
+                .where(FileModel.absolute_path == path, FileModel.sha256.is_(None))
+                .values(sha256=sha256)
+            )
+            await db.commit()
+        hashed += 1
+        print(f"✓ {path}: {size} bytes, {sha256}")
+    
+    await asyncio.gather(*(hash_object(path) for path in paths))
+    await r2.aclose()
+    
+    # Content stored more than once before deduplication
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(FileModel.sha256, func.count(func.distinct(FileModel.absolute_path)))
+            .where(FileModel.sha256.is_not(None))
+            .group_by(FileModel.sha256)
+            .having(func.count(func.distinct(FileModel.absolute_path)) > 1)
+        )
+        duplicates = result.all()
+    
+    print(f"\n✅ Hashed {hashed} of {len(paths)} objects")
+    if duplicates:
+        copies = sum(count - 1 for _, count in duplicates)
+        print(f"⚠️  {len(duplicates)} distinct contents are stored under more than one key ({copies} redundant objects)")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hash R2 objects of files uploaded before deduplication")
+    parser.add_argument("--concurrency", type=int, default=8, help="Objects hashed in parallel")
+    asyncio.run(backfill(parser.parse_args().concurrency))
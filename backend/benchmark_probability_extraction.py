@@ -0,0 +1,111 @@
+"""
+Micro-benchmark for probability extraction.
+Compares the precompiled engine (app/utils/probability.py) with the previous
+sequential regex implementation on the test corpus and on large synthetic answers.
+
+Usage:
+    python benchmark_probability_extraction.py
+"""
+import re
+import time
+import timeit
+
+from app.utils.probability import extract_probability
+from test_probability_extraction import test_responses
+
+
+def legacy_extract_probability(ai_response_text):
+    """Previous implementation (five sequential re.search passes), kept as baseline"""
+    probability_percentage = None
+    
+    probability_match = re.search(r'PROBABILITY:\s*(\d+)%', ai_response_text, re.IGNORECASE | re.MULTILINE)
+    if not probability_match:
+        probability_match = re.search(r'is\s+approximately\s+\*\*(\d+)%\*\*', ai_response_text, re.IGNORECASE)
+    if not probability_match:
+        probability_match = re.search(r'probability.*?is.*?(\d+)%', ai_response_text, re.IGNORECASE | re.DOTALL)
+    if not probability_match:
+        koi_match = re.search(r'koi[_\s]*score.*?(?:of|is)\s+\*\*?(0\.\d+)\*\*?', ai_response_text, re.IGNORECASE | re.DOTALL)
+        if koi_match:
+            percentage_value = int(float(koi_match.group(1)) * 100)
+            if 0 <= percentage_value <= 100:
+                probability_percentage = percentage_value
+    if not probability_match and not probability_percentage:
+        probability_match = re.search(r'(\d+)%\s*$', ai_response_text, re.MULTILINE)
+    if probability_match and not probability_percentage:
+        percentage_value = int(probability_match.group(1))
+        if 0 <= percentage_value <= 100:
+            probability_percentage = percentage_value
+    if probability_percentage is not None:
+        ai_response_text = re.sub(r'\n*PROBABILITY:\s*\d+%\s*$', '', ai_response_text, flags=re.IGNORECASE | re.MULTILINE).strip()
+    
+    return ai_response_text, probability_percentage
+
+
+PARAGRAPH = (
+    "The Kepler pipeline reports transit depth, period and stellar parameters for this object. "
+    "The probability that a signal is astrophysical depends on the false positive flags, "
+    "and the koi_score summarizes this disposition. "
+)
+
+# Legacy runs are skipped once a single call exceeds this many seconds
+LEGACY_TIME_LIMIT = 2.0
+
+
+def long_answer(paragraphs, conclusion=True):
+    """Multi-paragraph answer, optionally ending with a probability sentence"""
+    text = "\n\n".join([PARAGRAPH] * paragraphs)
+    if conclusion:
+        text += "\n\nThe probability is approximately **87%**."
+    return text
+
+
+def bench(fn, text, number):
+    return min(timeit.repeat(lambda: fn(text), number=number, repeat=3)) / number
+
+
+def main():
+    print("=" * 78)
+    print("PROBABILITY EXTRACTION BENCHMARK")
+    print("=" * 78)
+    
+    # Both engines must agree on the corpus and on the synthetic answers
+    for i, response in enumerate(test_responses, 1):
+        assert extract_probability(response) == legacy_extract_probability(response), f"Mismatch on test {i}"
+    for paragraphs in (1, 5, 20):
+        for conclusion in (True, False):
+            text = long_answer(paragraphs, conclusion)
+            assert extract_probability(text) == legacy_extract_probability(text), "Mismatch on synthetic answer"
+    print(f"\n✓ Results identical to the previous implementation on the test corpus and synthetic answers")
+    
+    cases = {f"test corpus #{i}": text for i, text in enumerate(test_responses, 1)}
+    cases["long answer (200 paragraphs)"] = long_answer(200)
+    
+    print(f"\n{'case':<38}{'chars':>8}{'legacy (µs)':>14}{'new (µs)':>12}{'speedup':>9}")
+    print("-" * 81)
+    for name, text in cases.items():
+        number = 500 if len(text) < 5000 else 20
+        legacy = bench(legacy_extract_probability, text, number) * 1e6
+        new = bench(extract_probability, text, number) * 1e6
+        print(f"{name:<38}{len(text):>8}{legacy:>14.1f}{new:>12.1f}{legacy / new:>8.1f}x")
+    
+    # Worst case: long answers that mention "probability" but contain no percentage
+    print("\nAnswers without a percentage (worst case for the previous patterns):")
+    print(f"{'paragraphs':>12}{'chars':>10}{'legacy (ms)':>14}{'new (ms)':>12}")
+    legacy_enabled = True
+    for paragraphs in (5, 10, 20, 40, 80, 400, 2000):
+        text = long_answer(paragraphs, conclusion=False)
+        new = bench(extract_probability, text, 3) * 1e3
+        legacy_column = "skipped"
+        if legacy_enabled:
+            start = time.perf_counter()
+            legacy_extract_probability(text)
+            elapsed = time.perf_counter() - start
+            legacy_column = f"{elapsed * 1e3:.2f}"
+            legacy_enabled = elapsed < LEGACY_TIME_LIMIT
+        print(f"{paragraphs:>12}{len(text):>10}{legacy_column:>14}{new:>12.3f}")
+    
+    print("\n" + "=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Build the BM25 lexical index from every file already stored through /api/upload.
+
+New uploads are indexed incrementally by the API (LEXICAL_INDEX_ENABLED=true);
+run this once to index files uploaded before, or to rebuild the index file.
+The API must be restarted (or not running) for it to pick up the rebuilt file.
+
+Usage:
+    python build_lexical_index.py [--rebuild]
+"""
+import argparse
+import asyncio
+import io
+
+from app.config import settings
+from app.database import AsyncSessionLocal, close_db
+from app.models import File as FileModel
+from app.utils.lexical_index import (LexicalIndex, extract_text,
+                                     pdf_text_available, prepare_document,
+                                     save_index_file)
+from app.utils.r2 import R2Storage
+from sqlalchemy import select
+
+
+async def build(rebuild: bool) -> None:
+    index = LexicalIndex() if rebuild else LexicalIndex.load(settings.lexical_index_path)
+    print("=" * 60)
+    print("LEXICAL INDEX BUILD")
+    print("=" * 60)
+    print(f"Index file: {settings.lexical_index_path} ({'rebuild' if rebuild else 'incremental'})")
+    if not pdf_text_available():
+        print("⚠️  pypdf is not installed: PDF files will be skipped")
+    
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(FileModel.absolute_path).order_by(FileModel.id))
+        paths = [path for path in result.scalars() if path not in index.sources]
+    print(f"Files to index: {len(paths)}\n")
+    
+    r2 = R2Storage()
+    await r2.start()
+    for path in paths:
+        try:
+            obj = await r2.client.get_object(Bucket=settings.r2_bucket_name, Key=path)
+            content = await obj["Body"].read()
+            text = await asyncio.to_thread(extract_text, path, io.BytesIO(content), settings.lexical_index_max_text_bytes)
+            added = index.add_prepared(await asyncio.to_thread(prepare_document, path, text))
+            print(f"✓ {path}: {added} passages")
+        except Exception as e:
+            print(f"✗ {path}: {e}")
+    await r2.aclose()
+    
+    save_index_file(settings.lexical_index_path, index.dumps())
+    print(f"\n✅ Saved index: {index.stats()}")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the BM25 lexical index from uploaded files")
+    parser.add_argument("--rebuild", action="store_true", help="Start from an empty index instead of the saved one")
+    asyncio.run(build(parser.parse_args().rebuild))
@@ -0,0 +1,151 @@
+"""
+Shared test fixtures: an in-memory fake of the R2 (S3) client and SQLite databases.
+"""
+import hashlib
+import itertools
+import uuid
+from types import SimpleNamespace
+from typing import Dict, List
+
+import pytest
+import pytest_asyncio
+from app.database import Base
+from botocore.exceptions import ClientError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+
+def client_error(code: str, operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+
+class FakeBody:
+    """Streaming body of a fake object"""
+    
+    def __init__(self, data: bytes):
+        self._data = data
+        self._offset = 0
+    
+    async def read(self, size: int = -1) -> bytes:
+        end = len(self._data) if size is None or size < 0 else self._offset + size
+        chunk = self._data[self._offset:end]
+        self._offset += len(chunk)
+        return chunk
+    
+    async def __aenter__(self) -> None:
+        # Like aiobotocore, whose StreamingBody yields the wrapped HTTP response
+        return None
+    
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+
+class FakeS3Client:
+    """
+    In-memory subset of the aioboto3 S3 client used by the upload code.
+    
+    objects maps keys to (content, content type); calls records operation names.
+    """
+    
+    def __init__(self):
+        self.objects: Dict[str, tuple] = {}
+        self.uploads: Dict[str, dict] = {}
+        self.aborted: List[str] = []
+        self.deleted: List[str] = []
+        self.calls: List[str] = []
+        self._ids = itertools.count(1)
+    
+    async def put_object(self, Bucket, Key, Body, ContentType="binary/octet-stream", **kwargs):
+        self.calls.append("put_object")
+        self.objects[Key] = (bytes(Body), ContentType)
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+    
+    async def create_multipart_upload(self, Bucket, Key, ContentType="binary/octet-stream", **kwargs):
+        self.calls.append("create_multipart_upload")
+        upload_id = f"upload-{next(self._ids)}"
+        self.uploads[upload_id] = {"key": Key, "content_type": ContentType, "parts": {}}
+        return {"UploadId": upload_id}
+    
+    async def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self.calls.append("upload_part")
+        if UploadId not in self.uploads:
+            raise client_error("NoSuchUpload", "UploadPart")
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        self.uploads[UploadId]["parts"][PartNumber] = (bytes(Body), etag)
+        return {"ETag": etag}
+    
+    async def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self.calls.append("complete_multipart_upload")
+        upload = self.uploads.pop(UploadId, None)
+        if upload is None:
+            raise client_error("NoSuchUpload", "CompleteMultipartUpload")
+        chunks = []
+        for part in MultipartUpload["Parts"]:
+            data, etag = upload["parts"].get(part["PartNumber"], (None, None))
+            if data is None or etag != part["ETag"]:
+                self.uploads[UploadId] = upload
+                raise client_error("InvalidPart", "CompleteMultipartUpload")
+            chunks.append(data)
+        self.objects[Key] = (b"".join(chunks), upload["content_type"])
+        return {"Key": Key}
+    
+    async def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self.calls.append("abort_multipart_upload")
+        self.uploads.pop(UploadId, None)
+        self.aborted.append(Key)
+    
+    async def head_object(self, Bucket, Key, **kwargs):
+        self.calls.append("head_object")
+        if Key not in self.objects:
+            raise client_error("404", "HeadObject")
+        data, content_type = self.objects[Key]
+        return {"ContentLength": len(data), "ContentType": content_type}
+    
+    async def get_object(self, Bucket, Key, **kwargs):
+        self.calls.append("get_object")
+        if Key not in self.objects:
+            raise client_error("NoSuchKey", "GetObject")
+        data, content_type = self.objects[Key]
+        return {"Body": FakeBody(data), "ContentLength": len(data), "ContentType": content_type}
+    
+    async def delete_object(self, Bucket, Key, **kwargs):
+        self.calls.append("delete_object")
+        self.objects.pop(Key, None)
+        self.deleted.append(Key)
+    
+    async def generate_presigned_url(self, ClientMethod, Params, ExpiresIn, **kwargs):
+        return f"https://r2.test/{Params['Key']}?op={ClientMethod}&part={Params.get('PartNumber', '')}"
+
+
+@pytest.fixture
+def r2():
+    """Stand-in for the shared R2Storage, with a FakeS3Client as client"""
+    return SimpleNamespace(client=FakeS3Client())
+
+
+@pytest_asyncio.fixture
+async def sqlite_sessions(tmp_path):
+    """
+    Factory of session makers on new SQLite databases with the tables of the given models:
+    Session = await sqlite_sessions(File, AnswerCacheEntry)
+    """
+    engines = []
+    
+    async def create(*models):
+        pytest.importorskip("aiosqlite")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / f'test-{len(engines)}.db'}")
+        engines.append(engine)
+        
+        @event.listens_for(engine.sync_engine, "connect")
+        def add_uuid_function(connection, record):
+            # Server default of the uid columns (MariaDB UUID())
+            connection.create_function("uuid", 0, lambda: str(uuid.uuid4()))
+        
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[model.__table__ for model in models])
+        return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    
+    yield create
+    # Sessions must be closed first (aiosqlite threads keep the process alive otherwise)
+    for engine in engines:
+        await engine.dispose()
@@ -5,7 +5,16 @@ from contextlib import asynccontextmanager
 
 from app.config import settings
 from app.database import close_db, init_db
-from app.routers import auth, files, request, results, upload
+from app.routers import auth, events, files, request, results, upload
+from app.utils.change_feed import change_feed
+from app.utils.http_client import HTTPClientRegistry, http2_available
+from app.utils.lexical_index import LexicalIndex, index_saver, pdf_text_available
+from app.utils.list_cache import create_shared_cache, list_cache
+from app.utils.r2 import R2Storage
+from app.utils.response_store import ResponseWriter
+from app.utils.retriever import AISearchRetriever, create_retriever
+from app.utils.row_counts import row_counts
+from app.utils.sync_scheduler import SyncScheduler
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -36,10 +45,78 @@ async def lifespan(app: FastAPI):
     # Initialize database (optional - tables should already exist)
     # await init_db()
     
+    # Shared HTTP clients for Cloudflare upstreams (pooled keep-alive connections)
+    app.state.http_clients = HTTPClientRegistry()
+    app.state.http_clients.start()
+    print(f"✅ HTTP client pools ready (HTTP/2: {'on' if http2_available() else 'off'})")
+    
+    # Debounced AI Search sync after uploads (one sync at a time)
+    app.state.sync_scheduler = SyncScheduler()
+    app.state.sync_scheduler.start(app.state.http_clients)
+    
+    # Shared R2 client (pooled connections, reused by every upload)
+    app.state.r2 = R2Storage()
+    try:
+        await app.state.r2.start()
+        print(f"✅ R2 client ready (bucket: {settings.r2_bucket_name}, pool: {settings.r2_max_connections})")
+    except Exception as e:
+        print(f"❌ Failed to create R2 client: {e}")
+        print("⚠️  API will start but uploads will fail")
+    
+    # BM25 index of uploaded documents (kept up to date by /api/upload)
+    app.state.lexical_index = None
+    if settings.lexical_index_enabled:
+        try:
+            app.state.lexical_index = LexicalIndex.load(settings.lexical_index_path)
+            print(f"✅ Lexical index loaded: {app.state.lexical_index.stats()} (PDF text: {'on' if pdf_text_available() else 'off'})")
+        except Exception as e:
+            app.state.lexical_index = LexicalIndex()
+            print(f"❌ Failed to load lexical index '{settings.lexical_index_path}': {e}")
+            print("⚠️  Starting with an empty lexical index")
+    
+    # Answer backend (Cloudflare AI Search, local vector index or hybrid)
+    try:
+        app.state.retriever = create_retriever(app.state.lexical_index)
+        print(f"✅ Answer backend: {app.state.retriever.stats()}")
+    except Exception as e:
+        app.state.retriever = AISearchRetriever()
+        print(f"❌ Failed to load answer backend '{settings.retrieval_backend}': {e}")
+        print("⚠️  Falling back to Cloudflare AI Search")
+    
+    # Background writer for AI responses (only active with RESPONSE_WRITE_BEHIND=true)
+    app.state.response_writer = ResponseWriter()
+    app.state.response_writer.start()
+    if app.state.response_writer.enabled:
+        print("✅ Write-behind response persistence enabled")
+    
+    # Row counts for the public count endpoints (seeded once, then reconciled periodically)
+    await row_counts.start()
+    if settings.row_counts_cached:
+        print(f"✅ Row counts cached: {row_counts.stats()['counts']}")
+    
+    # Shared tier of the list page cache (LIST_CACHE_SHARED)
+    try:
+        list_cache.shared = create_shared_cache()
+        if list_cache.shared is not None:
+            print(f"✅ List cache shared tier: {list_cache.shared.name}")
+    except Exception as e:
+        print(f"❌ Failed to create list cache shared tier '{settings.list_cache_shared}': {e}")
+        print("⚠️  List pages are cached per worker only")
+    
+    # Change feed for /api/events (one broadcaster for all subscribers)
+    await change_feed.start()
+    
     yield
     
     # Shutdown
     print("👋 Shutting down Exoplanets RAG API...")
+    await change_feed.stop()
+    await row_counts.stop()
+    await app.state.response_writer.stop()
+    await app.state.sync_scheduler.stop()
+    await index_saver.stop()
+    await app.state.r2.aclose()
+    await app.state.http_clients.aclose()
     await close_db()
 
 
@@ -89,6 +166,7 @@ app.include_router(upload.router)
 app.include_router(request.router)
 app.include_router(files.router)
 app.include_router(results.router)
+app.include_router(events.router)
 
 
 # Global exception handler
@@ -96,7 +174,7 @@ app.include_router(results.router)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
     import traceback
-
+    
     # Log the error
     print(f"❌ Error: {type(exc).__name__}: {str(exc)}")
     print(traceback.format_exc())
@@ -0,0 +1,101 @@
+"""
+Tests of the answer cache (app/utils/answer_cache.py): questions that differ
+only in case, whitespace or Unicode form share an entry, parameters do not;
+invalidations reach the LRU tier of every worker through the generation.
+"""
+import pytest
+import pytest_asyncio
+from app.models import AnswerCacheEntry, AnswerCacheGeneration
+from app.utils.answer_cache import AnswerCache, make_cache_key, normalize_query
+
+SYSTEM_MESSAGE = "Answer from the Kepler documents."
+
+
+def key(query: str, system_message: str = SYSTEM_MESSAGE, max_num_results: int = 10, rewrite_query: bool = True) -> str:
+    return make_cache_key(query, system_message, max_num_results, rewrite_query)
+
+
+def test_normalize_query_folds_case_and_whitespace():
+    assert normalize_query("  Is KOI-123  an\texoplanet?\n") == "is koi-123 an exoplanet?"
+
+
+def test_normalize_query_applies_nfkc_and_casefold():
+    # Full-width letters and digits, and ß (casefolds to ss)
+    assert normalize_query("ＫＯＩ－１２３ Straße") == "koi-123 strasse"
+    # Composed and decomposed accents
+    assert normalize_query("\u00d3rbita") == normalize_query("O\u0301rbita") == "\u00f3rbita"
+
+
+def test_cache_key_is_shared_by_equivalent_questions():
+    assert key("Is KOI-123 an exoplanet?") == key("  is koi-123   AN exoplanet?")
+    assert len(key("Is KOI-123 an exoplanet?")) == 64
+
+
+def test_cache_key_depends_on_question_and_parameters():
+    base = key("Is KOI-123 an exoplanet?")
+    assert key("Is KOI-124 an exoplanet?") != base
+    assert key("Is KOI-123 an exoplanet?", system_message="Answer briefly.") != base
+    assert key("Is KOI-123 an exoplanet?", max_num_results=5) != base
+    assert key("Is KOI-123 an exoplanet?", rewrite_query=False) != base
+
+
+def test_cache_key_fields_cannot_run_together():
+    # The separator keeps "a b" + "c" apart from "a" + "b c"
+    assert key("a", system_message="b c") != key("a b", system_message="c")
+
+
+@pytest_asyncio.fixture
+async def Session(sqlite_sessions):
+    return await sqlite_sessions(AnswerCacheEntry, AnswerCacheGeneration)
+
+
+def worker(generation_check_seconds: float = 0.0) -> AnswerCache:
+    """Answer cache of one worker process"""
+    return AnswerCache(max_entries=16, ttl_seconds=3600, generation_check_seconds=generation_check_seconds)
+
+
+@pytest.mark.asyncio
+async def test_invalidation_clears_the_lru_of_other_workers(Session):
+    first, second = worker(), worker()
+    async with Session() as db:
+        assert await first.get(db, "k") is None
+        await first.set(db, "k", "question", "answer", 90)
+        assert (await first.get(db, "k")).response == "answer"
+        
+        await second.invalidate(db)
+        await db.commit()
+        
+        assert await first.get(db, "k") is None
+        assert await first.get_many(db, ["k"]) == {}
+        assert first.stats()["generation"] == 1
+
+
+@pytest.mark.asyncio
+async def test_generation_is_read_at_most_every_check_interval(Session):
+    first, second = worker(generation_check_seconds=3600), worker()
+    async with Session() as db:
+        await first.get(db, "k")
+        await first.set(db, "k", "question", "answer", None)
+        
+        await second.invalidate(db)
+        await db.commit()
+        
+        # Served from the LRU tier until the next generation check
+        assert (await first.get(db, "k")).response == "answer"
+        first.generation_check_seconds = 0
+        assert await first.get(db, "k") is None
+
+
+@pytest.mark.asyncio
+async def test_answers_cached_after_an_invalidation_are_kept(Session):
+    cache = worker()
+    async with Session() as db:
+        await cache.invalidate(db)
+        await cache.invalidate(db)
+        await db.commit()
+        await cache.set(db, "k", "question", "answer", None)
+        
+        assert (await cache.get(db, "k")).response == "answer"
+        assert (await cache.get(db, "k")).response == "answer"
+        assert cache.stats()["generation"] == 2
+        assert cache.local_hits == 2
@@ -0,0 +1,31 @@
+"""
+Tests of the change feed event ids (app/utils/change_feed.py).
+"""
+from datetime import datetime
+
+import pytest
+
+from app.utils.change_feed import decode_event_id, encode_event_id
+from app.utils.pagination import encode_cursor
+from app.utils.row_counts import FILES, RESPONSES
+
+CREATED_AT = datetime(2026, 3, 14, 15, 9, 26, 535897)
+
+
+def test_event_id_round_trip():
+    positions = {FILES: (CREATED_AT, 7), RESPONSES: (datetime(2026, 3, 15), 12)}
+    
+    assert decode_event_id(encode_event_id(positions)) == positions
+
+
+def test_event_id_round_trip_with_empty_tables():
+    positions = {FILES: None, RESPONSES: (CREATED_AT, 3)}
+    
+    assert decode_event_id(encode_event_id(positions)) == positions
+    assert decode_event_id(encode_event_id({FILES: None, RESPONSES: None})) == {FILES: None, RESPONSES: None}
+
+
+@pytest.mark.parametrize("event_id", ["", "abc", "a.b.c", f"{encode_cursor(CREATED_AT, 1)}.@@"])
+def test_decode_event_id_rejects_malformed_ids(event_id):
+    with pytest.raises(ValueError):
+        decode_event_id(event_id)
@@ -0,0 +1,165 @@
+"""
+Tests of the upstream scheduler (app/utils/fair_scheduler.py): weighted fair
+queuing of calls and the per-user admission control.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils import fair_scheduler
+from app.utils.fair_scheduler import FairScheduler, parse_weights
+
+
+class Clock:
+    """Settable replacement for time.monotonic"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_scheduler(max_in_flight: int = 1, max_queue_per_user: int = 10, user_rate: float = 100.0, user_burst: float = 100.0, weights=None) -> FairScheduler:
+    return FairScheduler(max_in_flight, max_queue_per_user, user_rate, user_burst, weights or {})
+
+
+async def serve_queued(scheduler: FairScheduler, calls) -> list:
+    """Queue (user, label) calls behind a held slot, release it and return the labels in service order"""
+    order = []
+    release = asyncio.Event()
+    
+    async def hold():
+        async with scheduler.slot("holder"):
+            await release.wait()
+    
+    async def call(user, label):
+        async with scheduler.slot(user):
+            order.append(label)
+    
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(call(user, label)) for user, label in calls]
+    # Every call is queued before the slot frees up
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    return order
+
+
+def test_parse_weights():
+    assert parse_weights("alice:2, bob:0.5,,invalid") == {"alice": 2.0, "bob": 0.5}
+    assert parse_weights("") == {}
+
+
+@pytest.mark.asyncio
+async def test_deep_queue_does_not_starve_other_users():
+    scheduler = make_scheduler()
+    
+    order = await serve_queued(scheduler, [("alice", "a1"), ("alice", "a2"), ("alice", "a3"), ("bob", "b1")])
+    
+    assert order == ["a1", "b1", "a2", "a3"]
+
+
+@pytest.mark.asyncio
+async def test_weights_set_the_share_of_slots():
+    scheduler = make_scheduler(weights={"alice": 2.0})
+    calls = [("alice", f"a{i}") for i in range(1, 5)] + [("bob", f"b{i}") for i in range(1, 3)]
+    
+    order = await serve_queued(scheduler, calls)
+    
+    # Finish tags: alice 0.5, 1, 1.5, 2 and bob 1, 2 (ties go to the earlier call)
+    assert order == ["a1", "a2", "b1", "a3", "a4", "b2"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    scheduler = make_scheduler()
+    release = asyncio.Event()
+    served = []
+    
+    async def hold():
+        async with scheduler.slot("holder"):
+            await release.wait()
+    
+    async def call(user):
+        async with scheduler.slot(user):
+            served.append(user)
+    
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(call("alice"))
+    waiting = asyncio.create_task(call("bob"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    release.set()
+    await asyncio.gather(holder, waiting)
+    await asyncio.gather(cancelled, return_exceptions=True)
+    
+    assert served == ["bob"]
+    assert scheduler.stats()["in_flight"] == 0
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_token_bucket_limits_the_rate(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fair_scheduler.time, "monotonic", clock)
+    scheduler = make_scheduler(user_rate=0.5, user_burst=2)
+    
+    scheduler.admit("alice")
+    scheduler.admit("alice")
+    with pytest.raises(HTTPException) as error:
+        scheduler.admit("alice")
+    assert error.value.status_code == 429
+    # One token at 0.5 per second
+    assert error.value.headers["Retry-After"] == "2"
+    
+    # Other users have their own bucket
+    scheduler.admit("bob")
+    
+    clock.now += 1
+    with pytest.raises(HTTPException) as error:
+        scheduler.admit("alice")
+    assert error.value.headers["Retry-After"] == "1"
+    
+    clock.now += 1
+    scheduler.admit("alice")
+    assert scheduler.stats()["users"]["alice"]["rejected_rate_limit"] == 2
+
+
+def test_token_bucket_refills_up_to_the_burst(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fair_scheduler.time, "monotonic", clock)
+    scheduler = make_scheduler(user_rate=1, user_burst=2)
+    scheduler.admit("alice")
+    scheduler.admit("alice")
+    
+    clock.now += 60
+    scheduler.admit("alice")
+    scheduler.admit("alice")
+    with pytest.raises(HTTPException):
+        scheduler.admit("alice")
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_retry_after():
+    scheduler = make_scheduler(max_queue_per_user=1)
+    release = asyncio.Event()
+    
+    async def hold(user):
+        async with scheduler.slot(user):
+            await release.wait()
+    
+    tasks = [asyncio.create_task(hold("alice")), asyncio.create_task(hold("alice"))]
+    await asyncio.sleep(0)
+    
+    with pytest.raises(HTTPException) as error:
+        scheduler.admit("alice")
+    assert error.value.status_code == 429
+    assert int(error.value.headers["Retry-After"]) >= 1
+    scheduler.admit("bob")
+    
+    release.set()
+    await asyncio.gather(*tasks)
+    scheduler.admit("alice")
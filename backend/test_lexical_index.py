@@ -0,0 +1,135 @@
+"""
+Tests of the BM25 lexical index of uploaded documents (app/utils/lexical_index.py),
+its snapshot file shared by several workers, and hybrid fusion (app/utils/retriever.py).
+"""
+import io
+import json
+import tempfile
+
+import pytest
+
+from app.config import settings
+from app.utils.lexical_index import (IndexSaver, LexicalIndex, extract_text,
+                                     index_document, save_index_file, tokenize)
+from app.utils.retriever import HybridRetriever, reciprocal_rank_fusion
+from app.utils.vector_index import IndexItem
+
+DOCUMENTS = {
+    "upload/koi.txt": "KOI-7016.01 is a candidate with a transit depth of 420 ppm.",
+    "upload/kepler.txt": "Kepler-452 b orbits a G2 star. Kepler-452 b is a super-Earth.",
+    "upload/star.txt": "A G2 star like the Sun. Stellar transit photometry of a G2 star.",
+}
+
+
+def build_index(documents=DOCUMENTS) -> LexicalIndex:
+    index = LexicalIndex()
+    for source, text in documents.items():
+        index.add_document(source, text)
+    return index
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("KOI-7016.01, Kepler-452 b!") == ["koi-7016.01", "koi", "7016", "01", "kepler-452", "kepler", "452", "b"]
+    assert tokenize("  ") == []
+
+
+def test_postings_round_trip(tmp_path):
+    index = build_index()
+    ids, frequencies, last = index._postings["g2"]
+    # Delta-encoded passage ids: passages 1 and 2
+    assert (list(ids), list(frequencies), last) == ([1, 1], [1, 2], 2)
+    path = str(tmp_path / "index.pkl")
+    
+    save_index_file(path, index.dumps())
+    loaded = LexicalIndex.load(path)
+    
+    assert loaded.stats() == index.stats()
+    assert loaded.sources == index.sources
+    assert loaded.search("g2 star") == index.search("g2 star")
+
+
+def test_bm25_ranks_exact_identifiers_and_term_frequency():
+    index = build_index()
+    
+    assert [passage.source for passage, _ in index.search("KOI-7016.01")] == ["upload/koi.txt"]
+    # Both mention transit; "G2 star" appears twice in star.txt, once in kepler.txt
+    ranked = index.search("g2 star transit")
+    assert [passage.source for passage, _ in ranked] == ["upload/star.txt", "upload/kepler.txt", "upload/koi.txt"]
+    assert ranked[0][1] > ranked[1][1] > ranked[2][1] > 0
+    assert index.search("unknown") == []
+
+
+def test_reciprocal_rank_fusion_merges_identical_text():
+    lexical = [IndexItem(id="koi#0", text="Transit  of KOI-7016.01"), IndexItem(id="star#0", text="G2 star")]
+    dense = [IndexItem(id="v9", text="Habitable zone"), IndexItem(id="v1", text="Transit of KOI-7016.01")]
+    
+    fused = reciprocal_rank_fusion([lexical, dense], limit=2, k=60)
+    
+    assert [item.id for item, _ in fused] == ["koi#0", "v9"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused[1][1] == pytest.approx(1 / 61)
+
+
+@pytest.mark.asyncio
+async def test_hybrid_retriever_without_vectors_ranks_lexically():
+    retriever = HybridRetriever(None, build_index(), top_k=2)
+    
+    results = await retriever.retrieve(None, "Kepler-452 b")
+    
+    assert [item.metadata["filename"] for item, _ in results] == ["upload/kepler.txt"]
+    assert results[0][0].id == "upload/kepler.txt#0"
+
+
+def test_extract_text_reads_at_most_max_bytes():
+    file = io.BytesIO(b"kepler " * 1000)
+    
+    text = extract_text("notes.txt", file, max_bytes=70)
+    
+    assert text == "kepler " * 10
+    assert file.tell() == 70
+
+
+def test_extract_text_flattens_json():
+    file = io.BytesIO(json.dumps({"koi": {"name": "KOI-7016.01", "score": 0.98}}).encode())
+    
+    assert extract_text("koi.json", file).splitlines() == ["koi name KOI-7016.01", "koi score 0.98"]
+
+
+@pytest.mark.asyncio
+async def test_index_document_reads_the_spooled_file(monkeypatch):
+    monkeypatch.setattr(settings, "lexical_index_max_text_mb", 1)
+    index = LexicalIndex()
+    with tempfile.SpooledTemporaryFile(max_size=1024) as spool:
+        spool.write(b"KOI-7016.01 transit " + b"filler " * 300_000)
+        spool.seek(0)
+        
+        added = await index_document(index, "", "upload/koi.txt", "koi.txt", spool)
+    
+    # Only the first MiB of text is indexed (the whole document has 1501 passages)
+    assert added == len(index) == 749
+    assert index.search("KOI-7016.01")[0][0].source == "upload/koi.txt"
+
+
+@pytest.mark.asyncio
+async def test_workers_saving_the_same_file_keep_each_others_documents(tmp_path):
+    path = str(tmp_path / "index.pkl")
+    first, second = IndexSaver(delay_seconds=0), IndexSaver(delay_seconds=0)
+    first_index = build_index({"upload/koi.txt": DOCUMENTS["upload/koi.txt"]})
+    second_index = build_index({"upload/kepler.txt": DOCUMENTS["upload/kepler.txt"]})
+    
+    first.schedule(first_index, path)
+    await first.stop()
+    second.schedule(second_index, path)
+    await second.stop()
+    first_index.add_document("upload/star.txt", DOCUMENTS["upload/star.txt"])
+    first.schedule(first_index, path)
+    await first.stop()
+    
+    saved = LexicalIndex.load(path)
+    assert set(saved.sources) == set(DOCUMENTS)
+    assert saved.search("KOI-7016.01")[0][0].source == "upload/koi.txt"
+    assert saved.search("Kepler-452")[0][0].source == "upload/kepler.txt"
+    # Documents saved by the other worker are searchable after this worker's save
+    assert first_index.search("Kepler-452")[0][0].source == "upload/kepler.txt"
+    assert (first.merged_documents, second.merged_documents) == (1, 1)
+    assert list(tmp_path.glob("*.tmp")) == []
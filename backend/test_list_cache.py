@@ -0,0 +1,120 @@
+"""
+Tests of the list page cache (app/utils/list_cache.py): TTL and LRU limits,
+invalidation and the shared tier.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import list_cache as list_cache_module
+from app.utils.list_cache import CachedPage, InMemorySharedCache, ListCache, SharedCache
+from app.utils.row_counts import FILES, RESPONSES
+
+PAGE = CachedPage(body=b'[{"uid": "a"}]', headers={"X-Total-Count": "1", "X-Next-Cursor": "abc\\n"})
+
+
+class Clock:
+    """Manually advanced time.monotonic()"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self) -> float:
+        return self.now
+
+
+class BrokenSharedCache(SharedCache):
+    name = "broken"
+    
+    async def get(self, key: str):
+        raise ConnectionError("cache down")
+    
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        raise ConnectionError("cache down")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(list_cache_module, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_page_bytes_round_trip():
+    assert CachedPage.from_bytes(PAGE.to_bytes()) == PAGE
+
+
+@pytest.mark.asyncio
+async def test_pages_expire_after_the_ttl(clock):
+    cache = ListCache(max_entries=10, ttl_seconds=30)
+    await cache.set(FILES, '"v1"', PAGE)
+    
+    clock.now += 29
+    assert await cache.get(FILES, '"v1"') == PAGE
+    clock.now += 1
+    assert await cache.get(FILES, '"v1"') is None
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_pages_are_evicted(clock):
+    cache = ListCache(max_entries=2, ttl_seconds=30)
+    await cache.set(FILES, '"1"', PAGE)
+    await cache.set(FILES, '"2"', PAGE)
+    await cache.get(FILES, '"1"')
+    
+    await cache.set(FILES, '"3"', PAGE)
+    
+    assert await cache.get(FILES, '"2"') is None
+    assert await cache.get(FILES, '"1"') == PAGE
+    assert await cache.get(FILES, '"3"') == PAGE
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_only_the_pages_of_the_table(clock):
+    cache = ListCache(max_entries=10, ttl_seconds=30)
+    await cache.set(FILES, '"v1"', PAGE)
+    await cache.set(RESPONSES, '"v1"', PAGE)
+    
+    cache.invalidate(FILES)
+    
+    assert await cache.get(FILES, '"v1"') is None
+    assert await cache.get(RESPONSES, '"v1"') == PAGE
+
+
+@pytest.mark.asyncio
+async def test_pages_are_shared_between_workers(clock):
+    shared = InMemorySharedCache()
+    first = ListCache(max_entries=10, ttl_seconds=30, shared=shared)
+    second = ListCache(max_entries=10, ttl_seconds=30, shared=shared)
+    await first.set(RESPONSES, '"v1"', PAGE)
+    
+    assert await second.get(RESPONSES, '"v1"') == PAGE
+    assert await second.get(RESPONSES, '"v1"') == PAGE
+    assert (second.shared_hits, second.local_hits) == (1, 1)
+    # invalidate() drops local pages only; the shared copy lives until its TTL (writes change the ETag)
+    second.invalidate(RESPONSES)
+    assert await second.get(RESPONSES, '"v1"') == PAGE
+    clock.now += 30
+    assert await second.get(RESPONSES, '"v1"') is None
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_errors_fall_back_to_the_local_tier(clock):
+    cache = ListCache(max_entries=10, ttl_seconds=30, shared=BrokenSharedCache())
+    
+    await cache.set(FILES, '"v1"', PAGE)
+    
+    assert await cache.get(FILES, '"v1"') == PAGE
+    assert await cache.get(FILES, '"v2"') is None
+    assert cache.shared_errors == 2
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_stores_nothing():
+    cache = ListCache(max_entries=10, ttl_seconds=30, enabled=False)
+    
+    await cache.set(FILES, '"v1"', PAGE)
+    
+    assert await cache.get(FILES, '"v1"') is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,39 @@
+"""
+Tests of the list cursors and ETag matching (app/utils/pagination.py).
+"""
+from datetime import datetime
+
+import pytest
+
+from app.utils.pagination import decode_cursor, encode_cursor, etag_matches
+
+CREATED_AT = datetime(2026, 3, 14, 15, 9, 26, 535897)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(CREATED_AT, 4242)
+    
+    assert decode_cursor(cursor) == (CREATED_AT, 4242)
+    # URL-safe without padding, so it can go in a query string as is
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+def test_cursor_round_trip_without_microseconds():
+    assert decode_cursor(encode_cursor(datetime(2026, 1, 1), 1)) == (datetime(2026, 1, 1), 1)
+
+
+# Empty, not base64, no separator ("not a cursor"), id not an integer ("2026-01-01T00:00:00|x")
+@pytest.mark.parametrize("cursor", ["", "@@", "bm90IGEgY3Vyc29y", "MjAyNi0wMS0wMVQwMDowMDowMHx4"])
+def test_decode_cursor_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_etag_matches():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"old", "abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"old"', etag)
+    assert not etag_matches(None, etag)
@@ -0,0 +1,69 @@
+"""
+Tests of the probability extraction engine (app/utils/probability.py) against
+the previous sequential regex implementation kept in
+benchmark_probability_extraction.py.
+"""
+import random
+
+import pytest
+
+from app.utils.probability import extract_probability
+from benchmark_probability_extraction import legacy_extract_probability, long_answer
+from test_probability_extraction import test_responses
+
+# Values the previous implementation extracted from the sample answers
+# (the koi_score pattern needs the value in bold, so sample 3 has none)
+EXPECTED = [98, 85, None, 92, None]
+
+# Fragments that exercise every pattern and their priority order
+FRAGMENTS = [
+    "PROBABILITY:", "Probability: ", "probability", "is", " is ", "approximately", "**", "*",
+    "koi_score", "koi score", "of", " of ", "0.", "0.76", "0.0", "7", "42", "150", "%", "% ",
+    "\n", "\n\n", " ", ".", "this", "is approximately **", "%**",
+]
+
+
+@pytest.mark.parametrize("response, expected", zip(test_responses, EXPECTED))
+def test_sample_answers(response, expected):
+    text, probability = extract_probability(response)
+    
+    assert probability == expected
+    assert (text, probability) == legacy_extract_probability(response)
+
+
+@pytest.mark.parametrize("response, expected", [
+    # An explicit percentage decides even when it is out of range
+    ("PROBABILITY: 150%\nThe koi_score is **0.9**", None),
+    ("The probability is approximately **87%**.\nPROBABILITY: 12%", 12),
+    ("The probability of this being a planet is low.\nIt is 3%", 3),
+    # A koi_score of 0 lets an end-of-line percentage win
+    ("The koi_score is 0.0\nConfidence 64%", 64),
+    ("The koi_score of **0.42**", 42),
+    ("Nothing to see here 100%   ", 100),
+    ("", None),
+])
+def test_priority_order(response, expected):
+    assert extract_probability(response)[1] == expected
+    assert extract_probability(response) == legacy_extract_probability(response)
+
+
+def test_explicit_probability_line_is_removed():
+    text, probability = extract_probability("This object shows a transit.\n\nPROBABILITY: 92%\n")
+    
+    assert probability == 92
+    assert text == "This object shows a transit."
+
+
+@pytest.mark.parametrize("paragraphs", [1, 5, 20])
+@pytest.mark.parametrize("conclusion", [True, False])
+def test_long_answers(paragraphs, conclusion):
+    text = long_answer(paragraphs, conclusion)
+    
+    assert extract_probability(text) == legacy_extract_probability(text)
+
+
+def test_random_answers_match_previous_implementation():
+    rng = random.Random(2026)
+    for _ in range(3000):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 25)))
+        assert extract_probability(text) == legacy_extract_probability(text), repr(text)
@@ -0,0 +1,104 @@
+"""
+Tests of the streamed R2 uploads and downloads (app/utils/r2.py) on a fake S3 client.
+"""
+import hashlib
+import io
+
+import pytest
+
+from app.config import settings
+from app.utils.r2 import MIN_PART_SIZE, FileTooLargeError, hash_content, hash_object, stream_upload
+
+MIB = 1024 * 1024
+
+
+def byte_reader(data: bytes):
+    """Async reader over bytes, like UploadFile.read"""
+    buffer = io.BytesIO(data)
+    
+    async def read(size: int = -1) -> bytes:
+        return buffer.read(size)
+    
+    return read
+
+
+@pytest.fixture(autouse=True)
+def small_parts(monkeypatch):
+    monkeypatch.setattr(settings, "r2_part_size_mb", MIN_PART_SIZE // MIB)
+    monkeypatch.setattr(settings, "r2_upload_concurrency", 2)
+
+
+@pytest.mark.asyncio
+async def test_small_file_is_one_put(r2):
+    data = b"Kepler-452 b" * 100
+    
+    stored = await stream_upload(r2.client, byte_reader(data), "bucket", "small.txt", 10 * MIB)
+    
+    assert (stored.size, stored.sha256) == (len(data), hashlib.sha256(data).hexdigest())
+    assert r2.client.calls == ["put_object"]
+    assert r2.client.objects["small.txt"][0] == data
+
+
+@pytest.mark.asyncio
+async def test_large_file_is_a_multipart_upload(r2):
+    data = bytes(range(256)) * (11 * MIB // 256)
+    
+    stored = await stream_upload(r2.client, byte_reader(data), "bucket", "large.bin", 20 * MIB)
+    
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert r2.client.calls.count("upload_part") == 3
+    assert r2.client.objects["large.bin"][0] == data
+
+
+@pytest.mark.asyncio
+async def test_oversized_single_part_is_rejected_before_r2(r2):
+    with pytest.raises(FileTooLargeError):
+        await stream_upload(r2.client, byte_reader(b"x" * (MIB + 1)), "bucket", "big.txt", MIB)
+    
+    assert r2.client.calls == []
+
+
+@pytest.mark.asyncio
+async def test_oversized_multipart_upload_is_aborted(r2):
+    data = b"x" * (12 * MIB)
+    
+    with pytest.raises(FileTooLargeError):
+        await stream_upload(r2.client, byte_reader(data), "bucket", "big.bin", 8 * MIB)
+    
+    assert r2.client.aborted == ["big.bin"]
+    assert r2.client.uploads == {}
+    assert "complete_multipart_upload" not in r2.client.calls
+    assert r2.client.objects == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_part_aborts_the_upload(r2):
+    async def fail(**kwargs):
+        raise ConnectionError("reset")
+    r2.client.upload_part = fail
+    
+    with pytest.raises(ConnectionError):
+        await stream_upload(r2.client, byte_reader(b"x" * (6 * MIB)), "bucket", "broken.bin", 8 * MIB)
+    
+    assert r2.client.aborted == ["broken.bin"]
+
+
+@pytest.mark.asyncio
+async def test_hash_content_enforces_the_limit():
+    data = b"a" * 1000
+    
+    assert await hash_content(byte_reader(data)) == (1000, hashlib.sha256(data).hexdigest())
+    with pytest.raises(FileTooLargeError):
+        await hash_content(byte_reader(data), 999)
+
+
+@pytest.mark.asyncio
+async def test_hash_object_spools_the_content(r2):
+    data = b"transit depth " * 1000
+    r2.client.objects["doc.txt"] = (data, "text/plain")
+    spool = io.BytesIO()
+    
+    size, sha256 = await hash_object(r2.client, "bucket", "doc.txt", copy_to=spool)
+    
+    assert (size, sha256) == (len(data), hashlib.sha256(data).hexdigest())
+    assert spool.getvalue() == data
@@ -0,0 +1,126 @@
+"""
+Tests of the batch AI request endpoint (app/routers/request.py) with a fake answer
+backend: results keep the input order and upstream calls respect AI_BATCH_CONCURRENCY.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.config import settings
+from app.models import Response as ResponseModel
+from app.models import User
+from app.routers import request as request_module
+from app.routers.request import ai_request_batch
+from app.schemas import AIBatchRequestSchema
+from app.utils.answer_cache import AnswerCache
+from app.utils.fair_scheduler import FairScheduler
+from app.utils.response_store import ResponseWriter
+from app.utils.retriever import Retriever
+from app.utils.single_flight import SingleFlight
+
+USER = User(id=1, user="demo", password="x")
+
+
+class FakeRetriever(Retriever):
+    """Answers after a delay that shrinks with the question number, so later questions finish first"""
+    
+    name = "fake"
+    
+    def __init__(self):
+        self.calls = []
+        self.finished = []
+        self.running = 0
+        self.max_running = 0
+    
+    def cache_key(self, query: str) -> str:
+        return query.casefold()
+    
+    async def answer(self, client, query: str) -> str:
+        self.calls.append(query)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.05 / (1 + int(query.split()[-1])))
+            self.finished.append(query)
+            if query.startswith("fail"):
+                raise RuntimeError("model unavailable")
+            return f"Answer to {query}: 90%"
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture(autouse=True)
+def batch_settings(monkeypatch):
+    monkeypatch.setattr(settings, "ai_batch_concurrency", 3)
+    monkeypatch.setattr(request_module, "answer_cache", AnswerCache(max_entries=64, ttl_seconds=60, persistent=False))
+    monkeypatch.setattr(request_module, "ai_search_flight", SingleFlight())
+    monkeypatch.setattr(request_module, "upstream_scheduler", FairScheduler(
+        max_in_flight=100, max_queue_per_user=100, user_rate=1000, user_burst=1000, weights={}
+    ))
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_sessions):
+    Session = await sqlite_sessions(ResponseModel)
+    async with Session() as session:
+        yield session
+
+
+async def batch(db, retriever, questions):
+    return await ai_request_batch(
+        AIBatchRequestSchema(questions=questions),
+        current_user=USER,
+        db=db,
+        http_clients=SimpleNamespace(cloudflare=None),
+        response_writer=ResponseWriter(),
+        retriever=retriever
+    )
+
+
+@pytest.mark.asyncio
+async def test_results_keep_the_input_order(db):
+    retriever = FakeRetriever()
+    questions = [f"Is KOI-{number} a planet? {number}" for number in range(12)]
+    
+    response = await batch(db, retriever, questions)
+    
+    assert [result.index for result in response.results] == list(range(12))
+    assert [result.question for result in response.results] == questions
+    assert [result.response for result in response.results] == [f"Answer to {question}: 90%" for question in questions]
+    assert all(result.probability_percentage == 90 for result in response.results)
+    # Answers completed out of order
+    assert retriever.finished != questions
+    saved = (await db.execute(select(ResponseModel.question))).scalars().all()
+    assert sorted(saved) == sorted(questions)
+
+
+@pytest.mark.asyncio
+async def test_upstream_calls_respect_the_concurrency_limit(db):
+    retriever = FakeRetriever()
+    
+    await batch(db, retriever, [f"question {number}" for number in range(10)])
+    
+    assert len(retriever.calls) == 10
+    assert retriever.max_running == settings.ai_batch_concurrency
+
+
+@pytest.mark.asyncio
+async def test_duplicates_share_a_call_and_failures_keep_their_position(db):
+    retriever = FakeRetriever()
+    questions = ["question 1", "fail 2", "QUESTION 1", "question 3"]
+    
+    response = await batch(db, retriever, questions)
+    
+    assert sorted(retriever.calls) == ["fail 2", "question 1", "question 3"]
+    assert [result.question for result in response.results] == questions
+    assert response.results[1].status_code == 500
+    assert response.results[2].response == response.results[0].response
+    assert (response.succeeded, response.failed) == (3, 1)
+    
+    # Answered from the cache the second time
+    again = await batch(db, retriever, questions[:1])
+    assert again.results[0].cached
+    assert len(retriever.calls) == 3
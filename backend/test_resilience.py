@@ -0,0 +1,144 @@
+"""
+Tests of the circuit breaker state changes (app/utils/resilience.py).
+"""
+import pytest
+
+from app.utils import resilience
+from app.utils.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    """Settable replacement for time.monotonic"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def make_breaker(half_open_max_calls: int = 1) -> CircuitBreaker:
+    return CircuitBreaker(
+        "test",
+        failure_rate_threshold=0.5,
+        window_size=10,
+        min_calls=4,
+        open_seconds=30,
+        half_open_max_calls=half_open_max_calls
+    )
+
+
+def record(breaker: CircuitBreaker, outcomes: str) -> None:
+    """Record calls: "s" for a success, "f" for a failure"""
+    for outcome in outcomes:
+        breaker.acquire()
+        if outcome == "s":
+            breaker.on_success()
+        else:
+            breaker.on_failure()
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    record(breaker, "ffff")
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = make_breaker()
+    
+    record(breaker, "fff")
+    
+    assert breaker.state == CLOSED
+
+
+def test_stays_closed_below_failure_rate(clock):
+    breaker = make_breaker()
+    
+    record(breaker, "sfssfss")
+    
+    assert breaker.state == CLOSED
+    assert breaker.failure_rate() == pytest.approx(2 / 7)
+
+
+def test_opens_at_failure_rate(clock):
+    breaker = make_breaker()
+    
+    record(breaker, "ssff")
+    
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_open_circuit_fails_fast_with_retry_after(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 10
+    
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.acquire()
+    
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == "20"
+    assert breaker.rejected == 1
+
+
+def test_half_open_after_cool_down_allows_limited_probes(clock):
+    breaker = make_breaker(half_open_max_calls=2)
+    open_breaker(breaker)
+    clock.now += 30
+    
+    breaker.acquire()
+    assert breaker.state == HALF_OPEN
+    breaker.acquire()
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    
+    # A released probe frees its place
+    breaker.release()
+    breaker.acquire()
+
+
+def test_successful_probe_closes_with_a_fresh_window(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+    
+    breaker.acquire()
+    breaker.on_success()
+    
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+    record(breaker, "fff")
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_opens_again(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+    
+    breaker.acquire()
+    breaker.on_failure()
+    
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+
+def test_failures_while_open_are_ignored(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    
+    breaker.on_failure()
+    
+    assert breaker.stats()["window_calls"] == 4
+    assert breaker.stats()["times_opened"] == 1
@@ -0,0 +1,140 @@
+"""
+Tests of the write-behind response writer (app/utils/response_store.py) on SQLite:
+flushes on batch size and on interval, draining on stop() and the retry limit.
+"""
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.models import Response as ResponseModel
+from app.utils import response_store
+from app.utils.response_store import ResponseWriter, new_response_row
+
+
+def rows(count: int, start: int = 0):
+    return [new_response_row(1, f"question {number}", f"answer {number}", None) for number in range(start, start + count)]
+
+
+async def wait_until(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+@pytest.fixture(autouse=True)
+def writer_settings(monkeypatch):
+    monkeypatch.setattr(settings, "response_write_behind", True)
+    monkeypatch.setattr(settings, "response_write_batch_size", 5)
+    monkeypatch.setattr(settings, "response_write_flush_interval_ms", 100)
+    monkeypatch.setattr(settings, "response_write_queue_size", 100)
+    monkeypatch.setattr(settings, "response_write_max_retries", 2)
+
+
+@pytest_asyncio.fixture
+async def Session(sqlite_sessions, monkeypatch):
+    Session = await sqlite_sessions(ResponseModel)
+    monkeypatch.setattr(response_store, "AsyncSessionLocal", Session)
+    return Session
+
+
+@pytest_asyncio.fixture
+async def writer(Session):
+    writer = ResponseWriter()
+    writer.start()
+    yield writer
+    await writer.stop()
+
+
+async def saved(Session) -> int:
+    async with Session() as db:
+        return await db.scalar(select(func.count()).select_from(ResponseModel))
+
+
+@pytest.mark.asyncio
+async def test_full_batches_are_flushed_without_waiting_for_the_interval(writer, Session):
+    started = time.monotonic()
+    assert writer.enqueue(rows(10))
+    
+    await wait_until(lambda: writer.written == 10)
+    
+    assert time.monotonic() - started < settings.response_write_flush_interval_ms / 1000
+    assert writer.flushes == 2
+    assert await saved(Session) == 10
+
+
+@pytest.mark.asyncio
+async def test_partial_batches_are_flushed_after_the_interval(writer, Session):
+    started = time.monotonic()
+    writer.enqueue(rows(2))
+    await asyncio.sleep(0.02)
+    writer.enqueue(rows(1, start=2))
+    
+    await wait_until(lambda: writer.written == 3)
+    
+    assert time.monotonic() - started >= settings.response_write_flush_interval_ms / 1000
+    assert writer.flushes == 1
+    assert await saved(Session) == 3
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_the_queue(Session, monkeypatch):
+    monkeypatch.setattr(settings, "response_write_flush_interval_ms", 60_000)
+    writer = ResponseWriter()
+    writer.start()
+    writer.enqueue(rows(3))
+    writer.enqueue(rows(4, start=3))
+    await asyncio.sleep(0)
+    
+    await writer.stop()
+    
+    assert not writer.enabled
+    assert not writer.enqueue(rows(1))
+    assert writer.written == 7
+    assert await saved(Session) == 7
+
+
+@pytest.mark.asyncio
+async def test_rows_are_dropped_after_the_retry_limit(writer, Session, monkeypatch):
+    attempts = []
+    
+    async def failing_insert(db, batch):
+        attempts.append(len(batch))
+        raise RuntimeError("database unavailable")
+    
+    delays = []
+    real_sleep = asyncio.sleep
+    
+    async def fast_sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+    
+    monkeypatch.setattr(response_store, "bulk_insert_responses", failing_insert)
+    monkeypatch.setattr(response_store.asyncio, "sleep", fast_sleep)
+    writer.enqueue(rows(5))
+    
+    await wait_until(lambda: writer.dropped == 5)
+    
+    assert attempts == [5] * (settings.response_write_max_retries + 1)
+    # Exponential backoff between attempts (wait_until() polls with shorter sleeps)
+    assert [delay for delay in delays if delay >= 1] == [1, 2, 4]
+    assert writer.written == 0
+    assert await saved(Session) == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_falls_back_to_direct_inserts(Session, monkeypatch):
+    monkeypatch.setattr(settings, "response_write_queue_size", 4)
+    full = ResponseWriter()
+    full.start()
+    
+    assert full.enqueue(rows(4))
+    # The caller inserts the rows itself
+    assert not full.enqueue(rows(1))
+    await full.stop()
+    
+    assert full.written == 4
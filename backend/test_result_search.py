@@ -0,0 +1,137 @@
+"""
+Tests of /api/results/search ranking and paging on databases without FULLTEXT
+(the in-process BM25 fallback of app/utils/result_search.py), on SQLite.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from app.models import Response
+from app.utils.response_store import bulk_insert_responses, new_response_row
+from app.utils.result_search import decode_search_cursor, encode_search_cursor, get_local_result_index, search_responses
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+START = datetime(2026, 1, 1)
+
+
+async def make_session(tmp_path, name="search.db") -> AsyncSession:
+    """Session on a new SQLite database with the responses table"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Response.metadata.create_all, tables=[Response.__table__])
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)()
+
+
+async def close_session(db: AsyncSession) -> None:
+    """Close the session and its engine (aiosqlite threads keep the process alive otherwise)"""
+    engine = db.bind
+    await db.close()
+    await engine.dispose()
+
+
+async def add_responses(db: AsyncSession, answers, first_second: int = 0) -> None:
+    rows = []
+    for offset, answer in enumerate(answers):
+        row = new_response_row(1, f"question {first_second + offset}", answer, (first_second + offset) % 101)
+        row["created_at"] = START + timedelta(seconds=first_second + offset)
+        rows.append(row)
+    await bulk_insert_responses(db, rows)
+    await db.commit()
+
+
+def summary_query():
+    return select(Response.id, Response.uid, Response.question, Response.probability_percentage, Response.created_at)
+
+
+def test_search_cursor_round_trip():
+    assert decode_search_cursor(encode_search_cursor(3.3292074921047097, 42)) == (3.3292074921047097, 42)
+    with pytest.raises(ValueError):
+        decode_search_cursor("@@")
+
+
+@pytest.mark.asyncio
+async def test_fallback_ranks_most_relevant_first(tmp_path):
+    db = await make_session(tmp_path)
+    await add_responses(db, [
+        "Radial velocity of the star",
+        "Kepler transit light curve",
+        "Kepler transit Kepler transit light curve",
+        "Unrelated answer",
+    ])
+    
+    hits, next_cursor = await search_responses(db, summary_query(), "kepler transit", 10)
+    
+    assert [row.question for row, _ in hits] == ["question 2", "question 1"]
+    assert hits[0][1] > hits[1][1]
+    assert next_cursor is None
+    await close_session(db)
+
+
+@pytest.mark.asyncio
+async def test_fallback_cursor_pages_cover_every_match_once(tmp_path):
+    db = await make_session(tmp_path)
+    # More matches than the first candidate batch of a 3-row page
+    await add_responses(db, [("Kepler transit " * (i % 7 + 1)) if i % 2 else "Radial velocity" for i in range(90)])
+    
+    seen, scores, cursor = [], [], None
+    while True:
+        hits, cursor = await search_responses(db, summary_query(), "kepler", 3, cursor)
+        seen.extend(row.uid for row, _ in hits)
+        scores.extend(score for _, score in hits)
+        if cursor is None:
+            break
+    
+    assert len(seen) == 45
+    assert len(set(seen)) == 45
+    assert scores == sorted(scores, reverse=True)
+    await close_session(db)
+
+
+@pytest.mark.asyncio
+async def test_fallback_applies_query_filters(tmp_path):
+    db = await make_session(tmp_path)
+    await add_responses(db, ["Kepler transit"] * 30)
+    
+    query = summary_query().where(Response.probability_percentage >= 10, Response.probability_percentage <= 12)
+    hits, _ = await search_responses(db, query, "kepler", 10)
+    
+    assert sorted(row.probability_percentage for row, _ in hits) == [10, 11, 12]
+    await close_session(db)
+
+
+@pytest.mark.asyncio
+async def test_fallback_indexes_rows_committed_after_higher_ids(tmp_path):
+    db = await make_session(tmp_path)
+    await add_responses(db, ["Kepler transit"] * 3)
+    assert len((await search_responses(db, summary_query(), "kepler", 10))[0]) == 3
+    
+    # A lower id committed after the index saw higher ones (e.g. concurrent inserts)
+    late = new_response_row(1, "late question", "Kepler transit late", 5)
+    late.update(id=0, created_at=START)
+    await db.execute(insert(Response), [late])
+    await db.commit()
+    
+    hits, _ = await search_responses(db, summary_query(), "kepler", 10)
+    assert "late question" in [row.question for row, _ in hits]
+    await close_session(db)
+
+
+@pytest.mark.asyncio
+async def test_fallback_index_is_kept_per_database(tmp_path):
+    first = await make_session(tmp_path, "first.db")
+    second = await make_session(tmp_path, "second.db")
+    await add_responses(first, ["Kepler transit"])
+    await add_responses(second, ["Radial velocity"])
+    
+    assert len((await search_responses(first, summary_query(), "kepler", 10))[0]) == 1
+    assert (await search_responses(second, summary_query(), "kepler", 10))[0] == []
+    assert get_local_result_index(first) is not get_local_result_index(second)
+    
+    get_local_result_index(first).reset()
+    assert len(get_local_result_index(first).index) == 0
+    assert len((await search_responses(first, summary_query(), "kepler", 10))[0]) == 1
+    await close_session(first)
+    await close_session(second)
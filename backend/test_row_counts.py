@@ -0,0 +1,99 @@
+"""
+Tests of the cached row counters and watermarks (app/utils/row_counts.py) on SQLite.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert
+
+from app.config import settings
+from app.models import Response
+from app.utils import row_counts as row_counts_module
+from app.utils.response_store import new_response_row
+from app.utils.row_counts import RESPONSES, RowCounts
+
+
+@pytest.fixture(autouse=True)
+def count_settings(monkeypatch):
+    monkeypatch.setattr(settings, "row_counts_cached", True)
+    monkeypatch.setattr(settings, "list_watermark_ttl_seconds", 60)
+
+
+@pytest_asyncio.fixture
+async def Session(sqlite_sessions, monkeypatch):
+    Session = await sqlite_sessions(Response)
+    monkeypatch.setattr(row_counts_module, "AsyncSessionLocal", Session)
+    return Session
+
+
+async def insert_rows(Session, count: int) -> None:
+    """Insert rows without notifying the counters (like another worker)"""
+    async with Session() as db:
+        await db.execute(insert(Response), [new_response_row(1, "question", "answer", None) for _ in range(count)])
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_counts_are_served_from_the_counter(Session):
+    await insert_rows(Session, 3)
+    counts = RowCounts({RESPONSES: Response})
+    await counts.reconcile()
+    
+    async with Session() as db:
+        assert await counts.get(db, RESPONSES) == 3
+        counts.add(RESPONSES, 2)
+        assert await counts.get(db, RESPONSES) == 5
+        assert await counts.get(db, RESPONSES, exact=True) == 3
+    
+    assert counts.stats()["exact_queries"] == 2
+    assert counts.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_reconcile_corrects_drift(Session):
+    counts = RowCounts({RESPONSES: Response})
+    await counts.reconcile()
+    await insert_rows(Session, 4)
+    
+    await counts.reconcile()
+    
+    assert counts.stats()["counts"] == {RESPONSES: 4}
+    assert counts.corrections == 1
+
+
+@pytest.mark.asyncio
+async def test_rows_added_during_a_reconcile_are_kept(Session):
+    await insert_rows(Session, 3)
+    counts = RowCounts({RESPONSES: Response})
+    count_rows = counts._count
+    
+    async def count_while_inserting(db, name):
+        count = await count_rows(db, name)
+        # Committed and reported after the COUNT(*) read its snapshot
+        await insert_rows(Session, 1)
+        counts.add(name)
+        return count
+    
+    counts._count = count_while_inserting
+    await counts.reconcile()
+    
+    async with Session() as db:
+        assert await counts.get(db, RESPONSES) == 4
+
+
+@pytest.mark.asyncio
+async def test_watermark_is_cached_until_an_insert(Session):
+    await insert_rows(Session, 2)
+    counts = RowCounts({RESPONSES: Response})
+    await counts.reconcile()
+    
+    etag, watermark = await counts.etag(RESPONSES, "page", 1)
+    assert watermark[1] == 2
+    await insert_rows(Session, 1)
+    # Rows of other workers show once the watermark expires
+    assert await counts.etag(RESPONSES, "page", 1) == (etag, watermark)
+    
+    counts.add(RESPONSES)
+    new_etag, new_watermark = await counts.etag(RESPONSES, "page", 1)
+    
+    assert new_watermark[1] == 3 and new_etag != etag
+    assert counts.watermark_queries == 2
@@ -0,0 +1,85 @@
+"""
+Tests of in-flight request coalescing (app/utils/single_flight.py).
+"""
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+class Upstream:
+    """Upstream call that blocks until released and counts its executions"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+    
+    async def answer(self) -> str:
+        self.calls += 1
+        await self.release.wait()
+        return f"answer {self.calls}"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_keys_share_one_upstream_call():
+    flight, upstream = SingleFlight(), Upstream()
+    callers = [asyncio.create_task(flight.do("koi", upstream.answer)) for _ in range(10)]
+    await asyncio.sleep(0)
+    assert flight.in_flight("koi")
+    
+    upstream.release.set()
+    
+    assert await asyncio.gather(*callers) == ["answer 1"] * 10
+    assert upstream.calls == 1
+    assert flight.stats()["upstream_executions"] == 1
+    assert flight.stats()["coalesced"] == 9
+    assert not flight.in_flight("koi")
+
+
+@pytest.mark.asyncio
+async def test_different_keys_and_later_calls_run_upstream_again():
+    flight, upstream = SingleFlight(), Upstream()
+    upstream.release.set()
+    
+    assert await asyncio.gather(flight.do("a", upstream.answer), flight.do("b", upstream.answer)) == ["answer 1", "answer 2"]
+    assert await flight.do("a", upstream.answer) == "answer 3"
+
+
+@pytest.mark.asyncio
+async def test_shared_call_survives_the_leader_being_cancelled():
+    flight, upstream = SingleFlight(), Upstream()
+    leader = asyncio.create_task(flight.do("koi", upstream.answer))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("koi", upstream.answer))
+    await asyncio.sleep(0)
+    
+    # The client of the first request disconnects
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    upstream.release.set()
+    
+    assert await follower == "answer 1"
+    assert upstream.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_reach_every_caller_and_are_not_cached():
+    flight = SingleFlight()
+    attempts = 0
+    
+    async def failing() -> str:
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+    
+    results = await asyncio.gather(flight.do("koi", failing), flight.do("koi", failing), return_exceptions=True)
+    
+    assert [str(result) for result in results] == ["upstream down"] * 2
+    assert attempts == 1
+    assert flight.stats()["failures"] == 1
+    with pytest.raises(RuntimeError):
+        await flight.do("koi", failing)
+    assert attempts == 2
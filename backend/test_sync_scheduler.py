@@ -0,0 +1,154 @@
+"""
+Tests of the AI Search sync scheduler (app/utils/sync_scheduler.py) against a
+mock Cloudflare API: debouncing, the maximum delay, one sync at a time and
+answer cache invalidation when the sync job ends.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import pytest_asyncio
+from app.config import settings
+from app.models import AnswerCacheEntry, AnswerCacheGeneration
+from app.utils import sync_scheduler as sync_module
+from app.utils.answer_cache import AnswerCache
+from app.utils.sync_scheduler import SyncScheduler
+
+
+class FakeSyncAPI:
+    """AI Search sync and job endpoints; jobs end when end_jobs is set"""
+    
+    def __init__(self):
+        self.sync_times = []
+        self.running_jobs = 0
+        self.max_running_jobs = 0
+        self.end_jobs = asyncio.Event()
+        self.end_jobs.set()
+    
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "PATCH":
+            self.sync_times.append(time.monotonic())
+            self.running_jobs += 1
+            self.max_running_jobs = max(self.max_running_jobs, self.running_jobs)
+            return httpx.Response(200, json={"success": True, "result": {"job_id": f"job-{len(self.sync_times)}"}})
+        if not self.end_jobs.is_set():
+            return httpx.Response(200, json={"success": True, "result": {"ended_at": None}})
+        self.running_jobs -= 1
+        return httpx.Response(200, json={"success": True, "result": {"ended_at": "2026-10-17T00:00:00Z", "end_reason": "done"}})
+
+
+async def wait_until(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+@pytest.fixture(autouse=True)
+def sync_settings(monkeypatch):
+    monkeypatch.setattr(settings, "ai_search_sync_debounce_seconds", 0.1)
+    monkeypatch.setattr(settings, "ai_search_sync_max_delay_seconds", 0.3)
+    monkeypatch.setattr(settings, "ai_search_sync_retry_seconds", 0.1)
+    monkeypatch.setattr(settings, "ai_search_sync_poll_seconds", 0.01)
+    monkeypatch.setattr(settings, "ai_search_sync_job_timeout", 5)
+    monkeypatch.setattr(settings, "ai_search_sync_timeout", 1)
+
+
+@pytest_asyncio.fixture
+async def Session(sqlite_sessions, monkeypatch):
+    Session = await sqlite_sessions(AnswerCacheEntry, AnswerCacheGeneration)
+    monkeypatch.setattr(sync_module, "AsyncSessionLocal", Session)
+    return Session
+
+
+@pytest.fixture
+def cache(Session, monkeypatch):
+    cache = AnswerCache(max_entries=16, ttl_seconds=3600, generation_check_seconds=0)
+    monkeypatch.setattr(sync_module, "answer_cache", cache)
+    return cache
+
+
+@pytest_asyncio.fixture
+async def api():
+    return FakeSyncAPI()
+
+
+@pytest_asyncio.fixture
+async def scheduler(api, cache):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(api.handler))
+    scheduler = SyncScheduler()
+    scheduler.start(SimpleNamespace(cloudflare=client))
+    yield scheduler
+    api.end_jobs.set()
+    await scheduler.stop()
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_uploads_are_debounced_into_one_sync(scheduler, api):
+    for _ in range(3):
+        last_mark = time.monotonic()
+        scheduler.mark_dirty()
+        await asyncio.sleep(0.02)
+    assert scheduler.status()["state"] == "scheduled"
+    
+    await wait_until(lambda: scheduler.syncs == 1 and not scheduler.running)
+    await asyncio.sleep(0.15)
+    
+    assert len(api.sync_times) == 1
+    assert api.sync_times[0] - last_mark >= settings.ai_search_sync_debounce_seconds
+    assert scheduler.jobs[0]["uploads"] == 3
+    assert scheduler.stats()["syncs_saved"] == 2
+
+
+@pytest.mark.asyncio
+async def test_steady_uploads_are_synced_after_the_maximum_delay(scheduler, api):
+    first_mark = time.monotonic()
+    while time.monotonic() - first_mark < 0.6:
+        scheduler.mark_dirty()
+        await asyncio.sleep(0.03)
+    
+    # Uploads never paused for the debounce, yet a sync started after the maximum delay
+    assert api.sync_times
+    assert api.sync_times[0] - first_mark < settings.ai_search_sync_max_delay_seconds + 0.1
+
+
+@pytest.mark.asyncio
+async def test_one_sync_at_a_time(scheduler, api):
+    api.end_jobs.clear()
+    scheduler.mark_dirty()
+    await wait_until(lambda: scheduler.running)
+    
+    # Uploads during the running job are coalesced into one follow-up sync
+    scheduler.mark_dirty()
+    scheduler.mark_dirty()
+    await asyncio.sleep(0.3)
+    assert len(api.sync_times) == 1
+    assert scheduler.status()["current_job_id"] == "job-1"
+    
+    api.end_jobs.set()
+    await wait_until(lambda: scheduler.syncs == 2 and not scheduler.running and not scheduler.pending)
+    
+    assert api.max_running_jobs == 1
+    assert [job["uploads"] for job in scheduler.jobs] == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_answers_are_invalidated_when_the_job_ends(scheduler, api, cache, Session):
+    async with Session() as db:
+        await cache.set(db, "k", "question", "answer", None)
+    api.end_jobs.clear()
+    scheduler.mark_dirty()
+    await wait_until(lambda: scheduler.running)
+    
+    async with Session() as db:
+        assert (await cache.get(db, "k")).response == "answer"
+    
+    api.end_jobs.set()
+    await wait_until(lambda: cache.stats()["generation"] == 1)
+    
+    assert scheduler.jobs[0]["end_reason"] == "done"
+    async with Session() as db:
+        assert await cache.get(db, "k") is None
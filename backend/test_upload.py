@@ -0,0 +1,307 @@
+"""
+Tests of the upload endpoints (app/routers/upload.py) on SQLite and a fake R2 client.
+The endpoint functions are called directly with their dependencies.
+"""
+import hashlib
+import io
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select
+
+from app.config import settings
+from app.models import AnswerCacheEntry, AnswerCacheGeneration
+from app.models import File as FileModel
+from app.models import User
+from app.routers.upload import (complete_direct_upload, presign_direct_upload,
+                                upload_file, upload_files_batch)
+from app.schemas import CompletedPart, CompleteUploadRequest, PresignUploadRequest
+from app.utils.lexical_index import LexicalIndex
+from app.utils.r2 import MIN_PART_SIZE
+from app.utils.sync_scheduler import SyncScheduler
+
+MIB = 1024 * 1024
+USER = User(id=1, user="demo", password="x")
+TEXT = b"Kepler-452 b orbits a G2 star in the habitable zone.\n" * 20
+LARGE = bytes(range(256)) * (6 * MIB // 256)
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def upload_settings(monkeypatch):
+    monkeypatch.setattr(settings, "secret_key", "test-secret-key-" * 4)
+    monkeypatch.setattr(settings, "r2_part_size_mb", MIN_PART_SIZE // MIB)
+    monkeypatch.setattr(settings, "max_file_size_mb", 20)
+    monkeypatch.setattr(settings, "upload_dedup_enabled", True)
+    monkeypatch.setattr(settings, "lexical_index_path", "")
+
+
+@pytest_asyncio.fixture
+async def db(sqlite_sessions):
+    Session = await sqlite_sessions(FileModel, AnswerCacheEntry, AnswerCacheGeneration)
+    async with Session() as session:
+        yield session
+
+
+async def presign(db, r2, filename: str, data: bytes, declared_sha256=None):
+    request = PresignUploadRequest(filename=filename, size=len(data), sha256=declared_sha256)
+    return await presign_direct_upload(request, current_user=USER, db=db, r2=r2)
+
+
+async def complete(db, r2, upload, parts=None, lexical_index=None):
+    request = CompleteUploadRequest(upload_token=upload.upload_token, parts=parts or [])
+    return await complete_direct_upload(
+        request, current_user=USER, db=db, lexical_index=lexical_index, r2=r2, sync_scheduler=SyncScheduler()
+    )
+
+
+async def put_parts(r2, upload, data: bytes):
+    """Upload the parts the way a client would, returning the parts for /api/upload/complete"""
+    upload_id, = r2.client.uploads
+    parts, offset = [], 0
+    for part in upload.parts:
+        response = await r2.client.upload_part(
+            Bucket="bucket", Key=upload.key, UploadId=upload_id,
+            PartNumber=part.part_number, Body=data[offset:offset + part.size]
+        )
+        offset += part.size
+        parts.append(CompletedPart(part_number=part.part_number, etag=response["ETag"]))
+    return parts
+
+
+def upload(filename: str, data: bytes) -> UploadFile:
+    """Multipart form file as FastAPI receives it"""
+    return UploadFile(file=io.BytesIO(data), filename=filename, size=len(data))
+
+
+async def batch(db, r2, files, lexical_index=None):
+    return await upload_files_batch(
+        files, current_user=USER, db=db, lexical_index=lexical_index, r2=r2, sync_scheduler=SyncScheduler()
+    )
+
+
+async def stored_hashes(db):
+    return list((await db.execute(select(FileModel.sha256).order_by(FileModel.id))).scalars())
+
+
+@pytest.mark.asyncio
+async def test_single_put_records_the_computed_hash(db, r2):
+    upload = await presign(db, r2, "notes.txt", TEXT)
+    assert upload.method == "put"
+    r2.client.objects[upload.key] = (TEXT, "text/plain")
+    
+    response = await complete(db, r2, upload)
+    
+    assert response.sha256 == sha256(TEXT)
+    assert await stored_hashes(db) == [sha256(TEXT)]
+
+
+@pytest.mark.asyncio
+async def test_multipart_upload_with_matching_hash(db, r2):
+    upload = await presign(db, r2, "large.txt", LARGE, sha256(LARGE))
+    assert upload.method == "multipart"
+    parts = await put_parts(r2, upload, LARGE)
+    
+    response = await complete(db, r2, upload, parts)
+    
+    assert response.size == len(LARGE)
+    assert await stored_hashes(db) == [sha256(LARGE)]
+
+
+@pytest.mark.asyncio
+async def test_multipart_upload_with_wrong_hash_is_deleted(db, r2):
+    wrong = sha256(b"other content")
+    upload = await presign(db, r2, "large.txt", LARGE, wrong)
+    parts = await put_parts(r2, upload, LARGE)
+    
+    with pytest.raises(HTTPException) as error:
+        await complete(db, r2, upload, parts)
+    
+    assert error.value.status_code == 400
+    assert upload.key not in r2.client.objects
+    assert await stored_hashes(db) == []
+    # The declared hash did not reach the dedup index
+    assert (await presign(db, r2, "other.txt", b"other content", wrong)).method == "put"
+
+
+@pytest.mark.asyncio
+async def test_size_mismatch_is_deleted(db, r2):
+    upload = await presign(db, r2, "notes.txt", TEXT)
+    r2.client.objects[upload.key] = (TEXT[:-1], "text/plain")
+    
+    with pytest.raises(HTTPException) as error:
+        await complete(db, r2, upload)
+    
+    assert error.value.status_code == 400
+    assert r2.client.deleted == [upload.key]
+    assert await stored_hashes(db) == []
+
+
+@pytest.mark.asyncio
+async def test_content_type_mismatch_is_deleted(db, r2):
+    upload = await presign(db, r2, "notes.txt", TEXT)
+    r2.client.objects[upload.key] = (TEXT, "application/pdf")
+    
+    with pytest.raises(HTTPException) as error:
+        await complete(db, r2, upload)
+    
+    assert error.value.status_code == 400
+    assert r2.client.deleted == [upload.key]
+
+
+@pytest.mark.asyncio
+async def test_missing_object(db, r2):
+    upload = await presign(db, r2, "notes.txt", TEXT)
+    
+    with pytest.raises(HTTPException) as error:
+        await complete(db, r2, upload)
+    
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_second_complete_is_a_conflict(db, r2):
+    upload = await presign(db, r2, "notes.txt", TEXT)
+    r2.client.objects[upload.key] = (TEXT, "text/plain")
+    await complete(db, r2, upload)
+    
+    with pytest.raises(HTTPException) as error:
+        await complete(db, r2, upload)
+    
+    assert error.value.status_code == 409
+    assert len(await stored_hashes(db)) == 1
+
+
+@pytest.mark.asyncio
+async def test_multipart_completed_concurrently_is_a_conflict(db, r2):
+    upload = await presign(db, r2, "large.txt", LARGE)
+    parts = await put_parts(r2, upload, LARGE)
+    # Another request with the same token completed the upload but has not saved its row yet
+    upload_id, = r2.client.uploads
+    await r2.client.complete_multipart_upload(
+        Bucket="bucket", Key=upload.key, UploadId=upload_id,
+        MultipartUpload={"Parts": [{"PartNumber": part.part_number, "ETag": part.etag} for part in parts]}
+    )
+    
+    with pytest.raises(HTTPException) as error:
+        await complete(db, r2, upload, parts)
+    
+    assert error.value.status_code == 409
+    assert upload.key in r2.client.objects
+
+
+@pytest.mark.asyncio
+async def test_stored_content_is_not_uploaded_again(db, r2):
+    first = await presign(db, r2, "notes.txt", TEXT)
+    r2.client.objects[first.key] = (TEXT, "text/plain")
+    await complete(db, r2, first)
+    
+    upload = await presign(db, r2, "copy.txt", TEXT, sha256(TEXT))
+    response = await complete(db, r2, upload)
+    
+    assert upload.method == "none" and upload.key == first.key
+    assert response.deduplicated
+    assert await stored_hashes(db) == [sha256(TEXT), sha256(TEXT)]
+
+
+@pytest.mark.asyncio
+async def test_completed_upload_is_indexed_from_the_same_read(db, r2):
+    index = LexicalIndex()
+    upload = await presign(db, r2, "notes.txt", TEXT)
+    r2.client.objects[upload.key] = (TEXT, "text/plain")
+    
+    await complete(db, r2, upload, lexical_index=index)
+    
+    assert r2.client.calls.count("get_object") == 1
+    assert index.search("Kepler-452")[0][0].source == upload.key
+
+
+@pytest.mark.asyncio
+async def test_batch_upload_reports_each_file_in_input_order(db, r2):
+    files = [
+        upload("notes.txt", TEXT),
+        upload("tool.exe", b"MZ"),
+        upload("large.txt", LARGE),
+        upload("notes.txt", TEXT + b"second version"),
+        upload("huge.txt", b"x" * (settings.max_file_size_bytes + 1)),
+    ]
+    
+    response = await batch(db, r2, files)
+    
+    assert [result.index for result in response.results] == [0, 1, 2, 3, 4]
+    assert [result.status_code for result in response.results] == [None, 400, None, None, 413]
+    assert (response.succeeded, response.failed) == (3, 2)
+    # Files with the same name get distinct keys
+    keys = [result.url.rsplit("/", 1)[-1] for result in response.results if result.error is None]
+    assert len(set(keys)) == 3
+    assert sorted(len(data) for data, _ in r2.client.objects.values()) == sorted([len(TEXT), len(LARGE), len(TEXT) + 14])
+    assert r2.client.calls.count("create_multipart_upload") == 1
+    assert await stored_hashes(db) == [sha256(TEXT), sha256(LARGE), sha256(TEXT + b"second version")]
+    assert response.sync.pending_uploads == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_upload_deletes_its_objects_when_the_rows_cannot_be_saved(db, r2, monkeypatch):
+    async def failing_commit():
+        raise RuntimeError("database unavailable")
+    
+    monkeypatch.setattr(db, "commit", failing_commit)
+    
+    with pytest.raises(HTTPException) as error:
+        await batch(db, r2, [upload("a.txt", b"first"), upload("b.txt", b"second")])
+    
+    assert error.value.status_code == 500
+    assert len(r2.client.deleted) == 2
+    assert r2.client.objects == {}
+
+
+@pytest.mark.asyncio
+async def test_batch_upload_stores_repeated_content_once(db, r2):
+    response = await batch(db, r2, [upload("a.txt", TEXT), upload("b.txt", b"other"), upload("copy-of-a.txt", TEXT)])
+    
+    first, _, copy = response.results
+    assert not first.deduplicated and copy.deduplicated
+    assert copy.url == first.url and copy.sha256 == first.sha256 == sha256(TEXT)
+    assert r2.client.calls.count("put_object") == 2
+    paths = list((await db.execute(select(FileModel.absolute_path).order_by(FileModel.id))).scalars())
+    assert paths[0] == paths[2] != paths[1]
+    # The copy needs no AI Search sync
+    assert response.sync.pending_uploads == 2
+
+
+@pytest.mark.asyncio
+async def test_uploads_of_stored_content_reuse_the_object(db, r2):
+    stored = await batch(db, r2, [upload("a.txt", TEXT)])
+    puts = r2.client.calls.count("put_object")
+    
+    single = await upload_file(
+        upload("again.txt", TEXT), current_user=USER, db=db, lexical_index=None, r2=r2, sync_scheduler=SyncScheduler()
+    )
+    repeated = await batch(db, r2, [upload("b.txt", b"new content"), upload("a-copy.txt", TEXT)])
+    
+    assert single.deduplicated and single.url == stored.results[0].url
+    assert single.sync.pending_uploads == 0
+    assert repeated.results[1].deduplicated and repeated.results[1].url == stored.results[0].url
+    assert r2.client.calls.count("put_object") == puts + 1
+    assert await stored_hashes(db) == [sha256(TEXT), sha256(TEXT), sha256(b"new content"), sha256(TEXT)]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_keeps_reused_objects(db, r2, monkeypatch):
+    stored = await batch(db, r2, [upload("a.txt", TEXT)])
+    
+    async def failing_commit():
+        raise RuntimeError("database unavailable")
+    
+    monkeypatch.setattr(db, "commit", failing_commit)
+    
+    with pytest.raises(HTTPException):
+        await batch(db, r2, [upload("a-copy.txt", TEXT), upload("b.txt", b"new content")])
+    
+    # Only the new object is deleted
+    assert len(r2.client.deleted) == 1
+    assert stored.results[0].url.rsplit("/", 1)[-1] in r2.client.objects
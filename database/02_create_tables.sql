@@ -23,10 +23,13 @@ CREATE TABLE IF NOT EXISTS `files` (
     `user_id` INT UNSIGNED NOT NULL,
     `absolute_path` VARCHAR(500) NOT NULL,
     `url` VARCHAR(500) NULL,
+    `sha256` CHAR(64) NULL COMMENT 'SHA-256 of the file content (hex)',
     `created_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (`id`),
     UNIQUE KEY `unique_uid` (`uid`),
     INDEX `idx_user_id` (`user_id`),
+    INDEX `idx_sha256` (`sha256`),
+    INDEX `idx_created_at_id` (`created_at`, `id`),
     CONSTRAINT `fk_files_user` FOREIGN KEY (`user_id`) 
         REFERENCES `users` (`id`) 
         ON DELETE CASCADE 
@@ -45,9 +48,32 @@ CREATE TABLE IF NOT EXISTS `responses` (
     PRIMARY KEY (`id`),
     UNIQUE KEY `unique_uid` (`uid`),
     INDEX `idx_user_id` (`user_id`),
-    INDEX `idx_created_at` (`created_at`),
+    INDEX `idx_created_at_id` (`created_at`, `id`),
+    FULLTEXT INDEX `ft_question_response` (`question`, `response`),
     CONSTRAINT `fk_responses_user` FOREIGN KEY (`user_id`) 
         REFERENCES `users` (`id`) 
         ON DELETE CASCADE 
         ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create answer cache table (persistent tier of the AI answer cache)
+CREATE TABLE IF NOT EXISTS `answer_cache` (
+    `cache_key` CHAR(64) NOT NULL COMMENT 'SHA-256 of normalized question + retrieval parameters',
+    `question` TEXT NOT NULL,
+    `response` TEXT NOT NULL,
+    `probability_percentage` INT NULL,
+    `created_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    `expires_at` TIMESTAMP NOT NULL,
+    PRIMARY KEY (`cache_key`),
+    INDEX `idx_expires_at` (`expires_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Create answer cache generation table (bumped by every invalidation, read by all workers)
+CREATE TABLE IF NOT EXISTS `answer_cache_generation` (
+    `id` INT NOT NULL,
+    `generation` INT NOT NULL DEFAULT 0,
+    `updated_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO `answer_cache_generation` (`id`, `generation`) VALUES (1, 0);
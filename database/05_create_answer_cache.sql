@@ -0,0 +1,24 @@
+-- Migration: Create answer_cache table
+-- Date: 2026-10-17
+-- Description: Persistent tier of the exact-match AI answer cache used by /api/request.
+--              Entries are keyed by the SHA-256 of the normalized question plus the
+--              retrieval parameters and are cleared whenever a new file is uploaded.
+
+USE `exoplanets-rag`;
+
+CREATE TABLE IF NOT EXISTS `answer_cache` (
+    `cache_key` CHAR(64) NOT NULL COMMENT 'SHA-256 of normalized question + retrieval parameters',
+    `question` TEXT NOT NULL,
+    `response` TEXT NOT NULL,
+    `probability_percentage` INT NULL,
+    `created_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    `expires_at` TIMESTAMP NOT NULL,
+    PRIMARY KEY (`cache_key`),
+    INDEX `idx_expires_at` (`expires_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Verify the change
+DESCRIBE answer_cache;
+
+-- Success message
+SELECT 'Migration completed successfully! The answer_cache table has been created.' AS status;
@@ -0,0 +1,19 @@
+-- Migration: Add sha256 column to files table
+-- Date: 2026-10-17
+-- Description: Stores the SHA-256 of each uploaded file's content so identical uploads
+--              reuse the existing R2 object (no second copy, no AI Search re-sync).
+--              Existing rows stay NULL until `python backfill_file_hashes.py` is run.
+
+USE `exoplanets-rag`;
+
+ALTER TABLE `files`
+ADD COLUMN `sha256` CHAR(64) NULL
+COMMENT 'SHA-256 of the file content (hex)'
+AFTER `url`,
+ADD INDEX `idx_sha256` (`sha256`);
+
+-- Verify the change
+DESCRIBE files;
+
+-- Success message
+SELECT 'Migration completed successfully! The sha256 column has been added to the files table.' AS status;
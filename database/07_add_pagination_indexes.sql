@@ -0,0 +1,22 @@
+-- Migration: Add (created_at, id) indexes for keyset pagination
+-- Date: 2026-10-17
+-- Description: /api/files and /api/results page with a cursor on (created_at, id)
+--              (newest first). These indexes let each page start at the cursor
+--              instead of scanning and discarding every earlier row (OFFSET).
+--              The composite index replaces idx_created_at on responses.
+
+USE `exoplanets-rag`;
+
+ALTER TABLE `files`
+ADD INDEX `idx_created_at_id` (`created_at`, `id`);
+
+ALTER TABLE `responses`
+ADD INDEX `idx_created_at_id` (`created_at`, `id`),
+DROP INDEX `idx_created_at`;
+
+-- Verify the change
+SHOW INDEX FROM files;
+SHOW INDEX FROM responses;
+
+-- Success message
+SELECT 'Migration completed successfully! Pagination indexes have been added to the files and responses tables.' AS status;
@@ -0,0 +1,18 @@
+-- Migration: Add FULLTEXT index on responses (question, response)
+-- Date: 2026-10-17
+-- Description: /api/results/search ranks stored questions and answers with
+--              MATCH (question, response) AGAINST (...). The FULLTEXT index
+--              serves that match instead of a LIKE scan of every response.
+--              InnoDB skips words shorter than innodb_ft_min_token_size (3)
+--              and stopwords.
+
+USE `exoplanets-rag`;
+
+ALTER TABLE `responses`
+ADD FULLTEXT INDEX `ft_question_response` (`question`, `response`);
+
+-- Verify the change
+SHOW INDEX FROM responses;
+
+-- Success message
+SELECT 'Migration completed successfully! Full-text index has been added to the responses table.' AS status;
@@ -0,0 +1,24 @@
+-- Migration: Create answer_cache_generation table
+-- Date: 2026-10-17
+-- Description: Every answer cache invalidation bumps the generation stored in
+--              this single-row table. Workers re-read it at most every
+--              ANSWER_CACHE_GENERATION_CHECK_SECONDS and clear their in-process
+--              LRU tier when it changed, so an upload handled by one worker
+--              also invalidates the answers cached by the others.
+
+USE `exoplanets-rag`;
+
+CREATE TABLE IF NOT EXISTS `answer_cache_generation` (
+    `id` INT NOT NULL,
+    `generation` INT NOT NULL DEFAULT 0,
+    `updated_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO `answer_cache_generation` (`id`, `generation`) VALUES (1, 0);
+
+-- Verify the change
+SELECT * FROM answer_cache_generation;
+
+-- Success message
+SELECT 'Migration completed successfully! The answer_cache_generation table has been created.' AS status;
@@ -137,6 +137,161 @@ async function uploadFile(file, onProgress = null) {
     }
 }
 
+/**
+ * Compute the SHA-256 of a file as a hex string
+ * @param {File} file - File to hash
+ * @returns {Promise<string|null>} Hex digest, or null if Web Crypto is unavailable (non-HTTPS pages)
+ */
+async function sha256Hex(file) {
+    if (!window.crypto || !window.crypto.subtle) {
+        return null;
+    }
+    const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest))
+        .map(byte => byte.toString(16).padStart(2, '0'))
+        .join('');
+}
+
+/**
+ * PUT a body to a presigned R2 URL
+ * @param {string} url - Presigned URL
+ * @param {Blob} body - File or file slice
+ * @param {object} headers - Headers that are part of the signature
+ * @param {function} onProgress - Progress callback with bytes sent (optional)
+ * @returns {Promise<string>} ETag of the stored object or part
+ */
+function putToPresignedUrl(url, body, headers, onProgress = null) {
+    const xhr = new XMLHttpRequest();
+    
+    return new Promise((resolve, reject) => {
+        if (onProgress) {
+            xhr.upload.addEventListener('progress', (e) => {
+                onProgress(e.loaded);
+            });
+        }
+        
+        xhr.addEventListener('load', () => {
+            if (xhr.status >= 200 && xhr.status < 300) {
+                resolve(xhr.getResponseHeader('ETag'));
+            } else {
+                reject(new Error(`R2 upload failed: ${xhr.status}`));
+            }
+        });
+        
+        // Also raised when the bucket's CORS policy does not allow the admin origin
+        xhr.addEventListener('error', () => {
+            const error = new Error('Network error during upload to R2');
+            error.network = true;
+            reject(error);
+        });
+        
+        xhr.open('PUT', url);
+        Object.entries(headers || {}).forEach(([key, value]) => {
+            xhr.setRequestHeader(key, value);
+        });
+        xhr.send(body);
+    });
+}
+
+/**
+ * Upload a file directly to R2 with presigned URLs
+ * The bytes go from the browser to R2; the API only issues the URLs and records the file.
+ * Falls back to uploadFile() when the API has no presign endpoint or R2 cannot be reached (CORS).
+ * @param {File} file - File to upload
+ * @param {function} onProgress - Progress callback (optional)
+ * @returns {Promise<object>} Upload response
+ */
+async function uploadFileDirect(file, onProgress = null) {
+    try {
+        const headers = {
+            'Content-Type': 'application/json',
+            ...getAuthHeaders()
+        };
+        
+        // Identical content already stored is not uploaded again
+        const sha256 = await sha256Hex(file);
+        
+        const presignResponse = await fetch(getApiUrl('UPLOAD_PRESIGN'), {
+            method: 'POST',
+            headers: headers,
+            body: JSON.stringify({
+                filename: file.name,
+                size: file.size,
+                sha256: sha256
+            })
+        });
+        
+        if (presignResponse.status === 404) {
+            return await uploadFile(file, onProgress).catch(result => result);
+        }
+        if (!presignResponse.ok) {
+            const error = await presignResponse.json();
+            throw new Error(error.detail || `Upload failed: ${presignResponse.status}`);
+        }
+        
+        const presigned = await presignResponse.json();
+        const parts = [];
+        
+        try {
+            if (presigned.method === 'put') {
+                await putToPresignedUrl(presigned.url, file, presigned.headers, (loaded) => {
+                    if (onProgress && file.size) {
+                        onProgress((loaded / file.size) * 100);
+                    }
+                });
+            } else if (presigned.method === 'multipart') {
+                let offset = 0;
+                for (const part of presigned.parts) {
+                    const partOffset = offset;
+                    const etag = await putToPresignedUrl(part.url, file.slice(offset, offset + part.size), presigned.headers, (loaded) => {
+                        if (onProgress) {
+                            onProgress(((partOffset + loaded) / file.size) * 100);
+                        }
+                    });
+                    parts.push({ part_number: part.part_number, etag: etag });
+                    offset += part.size;
+                }
+            }
+        } catch (error) {
+            if (error.network) {
+                console.warn('Direct upload to R2 failed (check the bucket CORS policy), uploading through the API:', error);
+                return await uploadFile(file, onProgress).catch(result => result);
+            }
+            throw error;
+        }
+        
+        const completeResponse = await fetch(getApiUrl('UPLOAD_COMPLETE'), {
+            method: 'POST',
+            headers: headers,
+            body: JSON.stringify({
+                upload_token: presigned.upload_token,
+                parts: parts
+            })
+        });
+        
+        if (!completeResponse.ok) {
+            const error = await completeResponse.json();
+            throw new Error(error.detail || `Upload failed: ${completeResponse.status}`);
+        }
+        
+        if (onProgress) {
+            onProgress(100);
+        }
+        
+        const data = await completeResponse.json();
+        return {
+            success: true,
+            data: data
+        };
+    } catch (error) {
+        console.error('Direct upload error:', error);
+        return {
+            success: false,
+            error: error.message
+        };
+    }
+}
+
 /**
  * Send AI request to the API
  * @param {string} question - Question to ask
@@ -199,7 +354,8 @@ async function getFiles(page = 1, pageSize = 20) {
         const data = await response.json();
         return {
             success: true,
-            data: data
+            data: data,
+            watermark: response.headers.get('X-Watermark')
         };
     } catch (error) {
         console.error('Get files error:', error);
@@ -341,6 +497,7 @@ if (typeof module !== 'undefined' && module.exports) {
     module.exports = {
         login,
         uploadFile,
+        uploadFileDirect,
         sendAIRequest,
         getFiles,
         getFilesCount,
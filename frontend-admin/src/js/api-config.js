@@ -14,6 +14,8 @@ const API_ENDPOINTS = {
     
     // File Management
     UPLOAD: '/api/upload',
+    UPLOAD_PRESIGN: '/api/upload/presign',
+    UPLOAD_COMPLETE: '/api/upload/complete',
     FILES: '/api/files',
     
     // AI Request
@@ -476,7 +476,8 @@ document.addEventListener('DOMContentLoaded', function() {
             console.log(`Uploading file ${i + 1}/${selectedFiles.length}:`, file.name);
             
             try {
-                const result = await uploadFile(file, (progress) => {
+                // Bytes go straight to R2 with presigned URLs (falls back to the API upload)
+                const result = await uploadFileDirect(file, (progress) => {
                     console.log(`Upload progress for ${file.name}: ${progress.toFixed(1)}%`);
                 });
                 
@@ -650,16 +651,27 @@ document.addEventListener('DOMContentLoaded', function() {
         `;
     }
     
+    // Newest file shown (X-Watermark), to skip refreshes when nothing changed
+    let uploadedFilesWatermark = null;
+    
     // Load uploaded files from API
-    async function loadUploadedFiles() {
+    async function loadUploadedFiles(showLoading = true) {
         try {
-            showUploadedFilesLoading();
+            if (showLoading) {
+                showUploadedFilesLoading();
+            }
+            
+            // Get first page (revalidated by ETag, 304 when unchanged)
+            const filesResult = await getFiles(1, 10); // Show first 10 files
+            if (!showLoading && filesResult.success && filesResult.watermark === uploadedFilesWatermark) {
+                return;
+            }
             
-            // Get files count and first page
-            const [countResult, filesResult] = await Promise.all([
-                getFilesCount(),
-                getFiles(1, 10) // Show first 10 files
-            ]);
+            // Get files count only when the list changed
+            const countResult = await getFilesCount();
+            if (filesResult.success) {
+                uploadedFilesWatermark = filesResult.watermark;
+            }
             
             // Update files count
             const filesCountElement = document.getElementById('filesCount');
@@ -744,9 +756,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Load uploaded files on page load
     loadUploadedFiles();
     
-    // Refresh uploaded files every 15 seconds
+    // Refresh uploaded files every 15 seconds (silently, skipped when unchanged)
     setInterval(() => {
-        loadUploadedFiles();
+        loadUploadedFiles(false);
     }, 15000);
     
     // Refresh uploaded files after successful upload
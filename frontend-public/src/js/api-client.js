@@ -25,7 +25,8 @@ async function getFiles(page = 1, pageSize = 20) {
         const data = await response.json();
         return {
             success: true,
-            data: data
+            data: data,
+            watermark: response.headers.get('X-Watermark')
         };
     } catch (error) {
         console.error('Get files error:', error);
@@ -36,6 +37,43 @@ async function getFiles(page = 1, pageSize = 20) {
     }
 }
 
+/**
+ * Get files newer than a watermark (newest first)
+ * Polling with an unchanged watermark is answered 304 by the server and
+ * served from the browser cache.
+ * @param {string} since - Watermark from a previous response
+ * @param {number} pageSize - Maximum items
+ * @returns {Promise<object>} New files; truncated when more are newer than pageSize
+ */
+async function getFilesSince(since, pageSize = 20) {
+    try {
+        const url = `${getApiUrl('FILES')}?since=${encodeURIComponent(since)}&page_size=${pageSize}`;
+        
+        const response = await fetch(url, {
+            method: 'GET'
+        });
+        
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.detail || `Failed to fetch new files: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        return {
+            success: true,
+            data: data,
+            watermark: response.headers.get('X-Watermark') || since,
+            truncated: response.headers.get('X-Delta-Truncated') === 'true'
+        };
+    } catch (error) {
+        console.error('Get new files error:', error);
+        return {
+            success: false,
+            error: error.message
+        };
+    }
+}
+
 /**
  * Get total count of files
  * @returns {Promise<object>} Files count
@@ -68,14 +106,14 @@ async function getFilesCount() {
 }
 
 /**
- * Get paginated list of AI results
+ * Get paginated list of AI results (summary view: answer snippets, full text via getResult)
  * @param {number} page - Page number (1-indexed)
  * @param {number} pageSize - Items per page
  * @returns {Promise<object>} Results list
  */
 async function getResults(page = 1, pageSize = 20) {
     try {
-        const url = `${getApiUrl('RESULTS')}?page=${page}&page_size=${pageSize}`;
+        const url = `${getApiUrl('RESULTS')}?page=${page}&page_size=${pageSize}&view=summary`;
         
         const response = await fetch(url, {
             method: 'GET'
@@ -89,7 +127,8 @@ async function getResults(page = 1, pageSize = 20) {
         const data = await response.json();
         return {
             success: true,
-            data: data
+            data: data,
+            watermark: response.headers.get('X-Watermark')
         };
     } catch (error) {
         console.error('Get results error:', error);
@@ -100,6 +139,75 @@ async function getResults(page = 1, pageSize = 20) {
     }
 }
 
+/**
+ * Get AI results newer than a watermark (newest first)
+ * Polling with an unchanged watermark is answered 304 by the server and
+ * served from the browser cache.
+ * @param {string} since - Watermark from a previous response
+ * @param {number} pageSize - Maximum items
+ * @returns {Promise<object>} New AI results; truncated when more are newer than pageSize
+ */
+async function getResultsSince(since, pageSize = 20) {
+    try {
+        const url = `${getApiUrl('RESULTS')}?since=${encodeURIComponent(since)}&page_size=${pageSize}&view=summary`;
+        
+        const response = await fetch(url, {
+            method: 'GET'
+        });
+        
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.detail || `Failed to fetch new results: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        return {
+            success: true,
+            data: data,
+            watermark: response.headers.get('X-Watermark') || since,
+            truncated: response.headers.get('X-Delta-Truncated') === 'true'
+        };
+    } catch (error) {
+        console.error('Get new results error:', error);
+        return {
+            success: false,
+            error: error.message
+        };
+    }
+}
+
+/**
+ * Get one AI result with its full answer
+ * @param {string} uid - Result UID
+ * @returns {Promise<object>} Result
+ */
+async function getResult(uid) {
+    try {
+        const url = `${getApiUrl('RESULTS')}/${encodeURIComponent(uid)}`;
+        
+        const response = await fetch(url, {
+            method: 'GET'
+        });
+        
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.detail || `Failed to fetch result: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        return {
+            success: true,
+            data: data
+        };
+    } catch (error) {
+        console.error('Get result error:', error);
+        return {
+            success: false,
+            error: error.message
+        };
+    }
+}
+
 /**
  * Get total count of AI results
  * @returns {Promise<object>} Results count
@@ -163,8 +271,11 @@ async function checkHealth() {
 if (typeof module !== 'undefined' && module.exports) {
     module.exports = {
         getFiles,
+        getFilesSince,
         getFilesCount,
         getResults,
+        getResultsSince,
+        getResult,
         getResultsCount,
         checkHealth
     };
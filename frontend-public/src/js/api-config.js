@@ -15,6 +15,9 @@ const API_ENDPOINTS = {
     // Results (Public)
     RESULTS: '/api/results',
     
+    // Change feed of new files and results (Server-Sent Events)
+    EVENTS: '/api/events',
+    
     // Health Check
     HEALTH: '/health',
     ROOT: '/'
@@ -11,7 +11,17 @@ const itemsPerPage = 20;
 let autoRefreshInterval = null;
 let lastFilesData = null;
 let lastResultsData = null;
+// Newest row seen (X-Watermark), for fetching only newer rows on page 1
+let filesWatermark = null;
+let resultsWatermark = null;
 const AUTO_REFRESH_INTERVAL = 3000; // 3 seconds
+// Polling also reloads page 1 this often, for rows committed too late for the since= window
+const FULL_RELOAD_INTERVAL = 5 * 60 * 1000; // 5 minutes
+let filesLoadedAt = 0;
+let resultsLoadedAt = 0;
+
+// Server-pushed updates (/api/events); polling is the fallback
+let eventSource = null;
 
 // Video initialization
 function initializeVideo() {
@@ -120,6 +130,12 @@ async function loadFiles(page = 1, showLoading = true) {
             totalFilesCount = countResult.data.count;
         }
         
+        if (filesResult.success) {
+            lastFilesData = filesResult.data;
+            filesWatermark = filesResult.watermark;
+            filesLoadedAt = Date.now();
+        }
+        
         if (filesResult.success && filesResult.data.length > 0) {
             displayFiles(filesResult.data);
             currentFilesPage = page;
@@ -229,6 +245,12 @@ async function loadResults(page = 1, showLoading = true) {
             totalResultsCount = countResult.data.count;
         }
         
+        if (resultsResult.success) {
+            lastResultsData = resultsResult.data;
+            resultsWatermark = resultsResult.watermark;
+            resultsLoadedAt = Date.now();
+        }
+        
         if (resultsResult.success && resultsResult.data.length > 0) {
             displayResults(resultsResult.data);
             currentResultsPage = page;
@@ -350,6 +372,8 @@ function displayResults(results) {
         
         const timeAgo = getTimeAgo(new Date(result.created_at));
         const uniqueId = `result-${result.uid}`;
+        // Lists carry a snippet of the answer; live updates carry the full text
+        const answerHTML = resultAnswerHTML(result, uniqueId);
         
         // Build HTML content
         let contentHTML = `
@@ -419,7 +443,7 @@ function displayResults(results) {
                         </svg>
                         <p class="text-sm font-semibold text-blue-900">Detailed Analysis</p>
                     </div>
-                    <p class="text-sm text-blue-800 whitespace-pre-wrap">${escapeHtml(result.response)}</p>
+                    ${answerHTML}
                 </div>
             `;
         } else {
@@ -431,7 +455,7 @@ function displayResults(results) {
                 </div>
                 <div class="p-3 bg-blue-50 rounded-lg border border-blue-200">
                     <p class="text-xs font-semibold text-blue-900 mb-2">🤖 AI Response</p>
-                    <p class="text-sm text-blue-800 whitespace-pre-wrap">${escapeHtml(result.response)}</p>
+                    ${answerHTML}
                 </div>
             `;
         }
@@ -441,6 +465,34 @@ function displayResults(results) {
     });
 }
 
+// Answer text of a result, with a button loading the full text when only a snippet is known
+function resultAnswerHTML(result, uniqueId) {
+    if (result.response !== undefined) {
+        return `<p class="text-sm text-blue-800 whitespace-pre-wrap">${escapeHtml(result.response)}</p>`;
+    }
+    let html = `<p id="${uniqueId}-answer" class="text-sm text-blue-800 whitespace-pre-wrap">${escapeHtml(result.snippet)}${result.truncated ? '…' : ''}</p>`;
+    if (result.truncated) {
+        html += `<button type="button" class="mt-2 text-xs font-semibold text-blue-700 hover:underline"
+                         onclick="event.stopPropagation(); loadFullResult('${uniqueId}', '${escapeHtml(result.uid)}', this)">Show full answer</button>`;
+    }
+    return html;
+}
+
+// Replace a result's snippet with its full answer
+async function loadFullResult(uniqueId, uid, button) {
+    button.disabled = true;
+    button.textContent = 'Loading...';
+    
+    const result = await getResult(uid);
+    if (result.success) {
+        document.getElementById(`${uniqueId}-answer`).textContent = result.data.response;
+        button.remove();
+    } else {
+        button.disabled = false;
+        button.textContent = 'Could not load the full answer, try again';
+    }
+}
+
 // Display "no results" message
 function displayNoResults() {
     const container = document.querySelector('.bg-white.rounded-xl.shadow-lg:last-child .space-y-4');
@@ -519,18 +571,49 @@ function hasDataChanged(oldData, newData) {
     return false;
 }
 
+// Merge new rows into the displayed page, newest first, keeping one page
+function mergeNewRows(newRows, oldRows) {
+    const newUids = new Set(newRows.map(row => row.uid));
+    const kept = (oldRows || []).filter(row => !newUids.has(row.uid));
+    // Rows committed late can be older than rows already shown
+    const merged = newRows.concat(kept).sort((a, b) => (a.created_at < b.created_at ? 1 : a.created_at > b.created_at ? -1 : 0));
+    return merged.slice(0, itemsPerPage);
+}
+
+// Rows not on the displayed page yet (since= also returns recent rows again)
+function unseenRows(rows, shownRows) {
+    const shownUids = new Set((shownRows || []).map(row => row.uid));
+    return rows.filter(row => !shownUids.has(row.uid));
+}
+
 // Auto-refresh files silently (without loading animation)
 async function autoRefreshFiles() {
     try {
-        // Get data silently
-        const [countResult, filesResult] = await Promise.all([
-            getFilesCount(),
-            getFiles(currentFilesPage, itemsPerPage)
-        ]);
+        let filesResult;
+        if (currentFilesPage === 1 && filesWatermark && Date.now() - filesLoadedAt < FULL_RELOAD_INTERVAL) {
+            // Ask only for rows newer than the newest one shown; nothing new means no count request
+            const deltaResult = await getFilesSince(filesWatermark, itemsPerPage);
+            if (!deltaResult.success) {
+                return;
+            }
+            const newRows = unseenRows(deltaResult.data, lastFilesData);
+            if (newRows.length === 0) {
+                return;
+            }
+            filesResult = deltaResult.truncated
+                ? await getFiles(1, itemsPerPage)
+                : { ...deltaResult, data: mergeNewRows(newRows, lastFilesData) };
+        } else {
+            // Other pages are revalidated by ETag (304 when unchanged)
+            filesResult = await getFiles(currentFilesPage, itemsPerPage);
+            filesLoadedAt = Date.now();
+        }
+        const countResult = await getFilesCount();
         
         if (countResult.success && filesResult.success) {
             const newTotalCount = countResult.data.count;
             const newFilesData = filesResult.data;
+            filesWatermark = filesResult.watermark || filesWatermark;
             
             // Check if count changed or data changed
             const countChanged = totalFilesCount !== newTotalCount;
@@ -559,15 +642,31 @@ async function autoRefreshFiles() {
 // Auto-refresh results silently (without loading animation)
 async function autoRefreshResults() {
     try {
-        // Get data silently
-        const [countResult, resultsResult] = await Promise.all([
-            getResultsCount(),
-            getResults(currentResultsPage, itemsPerPage)
-        ]);
+        let resultsResult;
+        if (currentResultsPage === 1 && resultsWatermark && Date.now() - resultsLoadedAt < FULL_RELOAD_INTERVAL) {
+            // Ask only for rows newer than the newest one shown; nothing new means no count request
+            const deltaResult = await getResultsSince(resultsWatermark, itemsPerPage);
+            if (!deltaResult.success) {
+                return;
+            }
+            const newRows = unseenRows(deltaResult.data, lastResultsData);
+            if (newRows.length === 0) {
+                return;
+            }
+            resultsResult = deltaResult.truncated
+                ? await getResults(1, itemsPerPage)
+                : { ...deltaResult, data: mergeNewRows(newRows, lastResultsData) };
+        } else {
+            // Other pages are revalidated by ETag (304 when unchanged)
+            resultsResult = await getResults(currentResultsPage, itemsPerPage);
+            resultsLoadedAt = Date.now();
+        }
+        const countResult = await getResultsCount();
         
         if (countResult.success && resultsResult.success) {
             const newTotalCount = countResult.data.count;
             const newResultsData = resultsResult.data;
+            resultsWatermark = resultsResult.watermark || resultsWatermark;
             
             // Check if count changed or data changed
             const countChanged = totalResultsCount !== newTotalCount;
@@ -593,6 +692,85 @@ async function autoRefreshResults() {
     }
 }
 
+// Show a file pushed by the change feed
+function onNewFile(file) {
+    if (lastFilesData && lastFilesData.some(row => row.uid === file.uid)) return;
+    totalFilesCount += 1;
+    if (currentFilesPage === 1) {
+        lastFilesData = mergeNewRows([file], lastFilesData);
+        displayFiles(lastFilesData);
+    }
+    updateFilesPagination();
+}
+
+// Show a result pushed by the change feed
+function onNewResult(result) {
+    if (lastResultsData && lastResultsData.some(row => row.uid === result.uid)) return;
+    totalResultsCount += 1;
+    if (currentResultsPage === 1) {
+        lastResultsData = mergeNewRows([result], lastResultsData);
+        displayResults(lastResultsData);
+    }
+    updateResultsPagination();
+}
+
+// Keep the watermarks in step with the change feed (event ids are "<files watermark>.<results watermark>")
+function setWatermarksFromEventId(eventId) {
+    const [files, results] = (eventId || '').split('.');
+    filesWatermark = files || filesWatermark;
+    resultsWatermark = results || resultsWatermark;
+}
+
+// Subscribe to the change feed, falling back to polling when it is unavailable
+function startLiveUpdates() {
+    if (!window.EventSource) {
+        startAutoRefresh();
+        return;
+    }
+    if (eventSource) {
+        eventSource.close();
+    }
+    
+    // Start from the watermarks of the loaded lists, so rows added meanwhile are replayed
+    const lastEventId = `${filesWatermark || ''}.${resultsWatermark || ''}`;
+    eventSource = new EventSource(`${getApiUrl('EVENTS')}?last_event_id=${encodeURIComponent(lastEventId)}`);
+    
+    eventSource.addEventListener('ready', function(e) {
+        setWatermarksFromEventId(e.lastEventId);
+        stopAutoRefresh();
+        console.log('📡 Live updates enabled');
+    });
+    eventSource.addEventListener('file', function(e) {
+        setWatermarksFromEventId(e.lastEventId);
+        onNewFile(JSON.parse(e.data));
+    });
+    eventSource.addEventListener('result', function(e) {
+        setWatermarksFromEventId(e.lastEventId);
+        onNewResult(JSON.parse(e.data));
+    });
+    eventSource.addEventListener('reset', function() {
+        // Events were lost: reload the lists
+        loadFiles(currentFilesPage, false);
+        loadResults(currentResultsPage, false);
+    });
+    eventSource.onerror = function() {
+        // The browser reconnects by itself (with Last-Event-ID) unless the stream was closed for good
+        if (eventSource.readyState === EventSource.CLOSED) {
+            eventSource = null;
+            startAutoRefresh();
+        }
+    };
+}
+
+// Close the change feed and stop polling
+function stopLiveUpdates() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+    stopAutoRefresh();
+}
+
 // Start auto-refresh interval
 function startAutoRefresh() {
     // Clear any existing interval
@@ -627,28 +805,14 @@ const prefersReducedMotion = window.matchMedia('(prefers-reduced-motion: reduce)
 document.addEventListener('DOMContentLoaded', async function() {
     initializeVideo();
     
-    // Load data from API initially
+    // Load data from API initially (also stores it for comparison)
     await Promise.all([
         loadFiles(1),
         loadResults(1)
     ]);
     
-    // Store initial data for comparison
-    const [filesResult, resultsResult] = await Promise.all([
-        getFiles(currentFilesPage, itemsPerPage),
-        getResults(currentResultsPage, itemsPerPage)
-    ]);
-    
-    if (filesResult.success) {
-        lastFilesData = filesResult.data;
-    }
-    
-    if (resultsResult.success) {
-        lastResultsData = resultsResult.data;
-    }
-    
-    // Start auto-refresh after initial load
-    startAutoRefresh();
+    // Start live updates after initial load
+    startLiveUpdates();
     
     // Pause video if user prefers reduced motion
     if (prefersReducedMotion.matches) {
@@ -659,15 +823,18 @@ document.addEventListener('DOMContentLoaded', async function() {
     }
 });
 
-// Stop auto-refresh when page is hidden (to save resources)
+// Stop live updates when page is hidden (to save resources)
 document.addEventListener('visibilitychange', function() {
     if (document.hidden) {
-        stopAutoRefresh();
+        stopLiveUpdates();
     } else {
-        startAutoRefresh();
-        // Immediately refresh when page becomes visible again
-        autoRefreshFiles();
-        autoRefreshResults();
+        // Reconnecting to the change feed replays what was missed while hidden
+        startLiveUpdates();
+        if (!window.EventSource) {
+            // Immediately refresh when page becomes visible again
+            autoRefreshFiles();
+            autoRefreshResults();
+        }
     }
 });
 
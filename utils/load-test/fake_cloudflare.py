@@ -0,0 +1,386 @@
+"""
+Local stand-in for the Cloudflare services used by the backend.
+
+Serves on one port:
+- AI Search:  POST  /client/v4/accounts/{account}/autorag/rags/{name}/ai-search  (JSON or SSE stream)
+              PATCH /client/v4/accounts/{account}/autorag/rags/{name}/sync
+              GET   /client/v4/accounts/{account}/autorag/rags/{name}/jobs/{job_id}
+- Workers AI: POST  /client/v4/accounts/{account}/ai/run/{model}  (embeddings and text generation)
+- Turnstile:  POST  /turnstile/v0/siteverify  (tokens equal to "fail" are rejected)
+- R2:         S3-compatible path-style API kept in memory
+              (PutObject, GetObject, HeadObject, DeleteObject, ListObjectsV2, multipart uploads;
+              presigned URLs are accepted without checking the signature, x-amz-checksum-sha256 is verified)
+- GET /_fake/stats: calls, injected errors and stored objects per service
+
+Every service has its own latency distribution (log-normal around a median) and
+error rate, so the backend can be load-tested without touching Cloudflare.
+
+Usage:
+    python fake_cloudflare.py [--port 8787] [--ai-search-latency-ms 800] [--ai-search-error-rate 0.01] ...
+
+Point the backend at it with:
+    CLOUDFLARE_API_BASE_URL=http://127.0.0.1:8787/client/v4
+    R2_ENDPOINT_URL=http://127.0.0.1:8787
+    TURNSTILE_VERIFY_URL=http://127.0.0.1:8787/turnstile/v0/siteverify
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Services with their own latency / error profile
+SERVICES = ("ai_search", "workers_ai", "sync", "r2", "turnstile")
+
+# Default median latency (ms) per service, close to what production shows
+DEFAULT_LATENCY_MS = {"ai_search": 800, "workers_ai": 150, "sync": 120, "r2": 40, "turnstile": 60}
+
+# Embedding size of @cf/baai/bge-m3
+EMBEDDING_DIMENSIONS = 1024
+
+S3_NAMESPACE = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+@dataclass
+class ServiceProfile:
+    """Latency distribution and error injection of one fake service"""
+    latency_ms: float
+    sigma: float = 0.4
+    error_rate: float = 0.0
+    error_status: int = 503
+    calls: int = 0
+    errors: int = 0
+    
+    def delay(self) -> float:
+        """Sample a latency in seconds (log-normal around the median)"""
+        if self.latency_ms <= 0:
+            return 0.0
+        return self.latency_ms / 1000 * math.exp(self.sigma * random.gauss(0, 1))
+    
+    def fails(self) -> bool:
+        """Decide whether this call gets an injected error"""
+        self.calls += 1
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+
+@dataclass
+class MultipartUpload:
+    """In-progress multipart upload"""
+    bucket: str
+    key: str
+    content_type: str
+    parts: Dict[int, bytes] = field(default_factory=dict)
+
+
+class FakeR2:
+    """In-memory S3-compatible object store"""
+    
+    def __init__(self):
+        self.objects: Dict[str, Dict[str, bytes]] = {}
+        self.content_types: Dict[Tuple[str, str], str] = {}
+        self.uploads: Dict[str, MultipartUpload] = {}
+    
+    def put(self, bucket: str, key: str, body: bytes, content_type: str = "application/octet-stream") -> str:
+        self.objects.setdefault(bucket, {})[key] = body
+        self.content_types[(bucket, key)] = content_type
+        return hashlib.md5(body).hexdigest()
+    
+    def get(self, bucket: str, key: str) -> Optional[bytes]:
+        return self.objects.get(bucket, {}).get(key)
+    
+    def stats(self) -> dict:
+        return {
+            "objects": sum(len(keys) for keys in self.objects.values()),
+            "bytes": sum(len(body) for keys in self.objects.values() for body in keys.values()),
+            "multipart_in_progress": len(self.uploads),
+        }
+
+
+def decode_aws_chunked(body: bytes) -> bytes:
+    """
+    Decode an 'aws-chunked' request body (SigV4 streaming uploads).
+    
+    Args:
+        body: Raw body ("<hex size>;chunk-signature=...\\r\\n<data>\\r\\n" ... "0;...")
+    
+    Returns:
+        Payload bytes
+    """
+    payload = bytearray()
+    position = 0
+    while position < len(body):
+        header_end = body.index(b"\r\n", position)
+        size = int(body[position:header_end].split(b";")[0], 16)
+        if size == 0:
+            break
+        start = header_end + 2
+        payload += body[start:start + size]
+        position = start + size + 2
+    return bytes(payload)
+
+
+def fake_answer(query: str) -> str:
+    """Deterministic answer for a question, with a probability the backend can extract"""
+    digest = hashlib.sha256(query.encode("utf-8")).digest()
+    probability = digest[0] % 100
+    return (
+        f"According to the indexed NASA documents, {query.strip()[:120]} "
+        f"The estimated probability is {probability}% based on the available observations."
+    )
+
+
+def fake_embedding(text: str) -> List[float]:
+    """Deterministic unit vector for a text"""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def create_app(profiles: Dict[str, ServiceProfile], sync_job_seconds: float = 5.0) -> FastAPI:
+    """
+    Build the fake Cloudflare application.
+    
+    Args:
+        profiles: Latency / error profile per service name
+        sync_job_seconds: Duration of the fake sync jobs
+    
+    Returns:
+        FastAPI application
+    """
+    app = FastAPI(title="Fake Cloudflare")
+    r2 = FakeR2()
+    # Sync job id -> start time; jobs end sync_job_seconds later
+    jobs: Dict[str, float] = {}
+    started_at = time.time()
+    
+    def cloudflare_error(profile: ServiceProfile) -> JSONResponse:
+        headers = {"Retry-After": "1"} if profile.error_status in (429, 503) else {}
+        return JSONResponse(
+            status_code=profile.error_status,
+            content={"success": False, "errors": [{"code": profile.error_status, "message": "Injected fake error"}]},
+            headers=headers
+        )
+    
+    def s3_error(status_code: int, code: str, message: str) -> Response:
+        body = f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>'
+        return Response(body, status_code=status_code, media_type="application/xml")
+    
+    @app.get("/_fake/stats")
+    async def stats():
+        return {
+            "uptime_seconds": round(time.time() - started_at, 1),
+            "services": {
+                name: {"calls": profile.calls, "errors": profile.errors, "latency_ms": profile.latency_ms, "error_rate": profile.error_rate}
+                for name, profile in profiles.items()
+            },
+            "r2": r2.stats(),
+            "sync_jobs": len(jobs),
+        }
+    
+    @app.post("/client/v4/accounts/{account}/autorag/rags/{name}/ai-search")
+    async def ai_search(account: str, name: str, request: Request):
+        profile = profiles["ai_search"]
+        payload = await request.json()
+        answer = fake_answer(payload.get("query", ""))
+        
+        if not payload.get("stream"):
+            await asyncio.sleep(profile.delay())
+            if profile.fails():
+                return cloudflare_error(profile)
+            return {"success": True, "result": {"response": answer, "data": []}}
+        
+        # Time to first token is a fraction of the total; the rest is spread over the tokens
+        total = profile.delay()
+        await asyncio.sleep(total * 0.3)
+        if profile.fails():
+            return cloudflare_error(profile)
+        tokens = [word + " " for word in answer.split(" ")]
+        
+        async def events():
+            for token in tokens:
+                yield f"data: {json.dumps({'response': token})}\n\n"
+                await asyncio.sleep(total * 0.7 / len(tokens))
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(events(), media_type="text/event-stream")
+    
+    @app.patch("/client/v4/accounts/{account}/autorag/rags/{name}/sync")
+    async def sync(account: str, name: str):
+        profile = profiles["sync"]
+        await asyncio.sleep(profile.delay())
+        if profile.fails():
+            return cloudflare_error(profile)
+        job_id = uuid.uuid4().hex
+        jobs[job_id] = time.time()
+        return {"success": True, "result": {"job_id": job_id}}
+    
+    @app.get("/client/v4/accounts/{account}/autorag/rags/{name}/jobs/{job_id}")
+    async def sync_job(account: str, name: str, job_id: str):
+        started = jobs.get(job_id)
+        if started is None:
+            return JSONResponse(status_code=404, content={"success": False, "errors": [{"code": 404, "message": "Job not found"}]})
+        ended = started + sync_job_seconds
+        return {
+            "success": True,
+            "result": {
+                "id": job_id,
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+                "ended_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ended)) if time.time() >= ended else None,
+                "end_reason": "completed" if time.time() >= ended else None,
+            },
+        }
+    
+    @app.post("/client/v4/accounts/{account}/ai/run/{model:path}")
+    async def workers_ai(account: str, model: str, request: Request):
+        profile = profiles["workers_ai"]
+        payload = await request.json()
+        await asyncio.sleep(profile.delay())
+        if profile.fails():
+            return cloudflare_error(profile)
+        if "text" in payload:
+            texts = payload["text"] if isinstance(payload["text"], list) else [payload["text"]]
+            return {"success": True, "result": {"shape": [len(texts), EMBEDDING_DIMENSIONS], "data": [fake_embedding(t) for t in texts]}}
+        prompt = payload.get("prompt") or " ".join(m.get("content", "") for m in payload.get("messages", []))
+        return {"success": True, "result": {"response": fake_answer(prompt.splitlines()[-1] if prompt else "")}}
+    
+    @app.post("/turnstile/v0/siteverify")
+    async def turnstile(request: Request):
+        profile = profiles["turnstile"]
+        form = await request.form()
+        await asyncio.sleep(profile.delay())
+        if profile.fails():
+            return JSONResponse(status_code=profile.error_status, content={"success": False, "error-codes": ["internal-error"]})
+        if form.get("response") == "fail":
+            return {"success": False, "error-codes": ["invalid-input-response"]}
+        return {"success": True, "challenge_ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "hostname": "localhost"}
+    
+    @app.get("/{bucket}")
+    async def list_objects(bucket: str, prefix: str = ""):
+        profile = profiles["r2"]
+        await asyncio.sleep(profile.delay())
+        if profile.fails():
+            return s3_error(profile.error_status, "SlowDown", "Injected fake error")
+        keys = sorted(key for key in r2.objects.get(bucket, {}) if key.startswith(prefix))
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><Size>{len(r2.objects[bucket][key])}</Size>"
+            f'<ETag>"{hashlib.md5(r2.objects[bucket][key]).hexdigest()}"</ETag></Contents>'
+            for key in keys
+        )
+        body = (
+            f'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult xmlns="{S3_NAMESPACE}">'
+            f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(keys)}</KeyCount>"
+            f"<IsTruncated>false</IsTruncated>{contents}</ListBucketResult>"
+        )
+        return Response(body, media_type="application/xml")
+    
+    @app.api_route("/{bucket}/{key:path}", methods=["PUT", "GET", "HEAD", "DELETE", "POST"])
+    async def s3_object(bucket: str, key: str, request: Request):
+        profile = profiles["r2"]
+        params = request.query_params
+        body = await request.body()
+        if request.headers.get("x-amz-content-sha256", "").startswith("STREAMING-") or "aws-chunked" in request.headers.get("content-encoding", ""):
+            body = decode_aws_chunked(body)
+        await asyncio.sleep(profile.delay())
+        if profile.fails():
+            return s3_error(profile.error_status, "SlowDown", "Injected fake error")
+        
+        if request.method == "POST" and "uploads" in params:
+            upload_id = uuid.uuid4().hex
+            r2.uploads[upload_id] = MultipartUpload(bucket, key, request.headers.get("content-type", "application/octet-stream"))
+            body = (
+                f'<?xml version="1.0" encoding="UTF-8"?><InitiateMultipartUploadResult xmlns="{S3_NAMESPACE}">'
+                f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId>"
+                f"</InitiateMultipartUploadResult>"
+            )
+            return Response(body, media_type="application/xml")
+        
+        if "uploadId" in params:
+            upload = r2.uploads.get(params["uploadId"])
+            if upload is None:
+                return s3_error(404, "NoSuchUpload", "The specified multipart upload does not exist")
+            if request.method == "PUT":
+                upload.parts[int(params["partNumber"])] = body
+                return Response(headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+            if request.method == "DELETE":
+                del r2.uploads[params["uploadId"]]
+                return Response(status_code=204)
+            data = b"".join(upload.parts[number] for number in sorted(upload.parts))
+            etag = r2.put(bucket, key, data, upload.content_type)
+            del r2.uploads[params["uploadId"]]
+            body = (
+                f'<?xml version="1.0" encoding="UTF-8"?><CompleteMultipartUploadResult xmlns="{S3_NAMESPACE}">'
+                f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                f'<ETag>"{etag}-{len(upload.parts)}"</ETag></CompleteMultipartUploadResult>'
+            )
+            return Response(body, media_type="application/xml")
+        
+        if request.method == "PUT":
+            checksum = request.headers.get("x-amz-checksum-sha256")
+            if checksum and checksum != base64.b64encode(hashlib.sha256(body).digest()).decode():
+                return s3_error(400, "BadDigest", "The SHA256 checksum you specified did not match the calculated checksum.")
+            content_type = request.headers.get("content-type", "application/octet-stream")
+            return Response(headers={"ETag": f'"{r2.put(bucket, key, body, content_type)}"'})
+        if request.method == "DELETE":
+            r2.objects.get(bucket, {}).pop(key, None)
+            r2.content_types.pop((bucket, key), None)
+            return Response(status_code=204)
+        
+        data = r2.get(bucket, key)
+        if data is None:
+            if request.method == "HEAD":
+                return Response(status_code=404)
+            return s3_error(404, "NoSuchKey", "The specified key does not exist.")
+        headers = {"ETag": f'"{hashlib.md5(data).hexdigest()}"', "Content-Length": str(len(data))}
+        content_type = r2.content_types.get((bucket, key), "application/octet-stream")
+        if request.method == "HEAD":
+            return Response(headers={**headers, "Content-Type": content_type})
+        return Response(data, headers=headers, media_type=content_type)
+    
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for latencies and injected errors")
+    parser.add_argument("--sync-job-seconds", type=float, default=5.0, help="Duration of a fake AI Search sync job")
+    for service in SERVICES:
+        option = service.replace("_", "-")
+        parser.add_argument(f"--{option}-latency-ms", type=float, default=DEFAULT_LATENCY_MS[service], help=f"Median {service} latency")
+        parser.add_argument(f"--{option}-sigma", type=float, default=0.4, help=f"Log-normal spread of {service} latency")
+        parser.add_argument(f"--{option}-error-rate", type=float, default=0.0, help=f"Fraction of {service} calls that fail")
+        parser.add_argument(f"--{option}-error-status", type=int, default=503, help=f"HTTP status of injected {service} errors")
+    args = parser.parse_args()
+    
+    if args.seed is not None:
+        random.seed(args.seed)
+    profiles = {
+        service: ServiceProfile(
+            latency_ms=getattr(args, f"{service}_latency_ms"),
+            sigma=getattr(args, f"{service}_sigma"),
+            error_rate=getattr(args, f"{service}_error_rate"),
+            error_status=getattr(args, f"{service}_error_status"),
+        )
+        for service in SERVICES
+    }
+    uvicorn.run(create_app(profiles, args.sync_job_seconds), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+End-to-end load test of the backend API.
+
+Drives /api/login, /api/request, /api/upload, /api/files and /api/results with
+a weighted mix at a fixed concurrency, then reports per endpoint throughput,
+error counts and p50/p95/p99 latency. Results are written as JSON (with the git
+commit) so runs can be compared across commits.
+
+Usage:
+    python load_test.py --user admin --password secret [--concurrency 32] [--duration 60]
+                        [--mix request=4,files=3,results=3,upload=1,login=1] [--paging cursor]
+                        [--compare results/<previous>.json] [--max-regression 20]
+
+Run the backend against fake_cloudflare.py (see README.md) to measure the
+backend itself rather than Cloudflare.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+ENDPOINTS = ("login", "request", "upload", "files", "results")
+
+# Questions used by the request scenario; a fraction are repeated to exercise the answer cache
+QUESTION_TEMPLATES = (
+    "What is the probability that KOI-{n}.01 is a confirmed exoplanet?",
+    "Is Kepler-{n} b in the habitable zone of its star?",
+    "What is the probability that TOI-{n} hosts a rocky planet?",
+    "How likely is it that the transit signal of KIC {n} is a false positive?",
+)
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return 0.0
+    rank = math.ceil(fraction * len(ordered))
+    return ordered[min(len(ordered), max(rank, 1)) - 1]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse 'request=4,files=3' into endpoint weights"""
+    mix = {}
+    for pair in value.split(","):
+        name, weight = pair.split("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name} (expected one of {', '.join(ENDPOINTS)})")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class LoadTest:
+    """Closed-loop load generator: each worker sends its next request when the previous one finishes"""
+    
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.token: Optional[str] = None
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.upload_body = self._upload_document(args.upload_kb * 1024)
+        self.rng = random.Random(args.seed)
+        # --paging cursor: position of the page walk per endpoint (cursor, pages read)
+        self.cursors: Dict[str, Tuple[Optional[str], int]] = {}
+    
+    @staticmethod
+    def _upload_document(size: int) -> bytes:
+        line = "Kepler-452 b orbits a G2 star; KOI-7016.01 transit depth 0.02%; TOI-700 d receives 86% of Earth's flux.\n"
+        return (line * (size // len(line) + 1))[:size].encode("utf-8")
+    
+    def _question(self) -> str:
+        # Repeated questions come from a small pool, the rest are unique
+        if self.rng.random() < self.args.repeat_ratio:
+            n = self.rng.randrange(20)
+        else:
+            n = self.rng.randrange(1000, 10_000_000)
+        return self.rng.choice(QUESTION_TEMPLATES).format(n=n)
+    
+    async def login(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.post(
+            "/api/login",
+            json={"user": self.args.user, "password": self.args.password},
+            headers={"cf-turnstile-response": "load-test"}
+        )
+    
+    async def _send(self, client: httpx.AsyncClient, endpoint: str) -> httpx.Response:
+        auth = {"Authorization": f"Bearer {self.token}"}
+        if endpoint == "login":
+            return await self.login(client)
+        if endpoint == "request":
+            return await client.post("/api/request", json={"prompt": self._question()}, headers=auth)
+        if endpoint == "upload":
+            files = {"file": (f"load-test-{self.rng.randrange(10**9)}.txt", self.upload_body, "text/plain")}
+            return await client.post("/api/upload", files=files, headers=auth)
+        if self.args.paging == "cursor":
+            # Walk pages through X-Next-Cursor, back to the first page after --max-page pages
+            cursor, pages = self.cursors.get(endpoint, (None, 0))
+            params = {"page_size": self.args.page_size, **({"cursor": cursor} if cursor else {})}
+            response = await client.get(f"/api/{endpoint}", params=params)
+            next_cursor = response.headers.get("X-Next-Cursor")
+            self.cursors[endpoint] = (next_cursor, pages + 1) if next_cursor and pages + 1 < self.args.max_page else (None, 0)
+            return response
+        page = self.rng.randint(1, self.args.max_page)
+        return await client.get(f"/api/{endpoint}", params={"page": page, "page_size": self.args.page_size})
+    
+    async def _worker(self, client: httpx.AsyncClient, deadline: float, recording: float) -> None:
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        while time.monotonic() < deadline:
+            endpoint = self.rng.choices(names, weights)[0]
+            start = time.monotonic()
+            try:
+                response = await self._send(client, endpoint)
+                outcome = str(response.status_code)
+            except httpx.HTTPError as error:
+                outcome = type(error).__name__
+            elapsed = time.monotonic() - start
+            # Requests started during warm-up are not recorded
+            if start >= recording:
+                self.samples[endpoint].append(elapsed)
+                self.statuses[endpoint][outcome] += 1
+    
+    async def run(self) -> dict:
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        async with httpx.AsyncClient(base_url=self.args.base_url, limits=limits, timeout=self.args.timeout) as client:
+            response = await self.login(client)
+            if response.status_code != 200:
+                raise SystemExit(f"Login failed ({response.status_code}): {response.text}")
+            self.token = response.json()["access_token"]
+            
+            started = time.monotonic()
+            recording = started + self.args.warmup
+            deadline = recording + self.args.duration
+            await asyncio.gather(*(self._worker(client, deadline, recording) for _ in range(self.args.concurrency)))
+            measured = time.monotonic() - recording
+        
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "git_commit": git_commit(),
+                "base_url": self.args.base_url,
+                "concurrency": self.args.concurrency,
+                "duration_seconds": round(measured, 2),
+                "warmup_seconds": self.args.warmup,
+                "mix": self.mix,
+                "repeat_ratio": self.args.repeat_ratio,
+                "upload_kb": self.args.upload_kb,
+                "paging": self.args.paging,
+                "max_page": self.args.max_page,
+            },
+            "endpoints": {},
+        }
+        all_samples = []
+        all_statuses = Counter()
+        for endpoint in self.mix:
+            samples = sorted(self.samples.get(endpoint, []))
+            all_samples.extend(samples)
+            all_statuses.update(self.statuses.get(endpoint, {}))
+            report["endpoints"][endpoint] = summarize(samples, self.statuses.get(endpoint, {}), measured)
+        report["total"] = summarize(sorted(all_samples), all_statuses, measured)
+        return report
+
+
+def summarize(samples: List[float], statuses: Dict[str, int], seconds: float) -> dict:
+    """Throughput, success rate and latency percentiles (ms) of one endpoint"""
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": len(samples),
+        "ok": ok,
+        "errors": len(samples) - ok,
+        "statuses": dict(statuses),
+        "throughput_rps": round(len(samples) / seconds, 2) if seconds else 0.0,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+        "max_ms": round(samples[-1] * 1000, 1) if samples else 0.0,
+    }
+
+
+def print_report(report: dict) -> None:
+    meta = report["meta"]
+    print("=" * 92)
+    print(f"LOAD TEST {meta['base_url']} (commit {meta['git_commit']}, concurrency {meta['concurrency']}, {meta['duration_seconds']}s)")
+    print("=" * 92)
+    print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  statuses")
+    print("-" * 92)
+    for name, row in list(report["endpoints"].items()) + [("TOTAL", report["total"])]:
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(row["statuses"].items()))
+        print(f"{name:<10}{row['requests']:>10}{row['errors']:>8}{row['throughput_rps']:>10.1f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}  {statuses}")
+    if "upstream" in report:
+        print("-" * 92)
+        for name, service in report["upstream"]["services"].items():
+            print(f"upstream {name:<12} calls={service['calls']} injected_errors={service['errors']}")
+    print("=" * 92)
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> List[Tuple[str, str, float]]:
+    """
+    Print throughput and p95 changes against a previous run.
+    
+    Returns:
+        List of (endpoint, metric, change %) exceeding max_regression
+    """
+    print(f"\nCompared with {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')}):")
+    for key in ("concurrency", "mix", "repeat_ratio", "upload_kb", "paging", "max_page"):
+        if baseline["meta"].get(key) != report["meta"][key]:
+            print(f"  warning: {key} differs ({baseline['meta'].get(key)} -> {report['meta'][key]}), results are not comparable")
+    print(f"{'endpoint':<10}{'req/s':>12}{'change':>9}{'p95 ms':>12}{'change':>9}")
+    regressions = []
+    for name, row in list(report["endpoints"].items()) + [("TOTAL", report["total"])]:
+        before = baseline["total"] if name == "TOTAL" else baseline["endpoints"].get(name)
+        if not before or not before["requests"]:
+            continue
+        throughput = (row["throughput_rps"] / before["throughput_rps"] - 1) * 100 if before["throughput_rps"] else 0.0
+        p95 = (row["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        print(f"{name:<10}{row['throughput_rps']:>12.1f}{throughput:>+8.1f}%{row['p95_ms']:>12.1f}{p95:>+8.1f}%")
+        if -throughput > max_regression:
+            regressions.append((name, "throughput", throughput))
+        if p95 > max_regression:
+            regressions.append((name, "p95", p95))
+    return regressions
+
+
+async def fetch_upstream_stats(url: str) -> Optional[dict]:
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            response = await client.get(f"{url.rstrip('/')}/_fake/stats")
+            return response.json()
+    except httpx.HTTPError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Backend URL")
+    parser.add_argument("--user", required=True, help="Admin username")
+    parser.add_argument("--password", required=True, help="Admin password")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before measuring")
+    parser.add_argument("--mix", default="request=4,files=3,results=3,upload=1,login=1", help="Endpoint weights")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3, help="Fraction of repeated questions")
+    parser.add_argument("--upload-kb", type=int, default=64, help="Size of uploaded documents")
+    parser.add_argument("--page-size", type=int, default=20, help="page_size for /api/files and /api/results")
+    parser.add_argument("--max-page", type=int, default=5, help="Pages are picked uniformly from 1..max-page")
+    parser.add_argument("--paging", choices=("page", "cursor"), default="page", help="page numbers, or walk --max-page pages with cursors")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the request mix")
+    parser.add_argument("--fake-url", default="http://127.0.0.1:8787", help="fake_cloudflare.py URL (upstream call counts)")
+    parser.add_argument("--output", default=str(Path(__file__).parent / "results"), help="Directory for the JSON report")
+    parser.add_argument("--compare", help="Previous JSON report to compare with")
+    parser.add_argument("--max-regression", type=float, default=None, help="Exit 1 if p95 or throughput regress more than this %%")
+    args = parser.parse_args()
+    
+    report = asyncio.run(LoadTest(args).run())
+    upstream = asyncio.run(fetch_upstream_stats(args.fake_url)) if args.fake_url else None
+    if upstream:
+        report["upstream"] = upstream
+    print_report(report)
+    
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    path = output / f"{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['git_commit'] or 'nogit'}.json"
+    path.write_text(json.dumps(report, indent=2))
+    print(f"Saved {path}")
+    
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.max_regression or float("inf"))
+        if args.max_regression is not None and regressions:
+            for name, metric, change in regressions:
+                print(f"REGRESSION {name} {metric}: {change:+.1f}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()